@@ -28,6 +28,58 @@ class Settings(BaseSettings):
     # Gemini API
     gemini_api_key: str
     
+    # Dashboard
+    dashboard_cache_ttl_seconds: int = 10  # Client-side Cache-Control max-age
+    
+    # Metrics response cache
+    metrics_cache_max_entries: int = 2048
+    metrics_cache_ttl_seconds: float = 30
+    metrics_cache_stale_seconds: float = 0  # > 0 serves stale entries while refreshing in the background
+    
+    # Prompt text storage
+    prompt_blob_compress_threshold: int = 4096  # Bytes; larger bodies are zstd-compressed if available
+    template_cache_max_entries: int = 1024
+    prompt_diff_cache_max_entries: int = 512
+    bulk_import_chunk_size: int = 500  # Records per import transaction
+    
+    # Activity audit pipeline
+    activity_batch_size: int = 200
+    activity_flush_interval_seconds: float = 1.0
+    activity_spool_path: Optional[str] = None  # Set to enable durable spooling
+    
+    # Activity filter facets
+    activity_facets_ttl_seconds: float = 300  # Bounds staleness from writes on other workers
+    
+    # Activity archival (disabled unless activity_archive_dir is set)
+    activity_archive_dir: Optional[str] = None
+    activity_hot_days: int = 90  # Older entries move to compressed segments
+    activity_archive_batch_size: int = 10000  # Rows per segment
+    activity_archive_interval_seconds: float = 3600
+    
+    # Live activity stream
+    activity_stream_queue_size: int = 100  # Per-subscriber; slower clients are dropped
+    activity_stream_heartbeat_seconds: float = 15
+    activity_events_pg_bridge: bool = False  # Share events between workers via LISTEN/NOTIFY
+    
+    # Cache invalidation across workers
+    cache_invalidation_pg_bridge: bool = False  # Enable when running more than one worker
+    
+    # Deployment watch (long-poll)
+    deployment_watch_max_timeout_seconds: float = 60  # Keep below proxy idle timeouts
+    environment_bundle_history: int = 8  # Past bundles per environment that deltas can start from
+    
+    # Experiments
+    experiment_stats_flush_interval_seconds: float = 2.0  # How often live variant stats reach the database
+    experiment_alpha: float = 0.05  # Significance level of experiment analysis
+    experiment_analysis_ttl_seconds: float = 30  # Reuse cached analysis of a running experiment this long
+    experiment_sequential_looks: int = 10  # Equally spaced looks up to target_sample_size
+    experiment_analysis_settle_seconds: float = 60  # Re-read metric rows this recent, in case of late commits
+    bandit_checkpoint_interval_seconds: float = 10
+    bandit_latency_target_ms: float = 5000  # Latency at which the full latency penalty applies
+    bandit_latency_weight: float = 0.2  # Share of a success's reward lost to latency
+    bandit_cost_target_cents: float = 1.0
+    bandit_cost_weight: float = 0.0  # Share of a success's reward lost to cost
+    
     # CORS Origins (comma-separated)
     cors_origins: str = "http://localhost:3000,http://localhost:5173"
     
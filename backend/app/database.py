@@ -55,6 +55,12 @@ async def get_db() -> AsyncSession:
 
 
 async def init_db():
-    """Initialize database tables."""
+    """Initialize database tables, upgrade older schemas and add search indexes."""
+    # Imported here: these modules depend on the models, which depend on Base
+    from app.services.activity_search import ensure_search_indexes
+    from app.services.schema_upgrades import ensure_schema_upgrades
+    
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await ensure_schema_upgrades(conn)
+        await ensure_search_indexes(conn)
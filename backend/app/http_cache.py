@@ -0,0 +1,42 @@
+"""
+HTTP conditional GET helpers (ETag / If-None-Match).
+"""
+
+import hashlib
+from typing import Optional
+from fastapi import Response, status
+
+
+# Clients may store responses but must revalidate them with If-None-Match
+REVALIDATE = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag from the values that identify a representation."""
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches the current ETag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # GET uses weak comparison, so W/ prefixes are ignored
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def set_cache_headers(response: Response, etag: str, cache_control: str = REVALIDATE) -> None:
+    """Attach validator and caching headers to a response."""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    response.headers["Vary"] = "Authorization"
+
+
+def not_modified(etag: str, cache_control: str = REVALIDATE) -> Response:
+    """Empty 304 response for a matching If-None-Match."""
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    set_cache_headers(response, etag, cache_control)
+    return response
@@ -12,6 +12,13 @@ from fastapi.responses import JSONResponse
 
 from app.config import get_settings
 from app.database import init_db
+from app.services.activity import get_audit_pipeline
+from app.services.events import get_event_bus
+from app.services.activity_archive import get_activity_archive
+from app.services.deployment_resolver import get_deployment_resolver
+from app.services.invalidation import get_invalidation_bus
+from app.services.variant_stats import get_variant_stats
+from app.services.bandit import get_bandit_allocator
 from app.routers import (
     prompts_router,
     environments_router,
@@ -19,7 +26,9 @@ from app.routers import (
     deployments_router,
     inference_router,
     metrics_router,
-    activity_router
+    activity_router,
+    dashboard_router,
+    bulk_router
 )
 
 
@@ -33,11 +42,30 @@ async def lifespan(app: FastAPI):
     print("🚀 Starting PromptOps Cloud API...")
     await init_db()
     print("✅ Database initialized")
+    # Listen before warming so no invalidation between the two is missed
+    await get_invalidation_bus().start()
+    warmed = await get_deployment_resolver().warm()
+    print(f"✅ Deployment resolver warmed ({warmed} active deployments)")
+    await get_event_bus().start()
+    await get_audit_pipeline().start()
+    await get_variant_stats().start()
+    await get_bandit_allocator().start()
+    archive = get_activity_archive()
+    if archive:
+        await archive.start()
     
     yield
     
     # Shutdown
     print("👋 Shutting down PromptOps Cloud API...")
+    if archive:
+        await archive.stop()
+    await get_bandit_allocator().stop()
+    await get_variant_stats().stop()
+    await get_audit_pipeline().stop()
+    print("✅ Activity log drained")
+    await get_event_bus().stop()
+    await get_invalidation_bus().stop()
 
 
 # Create FastAPI application
@@ -95,6 +123,8 @@ app.include_router(deployments_router, prefix=API_PREFIX)
 app.include_router(inference_router, prefix=API_PREFIX)
 app.include_router(metrics_router, prefix=API_PREFIX)
 app.include_router(activity_router, prefix=API_PREFIX)
+app.include_router(dashboard_router, prefix=API_PREFIX)
+app.include_router(bulk_router, prefix=API_PREFIX)
 
 
 # Root endpoint
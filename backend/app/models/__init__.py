@@ -3,19 +3,23 @@ SQLAlchemy models for PromptOps Cloud.
 """
 
 from app.models.prompt import Prompt, PromptVersion
+from app.models.prompt_blob import PromptBlob
 from app.models.environment import Environment
 from app.models.experiment import Experiment, ExperimentVariant
 from app.models.deployment import Deployment
-from app.models.activity_log import ActivityLog
+from app.models.activity_log import ActivityLog, ActivityActionStat, ActivityActionBackfill
 from app.models.metric import Metric
 
 __all__ = [
     "Prompt",
     "PromptVersion",
+    "PromptBlob",
     "Environment",
     "Experiment",
     "ExperimentVariant",
     "Deployment",
     "ActivityLog",
+    "ActivityActionStat",
+    "ActivityActionBackfill",
     "Metric",
 ]
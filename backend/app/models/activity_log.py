@@ -47,3 +47,34 @@ class ActivityLog(Base):
     
     def __repr__(self) -> str:
         return f"<ActivityLog(id={self.id}, action='{self.action}')>"
+
+
+class ActivityActionStat(Base):
+    """
+    Per-user action catalogue used for activity filter facets.
+    One row per (user, action, level), maintained incrementally as logs are written.
+    """
+    __tablename__ = "activity_action_stats"
+    
+    user_id: Mapped[str] = mapped_column(String(255), primary_key=True)
+    action: Mapped[str] = mapped_column(String(100), primary_key=True)
+    level: Mapped[ActivityLevel] = mapped_column(Enum(ActivityLevel), primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_seen: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    
+    def __repr__(self) -> str:
+        return f"<ActivityActionStat(action='{self.action}', level='{self.level}', count={self.count})>"
+
+
+class ActivityActionBackfill(Base):
+    """
+    Marks users whose action catalogue has been rebuilt from their existing logs.
+    Users without a row predate the catalogue or have not requested facets yet.
+    """
+    __tablename__ = "activity_action_backfills"
+    
+    user_id: Mapped[str] = mapped_column(String(255), primary_key=True)
+    backfilled_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    
+    def __repr__(self) -> str:
+        return f"<ActivityActionBackfill(user_id='{self.user_id}')>"
@@ -4,7 +4,7 @@ Deployment model for tracking prompt version deployments.
 
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import String, Integer, DateTime, ForeignKey, Enum, Text
+from sqlalchemy import String, Integer, DateTime, ForeignKey, Enum, Text, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 import enum
@@ -17,6 +17,7 @@ class DeploymentStatus(str, enum.Enum):
     PENDING = "pending"
     DEPLOYING = "deploying"
     ACTIVE = "active"
+    CANARY = "canary"  # Serves traffic_percent of requests alongside the active deployment
     ROLLED_BACK = "rolled_back"
     FAILED = "failed"
 
@@ -26,6 +27,10 @@ class Deployment(Base):
     A deployment of a prompt version to an environment.
     """
     __tablename__ = "deployments"
+    __table_args__ = (
+        # Watchers ask for everything written to an environment after a revision
+        Index("ix_deployments_environment_revision", "environment_id", "revision"),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     version_id: Mapped[int] = mapped_column(Integer, ForeignKey("prompt_versions.id", ondelete="CASCADE"), nullable=False)
@@ -38,6 +43,12 @@ class Deployment(Base):
         nullable=False
     )
     
+    # Share of traffic for canary deployments; active deployments serve the rest
+    traffic_percent: Mapped[int] = mapped_column(Integer, nullable=False, default=100)
+    
+    # Environment revision at which this row was last written
+    revision: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    
     # Deployment notes
     notes: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     
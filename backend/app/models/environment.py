@@ -25,6 +25,12 @@ class Environment(Base):
     description: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
     is_protected: Mapped[bool] = mapped_column(Boolean, default=False)  # Require approval for deploys
     color: Mapped[str] = mapped_column(String(20), default="#6366f1")  # UI color
+    
+    # Bumped by every deployment change in this environment; clients watch it
+    revision: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    # Last revision that deleted deployment rows; watchers behind it need a snapshot
+    snapshot_revision: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
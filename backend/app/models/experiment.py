@@ -20,6 +20,13 @@ class ExperimentStatus(str, enum.Enum):
     COMPLETED = "completed"
 
 
+class AllocationMode(str, enum.Enum):
+    """How an experiment splits traffic between variants."""
+    FIXED = "fixed"  # By traffic_weight
+    THOMPSON = "thompson"  # Thompson sampling on reward
+    UCB = "ucb"  # UCB1 on reward
+
+
 class Experiment(Base):
     """
     A/B testing experiment for comparing prompt variants.
@@ -38,6 +45,14 @@ class Experiment(Base):
     
     # Experiment configuration
     traffic_allocation: Mapped[dict] = mapped_column(JSON, default=dict)  # {"variant_a": 50, "variant_b": 50}
+    target_sample_size: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # Per variant; enables sequential testing
+    allocation_mode: Mapped[AllocationMode] = mapped_column(
+        Enum(AllocationMode),
+        default=AllocationMode.FIXED,
+        server_default=AllocationMode.FIXED.name,
+        nullable=False
+    )
+    bandit_state: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)  # Checkpointed per-variant rewards
     
     # Results
     results: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
@@ -85,11 +100,25 @@ class ExperimentVariant(Base):
     avg_latency_ms: Mapped[float] = mapped_column(Float, default=0.0)
     avg_tokens: Mapped[float] = mapped_column(Float, default=0.0)
     
+    # Sums of squared deviations from the means (Welford), for variances
+    latency_m2: Mapped[float] = mapped_column(Float, nullable=False, default=0.0, server_default="0")
+    tokens_m2: Mapped[float] = mapped_column(Float, nullable=False, default=0.0, server_default="0")
+    
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
     experiment: Mapped["Experiment"] = relationship("Experiment", back_populates="variants")
     
+    @property
+    def latency_stddev_ms(self) -> float:
+        """Sample standard deviation of latency."""
+        return (self.latency_m2 / (self.request_count - 1)) ** 0.5 if self.request_count > 1 else 0.0
+    
+    @property
+    def tokens_stddev(self) -> float:
+        """Sample standard deviation of tokens per request."""
+        return (self.tokens_m2 / (self.request_count - 1)) ** 0.5 if self.request_count > 1 else 0.0
+    
     def __repr__(self) -> str:
         return f"<ExperimentVariant(id={self.id}, name='{self.name}')>"
 
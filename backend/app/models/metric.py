@@ -25,7 +25,7 @@ class Metric(Base):
     deployment_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("deployments.id", ondelete="SET NULL"), nullable=True)
     prompt_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("prompts.id", ondelete="SET NULL"), nullable=True)
     version_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("prompt_versions.id", ondelete="SET NULL"), nullable=True)
-    experiment_variant_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    experiment_variant_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, index=True)
     
     # Model info
     model: Mapped[str] = mapped_column(String(100), nullable=False)
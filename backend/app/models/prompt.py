@@ -4,7 +4,7 @@ Prompt and PromptVersion models.
 
 from datetime import datetime
 from typing import Optional, List
-from sqlalchemy import String, Text, Integer, Float, DateTime, ForeignKey, JSON
+from sqlalchemy import String, Text, Integer, Float, DateTime, ForeignKey, JSON, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 
@@ -47,14 +47,22 @@ class PromptVersion(Base):
     A specific version of a prompt with content and configuration.
     """
     __tablename__ = "prompt_versions"
+    __table_args__ = (
+        # Serves latest-version and per-prompt listings without a sort
+        Index("ix_prompt_versions_prompt_created", "prompt_id", "created_at"),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     prompt_id: Mapped[int] = mapped_column(Integer, ForeignKey("prompts.id", ondelete="CASCADE"), nullable=False)
     version_tag: Mapped[str] = mapped_column(String(50), nullable=False)  # e.g., "v1.0.0"
     
-    # Prompt content
-    system_prompt: Mapped[str] = mapped_column(Text, nullable=False, default="")
-    user_prompt: Mapped[str] = mapped_column(Text, nullable=False, default="")
+    # Prompt content, stored as content-addressed blobs
+    system_prompt_hash: Mapped[Optional[str]] = mapped_column(String(64), ForeignKey("prompt_blobs.hash"), nullable=True)
+    user_prompt_hash: Mapped[Optional[str]] = mapped_column(String(64), ForeignKey("prompt_blobs.hash"), nullable=True)
+    
+    # Inline text from before blob storage; left empty for new versions
+    legacy_system_prompt: Mapped[str] = mapped_column("system_prompt", Text, nullable=False, default="")
+    legacy_user_prompt: Mapped[str] = mapped_column("user_prompt", Text, nullable=False, default="")
     
     # Configuration
     model: Mapped[str] = mapped_column(String(100), nullable=False, default="gemini-2.0-flash")
@@ -68,12 +76,36 @@ class PromptVersion(Base):
     
     # Relationships
     prompt: Mapped["Prompt"] = relationship("Prompt", back_populates="versions")
+    system_blob: Mapped[Optional["PromptBlob"]] = relationship(
+        "PromptBlob",
+        foreign_keys=[system_prompt_hash],
+        lazy="joined"
+    )
+    user_blob: Mapped[Optional["PromptBlob"]] = relationship(
+        "PromptBlob",
+        foreign_keys=[user_prompt_hash],
+        lazy="joined"
+    )
     deployments: Mapped[List["Deployment"]] = relationship(
         "Deployment",
         back_populates="version",
         cascade="all, delete-orphan"
     )
     
+    @property
+    def system_prompt(self) -> str:
+        """System prompt text, from its blob or the legacy column."""
+        if self.system_blob is not None:
+            return self.system_blob.text
+        return self.legacy_system_prompt
+    
+    @property
+    def user_prompt(self) -> str:
+        """User prompt template, from its blob or the legacy column."""
+        if self.user_blob is not None:
+            return self.user_blob.text
+        return self.legacy_user_prompt
+    
     def __repr__(self) -> str:
         return f"<PromptVersion(id={self.id}, tag='{self.version_tag}')>"
 
@@ -81,3 +113,4 @@ class PromptVersion(Base):
 # Import for type hints (avoid circular imports)
 from app.models.experiment import Experiment
 from app.models.deployment import Deployment
+from app.models.prompt_blob import PromptBlob
@@ -0,0 +1,62 @@
+"""
+PromptBlob model - content-addressed storage for prompt text.
+"""
+
+import hashlib
+from datetime import datetime
+from functools import cached_property
+from typing import Optional
+from sqlalchemy import String, Integer, DateTime, LargeBinary
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+try:
+    import zstandard
+except ImportError:  # Compression is optional
+    zstandard = None
+
+
+ZSTD = "zstd"
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 of the UTF-8 text, used as the blob key."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def encode_text(text: str, compress_threshold: int) -> tuple[bytes, Optional[str]]:
+    """Encode text for storage, compressing with zstd when available and worthwhile."""
+    raw = text.encode("utf-8")
+    if zstandard is not None and len(raw) >= compress_threshold:
+        compressed = zstandard.ZstdCompressor().compress(raw)
+        if len(compressed) < len(raw):
+            return compressed, ZSTD
+    return raw, None
+
+
+class PromptBlob(Base):
+    """
+    Immutable prompt text keyed by its SHA-256 hash.
+    Versions with identical bodies share a single row.
+    """
+    __tablename__ = "prompt_blobs"
+    
+    hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    compression: Mapped[Optional[str]] = mapped_column(String(20), nullable=True)  # None or "zstd"
+    size: Mapped[int] = mapped_column(Integer, nullable=False)  # Uncompressed size in bytes
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    
+    @cached_property
+    def text(self) -> str:
+        """Decoded text, decompressed on first access."""
+        if self.compression == ZSTD:
+            if zstandard is None:
+                raise RuntimeError("zstandard is required to read compressed prompt blobs")
+            return zstandard.ZstdDecompressor().decompress(self.data).decode("utf-8")
+        return self.data.decode("utf-8")
+    
+    def __repr__(self) -> str:
+        return f"<PromptBlob(hash='{self.hash[:12]}', size={self.size})>"
@@ -9,6 +9,8 @@ from app.routers.deployments import router as deployments_router
 from app.routers.inference import router as inference_router
 from app.routers.metrics import router as metrics_router
 from app.routers.activity import router as activity_router
+from app.routers.dashboard import router as dashboard_router
+from app.routers.bulk import router as bulk_router
 
 __all__ = [
     "prompts_router",
@@ -18,4 +20,6 @@ __all__ = [
     "inference_router",
     "metrics_router",
     "activity_router",
+    "dashboard_router",
+    "bulk_router",
 ]
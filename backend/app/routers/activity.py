@@ -2,20 +2,33 @@
 Activity API router - Audit logs and system events.
 """
 
+import asyncio
+import json
 from typing import List, Optional
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Header, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_
+from sqlalchemy import select, func
 
-from app.database import get_db
+from app.config import get_settings
+from app.database import get_db, async_session_maker
 from app.deps import get_current_user
 from app.services.supabase_auth import SupabaseUser
+from app.services.activity_search import apply_search
+from app.services.events import EventBus, get_event_bus
+from app.services.activity_facets import ActionCatalogue, get_action_catalogue
+from app.services.activity_archive import get_activity_archive
 from app.models.activity_log import ActivityLog, ActivityLevel
-from app.schemas.activity_log import ActivityLogResponse
+from app.schemas.activity_log import ActivityLogResponse, ActivityActionsResponse
 
 
 router = APIRouter(prefix="/activity", tags=["Activity"])
 
+settings = get_settings()
+
+# Cap on entries replayed to a reconnecting stream client
+STREAM_BACKFILL_LIMIT = 200
+
 
 @router.get("", response_model=List[ActivityLogResponse])
 async def list_activity_logs(
@@ -29,6 +42,8 @@ async def list_activity_logs(
 ):
     """
     List activity logs with optional filtering.
+    When search is given, results are ordered by relevance, then recency.
+    Pages beyond the hot window continue into the archive.
     """
     query = (
         select(ActivityLog)
@@ -43,37 +58,47 @@ async def list_activity_logs(
         query = query.where(ActivityLog.action == action)
     
     if search:
-        query = query.where(
-            or_(
-                ActivityLog.message.ilike(f"%{search}%"),
-                ActivityLog.action.ilike(f"%{search}%")
-            )
-        )
+        query = apply_search(query, search, db.get_bind().dialect.name)
     
-    query = query.offset(offset).limit(limit)
+    result = await db.execute(query.offset(offset).limit(limit))
+    logs = list(result.scalars().all())
     
-    result = await db.execute(query)
-    logs = result.scalars().all()
+    # Continue into the archive once the hot table is exhausted
+    archive = get_activity_archive()
+    if archive and len(logs) < limit:
+        if logs or offset == 0:
+            hot_total = offset + len(logs)
+        else:
+            hot_total = await db.scalar(
+                select(func.count()).select_from(query.order_by(None).subquery())
+            )
+        logs.extend(await archive.query(
+            user.id,
+            level=level,
+            action=action,
+            search=search,
+            offset=max(0, offset - hot_total),
+            limit=limit - len(logs)
+        ))
     
     return logs
 
 
-@router.get("/actions")
+@router.get("/actions", response_model=ActivityActionsResponse)
 async def get_action_types(
     db: AsyncSession = Depends(get_db),
-    user: SupabaseUser = Depends(get_current_user)
+    user: SupabaseUser = Depends(get_current_user),
+    catalogue: ActionCatalogue = Depends(get_action_catalogue)
 ):
     """
-    Get all unique action types for filtering.
+    Get all unique action types for filtering, with counts per level.
     """
-    result = await db.execute(
-        select(ActivityLog.action)
-        .where(ActivityLog.user_id == user.id)
-        .distinct()
-    )
-    actions = result.scalars().all()
+    facets = await catalogue.get(db, user.id)
     
-    return {"actions": actions}
+    return ActivityActionsResponse(
+        actions=[facet.action for facet in facets],
+        facets=facets
+    )
 
 
 @router.get("/recent", response_model=List[ActivityLogResponse])
@@ -94,3 +119,73 @@ async def get_recent_activity(
     logs = result.scalars().all()
     
     return logs
+
+
+@router.get("/stream")
+async def stream_activity(
+    request: Request,
+    last_event_id: Optional[int] = Header(default=None),
+    user: SupabaseUser = Depends(get_current_user),
+    bus: EventBus = Depends(get_event_bus)
+):
+    """
+    Stream new activity entries as they are written (Server-Sent Events).
+    Reconnecting clients send Last-Event-ID to receive entries they missed.
+    If a client falls too far behind, an overflow event is sent and the
+    stream closes; the client should reconnect.
+    """
+    subscription = bus.subscribe(user.id)
+    
+    backfill = []
+    if last_event_id is not None:
+        async with async_session_maker() as session:
+            result = await session.execute(
+                select(ActivityLog)
+                .where(ActivityLog.user_id == user.id, ActivityLog.id > last_event_id)
+                .order_by(ActivityLog.id)
+                .limit(STREAM_BACKFILL_LIMIT)
+            )
+            backfill = [
+                ActivityLogResponse.model_validate(log).model_dump(mode="json")
+                for log in result.scalars().all()
+            ]
+    
+    # Live entries are published in flush order, not id order, so only the
+    # backfill is deduplicated: a row another worker commits late can carry a
+    # lower id than entries already streamed
+    backfill_ids = {entry["id"] for entry in backfill}
+    
+    async def generate():
+        try:
+            for entry in backfill:
+                yield f"id: {entry['id']}\ndata: {json.dumps({'type': 'activity', 'entry': entry})}\n\n"
+            
+            while not await request.is_disconnected():
+                if subscription.dropped:
+                    yield f"data: {json.dumps({'type': 'overflow'})}\n\n"
+                    break
+                
+                try:
+                    entry = await asyncio.wait_for(
+                        subscription.queue.get(),
+                        timeout=settings.activity_stream_heartbeat_seconds
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                
+                # Skip entries already sent as backfill
+                if entry["id"] in backfill_ids:
+                    continue
+                yield f"id: {entry['id']}\ndata: {json.dumps({'type': 'activity', 'entry': entry})}\n\n"
+        finally:
+            bus.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+        }
+    )
@@ -0,0 +1,96 @@
+"""
+Bulk API router - NDJSON export and import of prompts, versions and environments.
+"""
+
+from typing import AsyncIterator
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.database import get_db
+from app.deps import get_current_user
+from app.services.supabase_auth import SupabaseUser
+from app.services.activity import ActivityService
+from app.services.bulk_transfer import BulkImporter, export_records
+from app.schemas.bulk import BulkImportSummary, bulk_record_adapter
+
+
+router = APIRouter(prefix="/bulk", tags=["Bulk"])
+
+settings = get_settings()
+
+
+async def _read_lines(request: Request) -> AsyncIterator[bytes]:
+    """Split a streamed request body into lines without buffering it whole."""
+    pending = b""
+    async for chunk in request.stream():
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line
+    if pending:
+        yield pending
+
+
+@router.get("/export")
+async def export_bulk(
+    user: SupabaseUser = Depends(get_current_user)
+):
+    """
+    Export all environments, prompts and versions as NDJSON.
+    Records are ordered so the file can be imported as-is.
+    """
+    async def generate():
+        async for record in export_records(user.id):
+            yield record.model_dump_json() + "\n"
+    
+    return StreamingResponse(
+        generate(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="promptops-export.ndjson"'}
+    )
+
+
+@router.post("/import", response_model=BulkImportSummary)
+async def import_bulk(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    user: SupabaseUser = Depends(get_current_user)
+):
+    """
+    Import an NDJSON stream in the format produced by /bulk/export.
+    Existing environments and version tags are skipped and reported as
+    conflicts; invalid lines are reported as errors.
+    """
+    importer = BulkImporter(db, user.id, chunk_size=settings.bulk_import_chunk_size)
+    
+    line_number = 0
+    async for line in _read_lines(request):
+        line_number += 1
+        if not line.strip():
+            continue
+        
+        try:
+            record = bulk_record_adapter.validate_json(line)
+        except ValidationError as e:
+            importer.error(line_number, "; ".join(
+                f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in e.errors()
+            ))
+            continue
+        
+        await importer.add(line_number, record)
+    
+    await importer.flush()
+    
+    summary = importer.summary
+    ActivityService().log_bulk_import(
+        user.id,
+        environments=summary.environments_created,
+        prompts=summary.prompts_created,
+        versions=summary.versions_created,
+        conflicts=len(summary.conflicts)
+    )
+    
+    return summary
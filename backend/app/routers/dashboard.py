@@ -0,0 +1,100 @@
+"""
+Dashboard API router - Composite dashboard payload in a single round trip.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, TypeVar
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.database import get_db, async_session_maker
+from app.deps import get_current_user
+from app.services.supabase_auth import SupabaseUser
+from app.services.metrics import MetricsService
+from app.services.metrics_cache import MetricsCache, get_metrics_cache
+from app.models.activity_log import ActivityLog
+from app.schemas.dashboard import DashboardResponse
+
+
+router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
+
+settings = get_settings()
+
+T = TypeVar("T")
+
+
+async def _in_session(fn: Callable[[AsyncSession], Awaitable[T]]) -> T:
+    """Run a query on its own pooled connection so sub-queries can overlap."""
+    async with async_session_maker() as session:
+        return await fn(session)
+
+
+async def _recent_activity(session: AsyncSession, user_id: str, limit: int):
+    """Latest activity entries for the activity panel."""
+    result = await session.execute(
+        select(ActivityLog)
+        .where(ActivityLog.user_id == user_id)
+        .order_by(ActivityLog.timestamp.desc())
+        .limit(limit)
+    )
+    return result.scalars().all()
+
+
+async def _build_dashboard(
+    session: AsyncSession,
+    user_id: str,
+    days: int,
+    cost_days: int,
+    activity_limit: int
+) -> DashboardResponse:
+    """Run all dashboard aggregations concurrently and assemble the payload."""
+    now = datetime.utcnow()
+    since = now - timedelta(days=days)
+    cost_since = now - timedelta(days=cost_days)
+    
+    overview, latency, costs, by_model, recent_activity = await asyncio.gather(
+        _in_session(lambda s: MetricsService(s).overview(user_id, since)),
+        _in_session(lambda s: MetricsService(s).latency(user_id, since)),
+        _in_session(lambda s: MetricsService(s).costs(user_id, cost_since)),
+        _in_session(lambda s: MetricsService(s).by_model(user_id, since)),
+        _recent_activity(session, user_id, activity_limit),
+    )
+    
+    return DashboardResponse(
+        overview=overview,
+        latency=latency,
+        costs=costs,
+        by_model=by_model,
+        recent_activity=recent_activity
+    )
+
+
+@router.get("", response_model=DashboardResponse)
+async def get_dashboard(
+    response: Response,
+    days: int = Query(default=7, ge=1, le=90),
+    cost_days: int = Query(default=30, ge=1, le=90),
+    activity_limit: int = Query(default=10, ge=1, le=50),
+    db: AsyncSession = Depends(get_db),
+    user: SupabaseUser = Depends(get_current_user),
+    cache: MetricsCache = Depends(get_metrics_cache)
+):
+    """
+    Get overview, latency, costs, per-model breakdown and recent activity at once.
+    Each aggregation runs concurrently on a separate pooled connection.
+    """
+    payload = await cache.get_or_load(
+        user.id,
+        "dashboard",
+        {"days": days, "cost_days": cost_days, "activity_limit": activity_limit},
+        lambda session: _build_dashboard(session, user.id, days, cost_days, activity_limit),
+        db
+    )
+    
+    response.headers["Cache-Control"] = f"private, max-age={settings.dashboard_cache_ttl_seconds}"
+    response.headers["Vary"] = "Authorization"
+    
+    return payload
@@ -2,24 +2,89 @@
 Deployments API router - Manage prompt deployments to environments.
 """
 
-from typing import List
+import time
+from typing import List, Optional
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, insert, update, and_
 from sqlalchemy.orm import selectinload
 
+from app.config import get_settings
 from app.database import get_db
 from app.deps import get_current_user
+from app.http_cache import make_etag, etag_matches, set_cache_headers, not_modified
 from app.services.supabase_auth import SupabaseUser
 from app.services.activity import ActivityService
+from app.services.metrics import MetricsService
+from app.services.deployment_resolver import DeploymentResolver, get_deployment_resolver
+from app.services.invalidation import get_invalidation_bus
+from app.services.deployment_watch import DeploymentWatch, get_deployment_watch
 from app.models.deployment import Deployment, DeploymentStatus
 from app.models.prompt import Prompt, PromptVersion
 from app.models.environment import Environment
-from app.schemas.deployment import DeploymentCreate, DeploymentResponse, DeploymentRollbackRequest
+from app.models.activity_log import ActivityLevel
+from app.schemas.deployment import (
+    DeploymentCreate, DeploymentResponse, DeploymentRollbackRequest,
+    PromotionRequest, PromotionResponse,
+    CanaryCreate, CanaryUpdate, CanaryComparison, DeploymentWatchResponse
+)
 
 
 router = APIRouter(prefix="/deployments", tags=["Deployments"])
+settings = get_settings()
+
+# Statuses that serve traffic
+LIVE_STATUSES = (DeploymentStatus.ACTIVE, DeploymentStatus.CANARY)
+
+
+# Columns of DeploymentResponse, with names joined in from related tables
+RESPONSE_COLUMNS = (
+    Deployment.id,
+    Deployment.version_id,
+    Deployment.environment_id,
+    Deployment.user_id,
+    Deployment.status,
+    Deployment.traffic_percent,
+    Deployment.revision,
+    Deployment.notes,
+    Deployment.rolled_back_from_id,
+    Deployment.created_at,
+    Deployment.deployed_at,
+    PromptVersion.version_tag,
+    Prompt.name.label("prompt_name"),
+    Environment.name.label("environment_name"),
+)
+
+
+def _deployment_query(*extra_columns):
+    """Deployments joined to their version, prompt and environment names."""
+    return (
+        select(*RESPONSE_COLUMNS, *extra_columns)
+        .join(PromptVersion, Deployment.version_id == PromptVersion.id)
+        .join(Prompt, PromptVersion.prompt_id == Prompt.id)
+        .join(Environment, Deployment.environment_id == Environment.id)
+    )
+
+
+def _to_response(row) -> DeploymentResponse:
+    return DeploymentResponse.model_validate({
+        column.key: row._mapping[column.key] for column in RESPONSE_COLUMNS
+    })
+
+
+async def _next_revision(db: AsyncSession, environment_id: int) -> int:
+    """
+    Bump an environment's revision and return it; stamp written rows with it.
+    The row lock this takes orders concurrent writers to the same environment.
+    """
+    result = await db.execute(
+        update(Environment)
+        .where(Environment.id == environment_id)
+        .values(revision=Environment.revision + 1)
+        .returning(Environment.revision)
+    )
+    return result.scalar_one()
 
 
 @router.get("", response_model=List[DeploymentResponse])
@@ -31,10 +96,7 @@ async def list_deployments(
 ):
     """List deployments, optionally filtered by environment or prompt."""
     query = (
-        select(Deployment)
-        .join(PromptVersion)
-        .join(Prompt)
-        .join(Environment)
+        _deployment_query()
         .where(Deployment.user_id == user.id)
         .order_by(Deployment.created_at.desc())
     )
@@ -45,40 +107,8 @@ async def list_deployments(
         query = query.where(Prompt.id == prompt_id)
     
     result = await db.execute(query)
-    deployments = result.scalars().all()
-    
-    # Enrich with names
-    response = []
-    for dep in deployments:
-        # Fetch related data
-        version_result = await db.execute(
-            select(PromptVersion)
-            .options(selectinload(PromptVersion.prompt))
-            .where(PromptVersion.id == dep.version_id)
-        )
-        version = version_result.scalar_one_or_none()
-        
-        env_result = await db.execute(
-            select(Environment).where(Environment.id == dep.environment_id)
-        )
-        env = env_result.scalar_one_or_none()
-        
-        response.append(DeploymentResponse(
-            id=dep.id,
-            version_id=dep.version_id,
-            environment_id=dep.environment_id,
-            user_id=dep.user_id,
-            status=dep.status,
-            notes=dep.notes,
-            rolled_back_from_id=dep.rolled_back_from_id,
-            created_at=dep.created_at,
-            deployed_at=dep.deployed_at,
-            version_tag=version.version_tag if version else None,
-            prompt_name=version.prompt.name if version and version.prompt else None,
-            environment_name=env.name if env else None
-        ))
     
-    return response
+    return [_to_response(row) for row in result]
 
 
 @router.post("", response_model=DeploymentResponse, status_code=status.HTTP_201_CREATED)
@@ -116,20 +146,21 @@ async def create_deployment(
             detail="Environment not found"
         )
     
-    # Deactivate previous active deployment in this environment for this prompt
+    # Deactivate previous active deployment (and any canary) in this environment for this prompt.
+    # Read under the environment lock so concurrent deploys can't both retire the same rows
+    revision = await _next_revision(db, data.environment_id)
     prev_result = await db.execute(
         select(Deployment)
         .join(PromptVersion)
         .where(
             Deployment.environment_id == data.environment_id,
             PromptVersion.prompt_id == version.prompt_id,
-            Deployment.status == DeploymentStatus.ACTIVE
+            Deployment.status.in_(LIVE_STATUSES)
         )
     )
-    prev_deployment = prev_result.scalar_one_or_none()
-    
-    if prev_deployment:
+    for prev_deployment in prev_result.scalars().all():
         prev_deployment.status = DeploymentStatus.ROLLED_BACK
+        prev_deployment.revision = revision
     
     # Create new deployment
     deployment = Deployment(
@@ -137,16 +168,17 @@ async def create_deployment(
         environment_id=data.environment_id,
         user_id=user.id,
         status=DeploymentStatus.ACTIVE,
+        revision=revision,
         notes=data.notes,
         deployed_at=datetime.utcnow()
     )
     db.add(deployment)
     await db.commit()
     await db.refresh(deployment)
+    await get_invalidation_bus().deployment_changed(user.id, data.environment_id, version.prompt_id)
     
     # Log activity
-    activity_service = ActivityService(db)
-    await activity_service.log_deployment(
+    ActivityService().log_deployment(
         user.id,
         version.prompt.name,
         version.version_tag,
@@ -160,6 +192,7 @@ async def create_deployment(
         environment_id=deployment.environment_id,
         user_id=deployment.user_id,
         status=deployment.status,
+        revision=deployment.revision,
         notes=deployment.notes,
         rolled_back_from_id=deployment.rolled_back_from_id,
         created_at=deployment.created_at,
@@ -170,54 +203,433 @@ async def create_deployment(
     )
 
 
-@router.get("/{deployment_id}", response_model=DeploymentResponse)
-async def get_deployment(
-    deployment_id: int,
+@router.post("/promote", response_model=PromotionResponse)
+async def promote_deployments(
+    data: PromotionRequest,
     db: AsyncSession = Depends(get_db),
     user: SupabaseUser = Depends(get_current_user)
 ):
-    """Get a deployment by ID."""
+    """
+    Promote the active deployments of one environment to another.
+    All prompts are switched in a single transaction; prompts already serving
+    the same version in the target are left alone.
+    """
+    if data.source_environment_id == data.target_environment_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Source and target environments must differ"
+        )
+    
+    # Verify ownership of both environments at once
+    env_result = await db.execute(
+        select(Environment.id, Environment.name).where(
+            Environment.id.in_([data.source_environment_id, data.target_environment_id]),
+            Environment.user_id == user.id
+        )
+    )
+    env_names = dict(env_result.tuples())
+    if len(env_names) != 2:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Environment not found"
+        )
+    
+    # Active deployments in the source environment, one per prompt
+    source_query = (
+        select(Deployment.version_id, PromptVersion.prompt_id, PromptVersion.version_tag, Prompt.name)
+        .join(PromptVersion, Deployment.version_id == PromptVersion.id)
+        .join(Prompt, PromptVersion.prompt_id == Prompt.id)
+        .where(
+            Deployment.environment_id == data.source_environment_id,
+            Deployment.status == DeploymentStatus.ACTIVE,
+            Prompt.user_id == user.id
+        )
+    )
+    if data.prompt_ids is not None:
+        source_query = source_query.where(PromptVersion.prompt_id.in_(data.prompt_ids))
+    source = {row.prompt_id: row for row in await db.execute(source_query)}
+    
+    # What the target environment serves for those prompts now
+    target_result = await db.execute(
+        select(Deployment.id, Deployment.version_id, PromptVersion.prompt_id)
+        .join(PromptVersion, Deployment.version_id == PromptVersion.id)
+        .where(
+            Deployment.environment_id == data.target_environment_id,
+            Deployment.status == DeploymentStatus.ACTIVE,
+            PromptVersion.prompt_id.in_(source.keys())
+        )
+    )
+    current = {row.prompt_id: row for row in target_result}
+    
+    unchanged = [
+        prompt_id for prompt_id, row in source.items()
+        if prompt_id in current and current[prompt_id].version_id == row.version_id
+    ]
+    to_promote = [row for prompt_id, row in source.items() if prompt_id not in unchanged]
+    missing = [prompt_id for prompt_id in (data.prompt_ids or []) if prompt_id not in source]
+    
+    promoted: List[DeploymentResponse] = []
+    if to_promote:
+        revision = await _next_revision(db, data.target_environment_id)
+        
+        # Retire what the target serves now, including canaries
+        await db.execute(
+            update(Deployment)
+            .where(
+                Deployment.environment_id == data.target_environment_id,
+                Deployment.status.in_(LIVE_STATUSES),
+                Deployment.version_id.in_(
+                    select(PromptVersion.id)
+                    .where(PromptVersion.prompt_id.in_([row.prompt_id for row in to_promote]))
+                )
+            )
+            .values(status=DeploymentStatus.ROLLED_BACK, revision=revision)
+        )
+        
+        deployed_at = datetime.utcnow()
+        inserted = await db.execute(
+            insert(Deployment).returning(
+                Deployment.id, Deployment.created_at, Deployment.deployed_at,
+                sort_by_parameter_order=True
+            ),
+            [
+                {
+                    "version_id": row.version_id,
+                    "environment_id": data.target_environment_id,
+                    "user_id": user.id,
+                    "status": DeploymentStatus.ACTIVE,
+                    "revision": revision,
+                    "notes": data.notes,
+                    "deployed_at": deployed_at,
+                }
+                for row in to_promote
+            ]
+        )
+        created = inserted.all()
+        await db.commit()
+        
+        target_name = env_names[data.target_environment_id]
+        for row, new in zip(to_promote, created):
+            promoted.append(DeploymentResponse(
+                id=new.id,
+                version_id=row.version_id,
+                environment_id=data.target_environment_id,
+                user_id=user.id,
+                status=DeploymentStatus.ACTIVE,
+                traffic_percent=100,
+                revision=revision,
+                notes=data.notes,
+                rolled_back_from_id=None,
+                created_at=new.created_at,
+                deployed_at=new.deployed_at,
+                version_tag=row.version_tag,
+                prompt_name=row.name,
+                environment_name=target_name
+            ))
+        
+        await get_invalidation_bus().environment_changed(user.id, data.target_environment_id)
+        
+        # Log activity
+        ActivityService().log_promotion(
+            user.id,
+            env_names[data.source_environment_id],
+            target_name,
+            [row.name for row in to_promote],
+            [deployment.id for deployment in promoted]
+        )
+    
+    return PromotionResponse(promoted=promoted, unchanged=unchanged, missing=missing)
+
+
+# ====== Canary Endpoints ======
+
+async def _get_canary(db: AsyncSession, canary_id: int, user_id: str):
+    """A live canary with its names and prompt, or 404."""
+    result = await db.execute(
+        _deployment_query(PromptVersion.prompt_id)
+        .where(
+            Deployment.id == canary_id,
+            Deployment.user_id == user_id,
+            Deployment.status == DeploymentStatus.CANARY
+        )
+    )
+    row = result.first()
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Canary not found"
+        )
+    return row
+
+
+async def _update_canary(db: AsyncSession, canary_id: int, **values) -> None:
+    """
+    Update a canary only if it is still one, or 404. Called after taking the
+    environment lock, so a concurrent promote or abort can't be overwritten.
+    """
+    result = await db.execute(
+        update(Deployment)
+        .where(Deployment.id == canary_id, Deployment.status == DeploymentStatus.CANARY)
+        .values(**values)
+    )
+    if result.rowcount == 0:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Canary not found"
+        )
+
+
+async def _get_baseline(db: AsyncSession, environment_id: int, prompt_id: int) -> Optional[Deployment]:
+    """The active deployment a canary runs against."""
     result = await db.execute(
         select(Deployment)
-        .where(Deployment.id == deployment_id, Deployment.user_id == user.id)
+        .join(PromptVersion, Deployment.version_id == PromptVersion.id)
+        .where(
+            Deployment.environment_id == environment_id,
+            PromptVersion.prompt_id == prompt_id,
+            Deployment.status == DeploymentStatus.ACTIVE
+        )
     )
-    deployment = result.scalar_one_or_none()
-    
-    if not deployment:
+    return result.scalar_one_or_none()
+
+
+@router.post("/canary", response_model=DeploymentResponse, status_code=status.HTTP_201_CREATED)
+async def create_canary(
+    data: CanaryCreate,
+    db: AsyncSession = Depends(get_db),
+    user: SupabaseUser = Depends(get_current_user)
+):
+    """
+    Start a canary: route traffic_percent of requests to a version while the
+    active deployment serves the rest. Replaces any running canary.
+    """
+    result = await db.execute(
+        select(PromptVersion.prompt_id, PromptVersion.version_tag, Prompt.name, Environment.name)
+        .join(Prompt, PromptVersion.prompt_id == Prompt.id)
+        .join(Environment, and_(Environment.id == data.environment_id, Environment.user_id == user.id))
+        .where(PromptVersion.id == data.version_id, Prompt.user_id == user.id)
+    )
+    row = result.first()
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Deployment not found"
+            detail="Version or environment not found"
         )
+    prompt_id, version_tag, prompt_name, environment_name = row
     
-    # Fetch related data
-    version_result = await db.execute(
-        select(PromptVersion)
-        .options(selectinload(PromptVersion.prompt))
-        .where(PromptVersion.id == deployment.version_id)
+    baseline = await _get_baseline(db, data.environment_id, prompt_id)
+    if not baseline:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A canary needs an active deployment to run against"
+        )
+    if baseline.version_id == data.version_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Version is already active in this environment"
+        )
+    
+    revision = await _next_revision(db, data.environment_id)
+    
+    # Replace a running canary
+    await db.execute(
+        update(Deployment)
+        .where(
+            Deployment.environment_id == data.environment_id,
+            Deployment.status == DeploymentStatus.CANARY,
+            Deployment.version_id.in_(select(PromptVersion.id).where(PromptVersion.prompt_id == prompt_id))
+        )
+        .values(status=DeploymentStatus.ROLLED_BACK, revision=revision)
     )
-    version = version_result.scalar_one_or_none()
     
-    env_result = await db.execute(
-        select(Environment).where(Environment.id == deployment.environment_id)
+    canary = Deployment(
+        version_id=data.version_id,
+        environment_id=data.environment_id,
+        user_id=user.id,
+        status=DeploymentStatus.CANARY,
+        traffic_percent=data.traffic_percent,
+        revision=revision,
+        notes=data.notes,
+        deployed_at=datetime.utcnow()
+    )
+    db.add(canary)
+    await db.commit()
+    await db.refresh(canary)
+    await get_invalidation_bus().deployment_changed(user.id, data.environment_id, prompt_id)
+    
+    ActivityService().log(
+        user_id=user.id,
+        action="deployment.canary",
+        message=f"Started canary of {prompt_name} {version_tag} at {data.traffic_percent}% in {environment_name}",
+        source="api",
+        extra_data={"deployment_id": canary.id, "traffic_percent": data.traffic_percent, "environment": environment_name}
     )
-    env = env_result.scalar_one_or_none()
     
     return DeploymentResponse(
-        id=deployment.id,
-        version_id=deployment.version_id,
-        environment_id=deployment.environment_id,
-        user_id=deployment.user_id,
-        status=deployment.status,
-        notes=deployment.notes,
-        rolled_back_from_id=deployment.rolled_back_from_id,
-        created_at=deployment.created_at,
-        deployed_at=deployment.deployed_at,
-        version_tag=version.version_tag if version else None,
-        prompt_name=version.prompt.name if version and version.prompt else None,
-        environment_name=env.name if env else None
+        id=canary.id,
+        version_id=canary.version_id,
+        environment_id=canary.environment_id,
+        user_id=canary.user_id,
+        status=canary.status,
+        traffic_percent=canary.traffic_percent,
+        revision=canary.revision,
+        notes=canary.notes,
+        rolled_back_from_id=canary.rolled_back_from_id,
+        created_at=canary.created_at,
+        deployed_at=canary.deployed_at,
+        version_tag=version_tag,
+        prompt_name=prompt_name,
+        environment_name=environment_name
+    )
+
+
+@router.patch("/canary/{canary_id}", response_model=DeploymentResponse)
+async def update_canary(
+    canary_id: int,
+    data: CanaryUpdate,
+    db: AsyncSession = Depends(get_db),
+    user: SupabaseUser = Depends(get_current_user)
+):
+    """Change a canary's traffic share."""
+    row = await _get_canary(db, canary_id, user.id)
+    
+    revision = await _next_revision(db, row.environment_id)
+    await _update_canary(db, canary_id, traffic_percent=data.traffic_percent, revision=revision)
+    await db.commit()
+    await get_invalidation_bus().deployment_changed(user.id, row.environment_id, row.prompt_id)
+    
+    response = _to_response(row)
+    response.traffic_percent = data.traffic_percent
+    response.revision = revision
+    return response
+
+
+@router.post("/canary/{canary_id}/promote", response_model=DeploymentResponse)
+async def promote_canary(
+    canary_id: int,
+    db: AsyncSession = Depends(get_db),
+    user: SupabaseUser = Depends(get_current_user)
+):
+    """Make a canary the active deployment, retiring the one it ran against."""
+    row = await _get_canary(db, canary_id, user.id)
+    
+    # Read the baseline under the environment lock. If a deploy committed
+    # meanwhile it retired this canary too, and the update below 404s
+    revision = await _next_revision(db, row.environment_id)
+    baseline = await _get_baseline(db, row.environment_id, row.prompt_id)
+    await _update_canary(
+        db, canary_id,
+        status=DeploymentStatus.ACTIVE,
+        traffic_percent=100,
+        revision=revision,
+        rolled_back_from_id=baseline.id if baseline else None
+    )
+    if baseline:
+        baseline.status = DeploymentStatus.ROLLED_BACK
+        baseline.revision = revision
+    
+    await db.commit()
+    await get_invalidation_bus().deployment_changed(user.id, row.environment_id, row.prompt_id)
+    
+    ActivityService().log_deployment(user.id, row.prompt_name, row.version_tag, row.environment_name, canary_id)
+    
+    response = _to_response(row)
+    response.status = DeploymentStatus.ACTIVE
+    response.traffic_percent = 100
+    response.revision = revision
+    response.rolled_back_from_id = baseline.id if baseline else None
+    return response
+
+
+@router.post("/canary/{canary_id}/abort", response_model=DeploymentResponse)
+async def abort_canary(
+    canary_id: int,
+    db: AsyncSession = Depends(get_db),
+    user: SupabaseUser = Depends(get_current_user)
+):
+    """Stop a canary; the active deployment takes all traffic again."""
+    row = await _get_canary(db, canary_id, user.id)
+    
+    revision = await _next_revision(db, row.environment_id)
+    await _update_canary(db, canary_id, status=DeploymentStatus.ROLLED_BACK, revision=revision)
+    await db.commit()
+    await get_invalidation_bus().deployment_changed(user.id, row.environment_id, row.prompt_id)
+    
+    ActivityService().log(
+        user_id=user.id,
+        action="deployment.canary_aborted",
+        message=f"Aborted canary of {row.prompt_name} {row.version_tag} in {row.environment_name}",
+        level=ActivityLevel.WARNING,
+        source="api",
+        extra_data={"deployment_id": canary_id, "environment": row.environment_name}
+    )
+    
+    response = _to_response(row)
+    response.status = DeploymentStatus.ROLLED_BACK
+    response.revision = revision
+    return response
+
+
+@router.get("/canary/{canary_id}/compare", response_model=CanaryComparison)
+async def compare_canary(
+    canary_id: int,
+    db: AsyncSession = Depends(get_db),
+    user: SupabaseUser = Depends(get_current_user)
+):
+    """
+    Compare the canary with the active deployment since the canary started.
+    Computed live from metrics, which record the deployment that served them.
+    """
+    row = await _get_canary(db, canary_id, user.id)
+    
+    baseline = await _get_baseline(db, row.environment_id, row.prompt_id)
+    if not baseline:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No active deployment to compare against"
+        )
+    
+    since = row.deployed_at or row.created_at
+    arms = {
+        arm.group_id: arm
+        for arm in await MetricsService(db).breakdown(
+            user.id, since, "deployment", group_ids=[canary_id, baseline.id]
+        )
+    }
+    
+    return CanaryComparison(
+        canary_id=canary_id,
+        baseline_id=baseline.id,
+        traffic_percent=row.traffic_percent,
+        since=since,
+        canary=arms.get(canary_id),
+        baseline=arms.get(baseline.id)
     )
 
 
+@router.get("/{deployment_id}", response_model=DeploymentResponse)
+async def get_deployment(
+    deployment_id: int,
+    db: AsyncSession = Depends(get_db),
+    user: SupabaseUser = Depends(get_current_user)
+):
+    """Get a deployment by ID."""
+    result = await db.execute(
+        _deployment_query()
+        .where(Deployment.id == deployment_id, Deployment.user_id == user.id)
+    )
+    row = result.first()
+    
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Deployment not found"
+        )
+    
+    return _to_response(row)
+
+
 @router.post("/{deployment_id}/rollback", response_model=DeploymentResponse)
 async def rollback_deployment(
     deployment_id: int,
@@ -226,53 +638,46 @@ async def rollback_deployment(
     user: SupabaseUser = Depends(get_current_user)
 ):
     """Rollback to a previous deployment."""
-    # Get the deployment to rollback to
+    # Get the deployment to rollback to, with its version and environment names
     result = await db.execute(
-        select(Deployment)
+        _deployment_query(PromptVersion.prompt_id)
         .where(Deployment.id == deployment_id, Deployment.user_id == user.id)
     )
-    target_deployment = result.scalar_one_or_none()
+    target = result.first()
     
-    if not target_deployment:
+    if not target:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Deployment not found"
         )
     
-    # Get version and environment info
-    version_result = await db.execute(
-        select(PromptVersion)
-        .options(selectinload(PromptVersion.prompt))
-        .where(PromptVersion.id == target_deployment.version_id)
-    )
-    version = version_result.scalar_one_or_none()
-    
-    env_result = await db.execute(
-        select(Environment).where(Environment.id == target_deployment.environment_id)
-    )
-    environment = env_result.scalar_one_or_none()
-    
-    # Find current active deployment
+    # Find current active deployment and the tag it serves; any canary is retired too.
+    # Read under the environment lock so concurrent writers can't both retire the same rows
+    revision = await _next_revision(db, target.environment_id)
     current_result = await db.execute(
-        select(Deployment)
-        .join(PromptVersion)
+        select(Deployment, PromptVersion.version_tag)
+        .join(PromptVersion, Deployment.version_id == PromptVersion.id)
         .where(
-            Deployment.environment_id == target_deployment.environment_id,
-            PromptVersion.prompt_id == version.prompt_id,
-            Deployment.status == DeploymentStatus.ACTIVE
+            Deployment.environment_id == target.environment_id,
+            PromptVersion.prompt_id == target.prompt_id,
+            Deployment.status.in_(LIVE_STATUSES)
         )
     )
-    current_deployment = current_result.scalar_one_or_none()
-    
-    if current_deployment:
-        current_deployment.status = DeploymentStatus.ROLLED_BACK
+    current = None
+    for row in current_result:
+        if row.Deployment.status == DeploymentStatus.ACTIVE:
+            current = row
+        row.Deployment.status = DeploymentStatus.ROLLED_BACK
+        row.Deployment.revision = revision
+    current_deployment = current.Deployment if current else None
     
     # Create new deployment as rollback
     rollback = Deployment(
-        version_id=target_deployment.version_id,
-        environment_id=target_deployment.environment_id,
+        version_id=target.version_id,
+        environment_id=target.environment_id,
         user_id=user.id,
         status=DeploymentStatus.ACTIVE,
+        revision=revision,
         notes=data.reason if data else "Rollback",
         rolled_back_from_id=current_deployment.id if current_deployment else None,
         deployed_at=datetime.utcnow()
@@ -280,20 +685,16 @@ async def rollback_deployment(
     db.add(rollback)
     await db.commit()
     await db.refresh(rollback)
+    await get_invalidation_bus().deployment_changed(user.id, target.environment_id, target.prompt_id)
     
     # Log activity
     if current_deployment:
-        current_version = await db.execute(
-            select(PromptVersion).where(PromptVersion.id == current_deployment.version_id)
-        )
-        cv = current_version.scalar_one_or_none()
-        activity_service = ActivityService(db)
-        await activity_service.log_rollback(
+        ActivityService().log_rollback(
             user.id,
-            version.prompt.name,
-            cv.version_tag if cv else "unknown",
-            version.version_tag,
-            environment.name
+            target.prompt_name,
+            current.version_tag,
+            target.version_tag,
+            target.environment_name
         )
     
     return DeploymentResponse(
@@ -302,13 +703,14 @@ async def rollback_deployment(
         environment_id=rollback.environment_id,
         user_id=rollback.user_id,
         status=rollback.status,
+        revision=rollback.revision,
         notes=rollback.notes,
         rolled_back_from_id=rollback.rolled_back_from_id,
         created_at=rollback.created_at,
         deployed_at=rollback.deployed_at,
-        version_tag=version.version_tag,
-        prompt_name=version.prompt.name,
-        environment_name=environment.name
+        version_tag=target.version_tag,
+        prompt_name=target.prompt_name,
+        environment_name=target.environment_name
     )
 
 
@@ -316,53 +718,97 @@ async def rollback_deployment(
 async def get_active_deployment(
     environment_id: int,
     prompt_id: int,
-    db: AsyncSession = Depends(get_db),
-    user: SupabaseUser = Depends(get_current_user)
+    response: Response,
+    if_none_match: Optional[str] = Header(default=None),
+    user: SupabaseUser = Depends(get_current_user),
+    resolver: DeploymentResolver = Depends(get_deployment_resolver)
 ):
-    """Get the currently active deployment for a prompt in an environment."""
-    result = await db.execute(
-        select(Deployment)
-        .join(PromptVersion)
-        .join(Prompt)
-        .where(
-            Deployment.environment_id == environment_id,
-            Prompt.id == prompt_id,
-            Deployment.user_id == user.id,
-            Deployment.status == DeploymentStatus.ACTIVE
-        )
-    )
-    deployment = result.scalar_one_or_none()
+    """
+    Get the currently active deployment for a prompt in an environment.
+    Served from the deployment resolver cache.
+    Supports conditional GET: a matching If-None-Match returns 304.
+    """
+    resolved = await resolver.resolve(user.id, environment_id, prompt_id)
     
-    if not deployment:
+    if not resolved:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No active deployment found"
         )
     
-    # Fetch related data
-    version_result = await db.execute(
-        select(PromptVersion)
-        .options(selectinload(PromptVersion.prompt))
-        .where(PromptVersion.id == deployment.version_id)
+    # Deployments are immutable apart from status, so the active row's ID plus
+    # the names shown alongside it identify the response
+    etag = make_etag(
+        "active-deployment",
+        resolved.deployment_id,
+        resolved.prompt_name,
+        resolved.prompt_updated_at,
+        resolved.environment_name
     )
-    version = version_result.scalar_one_or_none()
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
     
-    env_result = await db.execute(
-        select(Environment).where(Environment.id == deployment.environment_id)
-    )
-    env = env_result.scalar_one_or_none()
+    set_cache_headers(response, etag)
+    return resolved.response
+
+
+@router.get("/watch/{environment_id}", response_model=DeploymentWatchResponse)
+async def watch_deployments(
+    environment_id: int,
+    revision: int = Query(default=0, ge=0, description="Last revision seen; 0 for a full snapshot"),
+    timeout: float = Query(default=30, ge=0, description="Seconds to wait for a change"),
+    db: AsyncSession = Depends(get_db),
+    user: SupabaseUser = Depends(get_current_user),
+    watch: DeploymentWatch = Depends(get_deployment_watch)
+):
+    """
+    Long-poll an environment for deployment changes.
+    Returns as soon as the environment moves past `revision`, with only the
+    deployments written since; returns no changes once the timeout passes.
+    """
+    deadline = time.monotonic() + min(timeout, settings.deployment_watch_max_timeout_seconds)
     
-    return DeploymentResponse(
-        id=deployment.id,
-        version_id=deployment.version_id,
-        environment_id=deployment.environment_id,
-        user_id=deployment.user_id,
-        status=deployment.status,
-        notes=deployment.notes,
-        rolled_back_from_id=deployment.rolled_back_from_id,
-        created_at=deployment.created_at,
-        deployed_at=deployment.deployed_at,
-        version_tag=version.version_tag if version else None,
-        prompt_name=version.prompt.name if version and version.prompt else None,
-        environment_name=env.name if env else None
+    while True:
+        # Take the event before reading, so a change in between still wakes us
+        event = watch.event(environment_id)
+        result = await db.execute(
+            select(Environment.revision, Environment.snapshot_revision)
+            .where(Environment.id == environment_id, Environment.user_id == user.id)
+        )
+        row = result.first()
+        
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Environment not found"
+            )
+        current, snapshot_revision = row
+        if revision == 0 or current != revision:
+            break
+        
+        # Hand the connection back to the pool while idle
+        await db.rollback()
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or not await watch.wait(event, remaining):
+            return DeploymentWatchResponse(environment_id=environment_id, revision=current)
+    
+    # A client ahead of the server (e.g. after a restore) starts over too, as
+    # does one behind a deletion, whose rows can't be sent as changes
+    snapshot = revision == 0 or revision > current or revision < snapshot_revision
+    query = _deployment_query().where(Deployment.environment_id == environment_id)
+    if snapshot:
+        query = query.where(Deployment.status.in_(LIVE_STATUSES))
+    else:
+        # Retired rows are included so clients can drop them
+        query = query.where(Deployment.revision > revision)
+    
+    result = await db.execute(query.order_by(Deployment.revision, Deployment.id))
+    changed = [_to_response(row) for row in result]
+    
+    return DeploymentWatchResponse(
+        environment_id=environment_id,
+        # Writes committed after the revision was read may already be included
+        revision=max([current] + [deployment.revision for deployment in changed]),
+        snapshot=snapshot,
+        changed=changed
     )
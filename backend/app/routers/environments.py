@@ -2,14 +2,18 @@
 Environments API router - Manage deployment environments.
 """
 
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+import gzip
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.database import get_db
 from app.deps import get_current_user
+from app.http_cache import make_etag, etag_matches, set_cache_headers, not_modified
 from app.services.supabase_auth import SupabaseUser
+from app.services.invalidation import get_invalidation_bus
+from app.services.environment_bundle import BundleCache, get_bundle_cache
 from app.models.environment import Environment
 from app.schemas.environment import EnvironmentCreate, EnvironmentResponse
 
@@ -104,6 +108,7 @@ async def create_environment(
     db.add(environment)
     await db.commit()
     await db.refresh(environment)
+    await get_invalidation_bus().environment_changed(user.id, environment.id)
     
     return environment
 
@@ -130,6 +135,54 @@ async def get_environment(
     return environment
 
 
+@router.get("/{env_id}/bundle")
+async def get_environment_bundle(
+    env_id: int,
+    since: Optional[str] = Query(default=None, description="Hash of a bundle the client already has"),
+    if_none_match: Optional[str] = Header(default=None),
+    accept_encoding: Optional[str] = Header(default=None),
+    db: AsyncSession = Depends(get_db),
+    user: SupabaseUser = Depends(get_current_user),
+    cache: BundleCache = Depends(get_bundle_cache)
+):
+    """
+    Every active prompt in the environment as one gzipped JSON bundle.
+    With `since`, returns only the prompts changed or removed after that
+    bundle; if it is no longer known, the full bundle is returned instead
+    (check the `delta` field). The bundle hash is also sent as X-Bundle-Hash.
+    """
+    result = await db.execute(
+        select(Environment.name, Environment.revision)
+        .where(Environment.id == env_id, Environment.user_id == user.id)
+    )
+    row = result.first()
+    
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Environment not found"
+        )
+    
+    bundle = await cache.get(user.id, env_id, row.name, row.revision)
+    data = cache.delta(bundle, since) if since else None
+    base = since if data is not None else None
+    if data is None:
+        data = bundle.data
+    
+    etag = make_etag("environment-bundle", bundle.hash, base)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    
+    if accept_encoding and "gzip" in accept_encoding:
+        response = Response(content=data, media_type="application/json", headers={"Content-Encoding": "gzip"})
+    else:
+        response = Response(content=gzip.decompress(data), media_type="application/json")
+    set_cache_headers(response, etag)
+    response.headers["Vary"] = "Authorization, Accept-Encoding"
+    response.headers["X-Bundle-Hash"] = bundle.hash
+    return response
+
+
 @router.delete("/{env_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_environment(
     env_id: int,
@@ -151,3 +204,4 @@ async def delete_environment(
     
     await db.delete(environment)
     await db.commit()
+    await get_invalidation_bus().environment_changed(user.id, env_id)
@@ -3,24 +3,36 @@ Experiments API router - A/B testing functionality.
 """
 
 from typing import List
-from datetime import datetime
+from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 
+from app.config import get_settings
 from app.database import get_db
 from app.deps import get_current_user
 from app.services.supabase_auth import SupabaseUser
+from app.services.gemini import GeminiService, get_gemini_service
+from app.services.activity import ActivityService
+from app.services.metrics_cache import get_metrics_cache
+from app.services.variant_stats import get_variant_stats
+from app.services.experiment_router import ExperimentRouter, get_experiment_router
+from app.services.experiment_analysis import ExperimentAnalyzer, get_experiment_analyzer
+from app.services.bandit import BanditAllocator, get_bandit_allocator
+from app.services.invalidation import get_invalidation_bus
 from app.models.experiment import Experiment, ExperimentVariant, ExperimentStatus
+from app.models.metric import Metric
 from app.models.prompt import Prompt
 from app.schemas.experiment import (
     ExperimentCreate, ExperimentUpdate, ExperimentResponse,
-    ExperimentVariantCreate, ExperimentVariantResponse
+    ExperimentVariantCreate, ExperimentVariantResponse,
+    ExperimentServeRequest, ExperimentServeResponse, ExperimentAnalysis
 )
 
 
 router = APIRouter(prefix="/experiments", tags=["Experiments"])
+settings = get_settings()
 
 
 @router.get("", response_model=List[ExperimentResponse])
@@ -80,7 +92,9 @@ async def create_experiment(
         name=data.name,
         description=data.description,
         status=ExperimentStatus.DRAFT,
-        traffic_allocation=traffic_allocation
+        traffic_allocation=traffic_allocation,
+        target_sample_size=data.target_sample_size,
+        allocation_mode=data.allocation_mode
     )
     db.add(experiment)
     await db.flush()
@@ -162,6 +176,10 @@ async def update_experiment(
         experiment.name = data.name
     if data.description is not None:
         experiment.description = data.description
+    if data.target_sample_size is not None:
+        experiment.target_sample_size = data.target_sample_size
+    if data.allocation_mode is not None:
+        experiment.allocation_mode = data.allocation_mode
     if data.status is not None:
         # Handle status transitions
         if data.status == ExperimentStatus.RUNNING and experiment.status == ExperimentStatus.DRAFT:
@@ -172,6 +190,9 @@ async def update_experiment(
     
     await db.commit()
     await db.refresh(experiment)
+    await get_invalidation_bus().experiment_changed(user.id, experiment_id)
+    if experiment.status == ExperimentStatus.COMPLETED:
+        get_experiment_analyzer().forget(experiment_id)
     
     return experiment
 
@@ -198,6 +219,9 @@ async def delete_experiment(
     
     await db.delete(experiment)
     await db.commit()
+    await get_invalidation_bus().experiment_changed(user.id, experiment_id)
+    get_experiment_analyzer().forget(experiment_id)
+    get_bandit_allocator().forget(experiment_id)
 
 
 @router.post("/{experiment_id}/start", response_model=ExperimentResponse)
@@ -232,6 +256,7 @@ async def start_experiment(
     
     await db.commit()
     await db.refresh(experiment)
+    await get_invalidation_bus().experiment_changed(user.id, experiment_id)
     
     return experiment
 
@@ -243,6 +268,9 @@ async def stop_experiment(
     user: SupabaseUser = Depends(get_current_user)
 ):
     """Stop a running experiment."""
+    # Final results should include everything recorded on this worker
+    await get_variant_stats().flush()
+    
     result = await db.execute(
         select(Experiment)
         .join(Prompt)
@@ -280,14 +308,135 @@ async def stop_experiment(
             "avg_tokens": round(variant.avg_tokens, 2)
         })
     
-    # Determine winner (highest success rate)
-    if variants_data:
-        winner = max(variants_data, key=lambda x: x["success_rate"])
-        experiment.winner_variant_id = winner["id"]
+    # Declare a winner only if the difference is statistically significant
+    analysis = await get_experiment_analyzer().analyze(db, experiment, user.id)
+    experiment.winner_variant_id = analysis.winner_variant_id
     
-    experiment.results = {"variants": variants_data}
+    experiment.results = {"variants": variants_data, "analysis": analysis.model_dump(mode="json")}
     
     await db.commit()
     await db.refresh(experiment)
+    await get_invalidation_bus().experiment_changed(user.id, experiment_id)
     
     return experiment
+
+
+@router.get("/{experiment_id}/analysis", response_model=ExperimentAnalysis)
+async def analyze_experiment(
+    experiment_id: int,
+    db: AsyncSession = Depends(get_db),
+    user: SupabaseUser = Depends(get_current_user),
+    analyzer: ExperimentAnalyzer = Depends(get_experiment_analyzer)
+):
+    """
+    Significance of each variant against the control.
+    Running experiments are re-analysed at most every few seconds, reading
+    only requests since the last look; the result is cached in `results`.
+    """
+    result = await db.execute(
+        select(Experiment)
+        .join(Prompt)
+        .where(Experiment.id == experiment_id, Prompt.user_id == user.id)
+        .options(selectinload(Experiment.variants))
+    )
+    experiment = result.scalar_one_or_none()
+    
+    if not experiment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Experiment not found"
+        )
+    
+    cached = (experiment.results or {}).get("analysis")
+    if cached:
+        age = datetime.now(timezone.utc) - datetime.fromisoformat(cached["computed_at"])
+        if experiment.status != ExperimentStatus.RUNNING or age.total_seconds() < settings.experiment_analysis_ttl_seconds:
+            return ExperimentAnalysis.model_validate(cached)
+    
+    analysis = await analyzer.analyze(db, experiment, user.id)
+    
+    # Reassign so the JSON column is marked dirty
+    experiment.results = {**(experiment.results or {}), "analysis": analysis.model_dump(mode="json")}
+    await db.commit()
+    
+    return analysis
+
+
+@router.post("/{experiment_id}/serve", response_model=ExperimentServeResponse)
+async def serve_experiment(
+    experiment_id: int,
+    data: ExperimentServeRequest,
+    db: AsyncSession = Depends(get_db),
+    user: SupabaseUser = Depends(get_current_user),
+    gemini: GeminiService = Depends(get_gemini_service),
+    experiments: ExperimentRouter = Depends(get_experiment_router),
+    bandit: BanditAllocator = Depends(get_bandit_allocator)
+):
+    """
+    Run a running experiment for one caller.
+    With fixed allocation the variant is picked by hashing the assignment key
+    over the variants' traffic weights, so a caller always gets the same
+    variant. In bandit modes each request is allocated by the bandit, which
+    learns from the result.
+    """
+    table = await experiments.get(user.id, experiment_id)
+    
+    if not table:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Experiment not found"
+        )
+    
+    if not table.running:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Can only serve experiments in RUNNING status"
+        )
+    
+    variant = bandit.choose(table) if table.bandit else table.assign(data.assignment_key)
+    result = await gemini.generate(
+        system_prompt=variant.system_prompt,
+        user_prompt=variant.template.render(data.variables),
+        model=variant.model,
+        temperature=variant.temperature,
+        max_tokens=data.max_tokens
+    )
+    
+    # Store metric
+    metric = Metric(
+        user_id=user.id,
+        prompt_id=table.prompt_id,
+        experiment_variant_id=variant.id,
+        model=variant.model,
+        latency_ms=result.latency_ms,
+        input_tokens=result.input_tokens,
+        output_tokens=result.output_tokens,
+        total_tokens=result.total_tokens,
+        estimated_cost_cents=result.estimated_cost_cents,
+        success=result.success,
+        error_message=result.error
+    )
+    db.add(metric)
+    await db.commit()
+    get_metrics_cache().bump(user.id)
+    get_variant_stats().record(user.id, variant.id, result.success, result.latency_ms, result.total_tokens)
+    if table.bandit:
+        bandit.update(table, variant.id, result.success, result.latency_ms, result.estimated_cost_cents)
+    
+    # Log activity
+    ActivityService().log_inference(user.id, variant.model, result.latency_ms, result.success)
+    
+    return ExperimentServeResponse(
+        text=result.text,
+        model=result.model,
+        latency_ms=result.latency_ms,
+        input_tokens=result.input_tokens,
+        output_tokens=result.output_tokens,
+        total_tokens=result.total_tokens,
+        estimated_cost_cents=result.estimated_cost_cents,
+        success=result.success,
+        error=result.error,
+        experiment_id=experiment_id,
+        variant_id=variant.id,
+        variant_name=variant.name
+    )
@@ -15,9 +15,16 @@ from app.deps import get_current_user
 from app.services.supabase_auth import SupabaseUser
 from app.services.gemini import GeminiService, get_gemini_service
 from app.services.activity import ActivityService
+from app.services.metrics_cache import get_metrics_cache
+from app.services.variant_stats import get_variant_stats
+from app.services.templates import TemplateCache, get_template_cache
+from app.services.deployment_resolver import DeploymentResolver, get_deployment_resolver
 from app.models.metric import Metric
 from app.models.prompt import Prompt, PromptVersion
-from app.schemas.inference import InferenceRequest, InferenceResponse, InferenceTestRequest
+from app.schemas.inference import (
+    InferenceRequest, InferenceResponse, InferenceTestRequest,
+    DeployedInferenceRequest, DeployedInferenceResponse
+)
 
 
 router = APIRouter(prefix="/inference", tags=["Inference"])
@@ -61,10 +68,15 @@ async def run_inference(
     )
     db.add(metric)
     await db.commit()
+    get_metrics_cache().bump(user.id)
+    
+    if data.experiment_variant_id is not None:
+        get_variant_stats().record(
+            user.id, data.experiment_variant_id, result.success, result.latency_ms, result.total_tokens
+        )
     
     # Log activity
-    activity_service = ActivityService(db)
-    await activity_service.log_inference(user.id, data.model, result.latency_ms, result.success)
+    ActivityService().log_inference(user.id, data.model, result.latency_ms, result.success)
     
     return InferenceResponse(
         text=result.text,
@@ -126,7 +138,8 @@ async def test_prompt_version(
     data: InferenceTestRequest,
     db: AsyncSession = Depends(get_db),
     user: SupabaseUser = Depends(get_current_user),
-    gemini: GeminiService = Depends(get_gemini_service)
+    gemini: GeminiService = Depends(get_gemini_service),
+    templates: TemplateCache = Depends(get_template_cache)
 ):
     """
     Test a specific prompt version with provided variables.
@@ -149,11 +162,13 @@ async def test_prompt_version(
             detail="Version not found"
         )
     
+    # Render from the compiled template cached for this version's blob
+    user_prompt = templates.render(version.user_prompt_hash, version.user_prompt, data.variables)
+    
     # Run inference
     inference_result = await gemini.generate(
         system_prompt=version.system_prompt,
-        user_prompt=version.user_prompt,
-        variables=data.variables,
+        user_prompt=user_prompt,
         model=version.model,
         temperature=version.temperature,
         max_tokens=version.max_tokens
@@ -175,6 +190,7 @@ async def test_prompt_version(
     )
     db.add(metric)
     await db.commit()
+    get_metrics_cache().bump(user.id)
     
     return InferenceResponse(
         text=inference_result.text,
@@ -187,3 +203,76 @@ async def test_prompt_version(
         success=inference_result.success,
         error=inference_result.error
     )
+
+
+@router.post("/deployed", response_model=DeployedInferenceResponse)
+async def run_deployed(
+    data: DeployedInferenceRequest,
+    db: AsyncSession = Depends(get_db),
+    user: SupabaseUser = Depends(get_current_user),
+    gemini: GeminiService = Depends(get_gemini_service),
+    resolver: DeploymentResolver = Depends(get_deployment_resolver)
+):
+    """
+    Run the version currently deployed to an environment.
+    The deployment is resolved server-side, so callers only send variables.
+    """
+    if data.prompt_id is not None:
+        resolved = await resolver.resolve_in_environment(user.id, data.environment, data.prompt_id)
+    else:
+        resolved = await resolver.resolve_by_name(user.id, data.environment, data.prompt_name)
+    
+    if not resolved:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No active deployment found"
+        )
+    
+    # Canary or active deployment; metrics record which one served the request
+    arm = resolver.pick(resolved, data.assignment_key)
+    
+    result = await gemini.generate(
+        system_prompt=arm.system_prompt,
+        user_prompt=arm.template.render(data.variables),
+        model=arm.model,
+        temperature=arm.temperature,
+        max_tokens=arm.max_tokens
+    )
+    
+    # Store metric
+    metric = Metric(
+        user_id=user.id,
+        deployment_id=arm.deployment_id,
+        prompt_id=arm.prompt_id,
+        version_id=arm.version_id,
+        model=arm.model,
+        latency_ms=result.latency_ms,
+        input_tokens=result.input_tokens,
+        output_tokens=result.output_tokens,
+        total_tokens=result.total_tokens,
+        estimated_cost_cents=result.estimated_cost_cents,
+        success=result.success,
+        error_message=result.error
+    )
+    db.add(metric)
+    await db.commit()
+    get_metrics_cache().bump(user.id)
+    
+    # Log activity
+    ActivityService().log_inference(user.id, arm.model, result.latency_ms, result.success)
+    
+    return DeployedInferenceResponse(
+        text=result.text,
+        model=result.model,
+        latency_ms=result.latency_ms,
+        input_tokens=result.input_tokens,
+        output_tokens=result.output_tokens,
+        total_tokens=result.total_tokens,
+        estimated_cost_cents=result.estimated_cost_cents,
+        success=result.success,
+        error=result.error,
+        deployment_id=arm.deployment_id,
+        prompt_id=arm.prompt_id,
+        version_id=arm.version_id,
+        version_tag=arm.version_tag
+    )
@@ -11,61 +11,37 @@ from sqlalchemy import select, func, and_
 from app.database import get_db
 from app.deps import get_current_user
 from app.services.supabase_auth import SupabaseUser
+from app.services.metrics import MetricsService, MetricGroup, TimeBucket
+from app.services.metrics_cache import MetricsCache, get_metrics_cache
 from app.models.metric import Metric
-from app.schemas.metric import MetricResponse, MetricsOverview, MetricsTimeSeriesResponse, LatencyData, CostData
+from app.schemas.metric import (
+    MetricResponse, MetricsOverview, MetricsTimeSeriesResponse, LatencyData, CostData,
+    MetricsBreakdown, MetricsSeriesPoint
+)
 
 
 router = APIRouter(prefix="/metrics", tags=["Metrics"])
 
 
+def _since(days: int) -> datetime:
+    """Start of the metrics window, evaluated when the aggregate is computed."""
+    return datetime.utcnow() - timedelta(days=days)
+
+
 @router.get("/overview", response_model=MetricsOverview)
 async def get_metrics_overview(
     days: int = Query(default=7, ge=1, le=90),
     db: AsyncSession = Depends(get_db),
-    user: SupabaseUser = Depends(get_current_user)
+    user: SupabaseUser = Depends(get_current_user),
+    cache: MetricsCache = Depends(get_metrics_cache)
 ):
     """Get aggregated metrics overview for the dashboard."""
-    since = datetime.utcnow() - timedelta(days=days)
-    
-    # Get all metrics in time range
-    result = await db.execute(
-        select(Metric)
-        .where(
-            Metric.user_id == user.id,
-            Metric.timestamp >= since
-        )
-    )
-    metrics = result.scalars().all()
-    
-    if not metrics:
-        return MetricsOverview()
-    
-    # Calculate aggregates
-    total_requests = len(metrics)
-    successful = sum(1 for m in metrics if m.success)
-    success_rate = (successful / total_requests * 100) if total_requests > 0 else 0
-    
-    latencies = [m.latency_ms for m in metrics]
-    avg_latency = sum(latencies) / len(latencies) if latencies else 0
-    
-    # Calculate percentiles
-    sorted_latencies = sorted(latencies)
-    p95_idx = int(len(sorted_latencies) * 0.95)
-    p99_idx = int(len(sorted_latencies) * 0.99)
-    p95_latency = sorted_latencies[p95_idx] if sorted_latencies else 0
-    p99_latency = sorted_latencies[p99_idx] if sorted_latencies else 0
-    
-    total_tokens = sum(m.total_tokens for m in metrics)
-    total_cost = sum(m.estimated_cost_cents for m in metrics)
-    
-    return MetricsOverview(
-        total_requests=total_requests,
-        success_rate=round(success_rate, 2),
-        avg_latency_ms=round(avg_latency, 2),
-        p95_latency_ms=round(p95_latency, 2),
-        p99_latency_ms=round(p99_latency, 2),
-        total_tokens=total_tokens,
-        total_cost_cents=round(total_cost, 4)
+    return await cache.get_or_load(
+        user.id,
+        "overview",
+        {"days": days},
+        lambda session: MetricsService(session).overview(user.id, _since(days)),
+        db
     )
 
 
@@ -73,79 +49,34 @@ async def get_metrics_overview(
 async def get_latency_data(
     days: int = Query(default=7, ge=1, le=90),
     db: AsyncSession = Depends(get_db),
-    user: SupabaseUser = Depends(get_current_user)
+    user: SupabaseUser = Depends(get_current_user),
+    cache: MetricsCache = Depends(get_metrics_cache)
 ):
     """Get latency time series data."""
-    since = datetime.utcnow() - timedelta(days=days)
-    
-    # Get metrics grouped by hour
-    result = await db.execute(
-        select(Metric)
-        .where(
-            Metric.user_id == user.id,
-            Metric.timestamp >= since
-        )
-        .order_by(Metric.timestamp)
+    return await cache.get_or_load(
+        user.id,
+        "latency",
+        {"days": days},
+        lambda session: MetricsService(session).latency(user.id, _since(days)),
+        db
     )
-    metrics = result.scalars().all()
-    
-    # Group by hour
-    hourly_data = {}
-    for m in metrics:
-        hour_key = m.timestamp.replace(minute=0, second=0, microsecond=0)
-        if hour_key not in hourly_data:
-            hourly_data[hour_key] = []
-        hourly_data[hour_key].append(m.latency_ms)
-    
-    # Calculate per-hour stats
-    response = []
-    for timestamp, latencies in hourly_data.items():
-        sorted_lat = sorted(latencies)
-        p95_idx = int(len(sorted_lat) * 0.95)
-        response.append(LatencyData(
-            timestamp=timestamp,
-            avg_latency_ms=round(sum(latencies) / len(latencies), 2),
-            p95_latency_ms=sorted_lat[p95_idx] if sorted_lat else 0,
-            request_count=len(latencies)
-        ))
-    
-    return response
 
 
 @router.get("/costs", response_model=List[CostData])
 async def get_cost_data(
     days: int = Query(default=30, ge=1, le=90),
     db: AsyncSession = Depends(get_db),
-    user: SupabaseUser = Depends(get_current_user)
+    user: SupabaseUser = Depends(get_current_user),
+    cache: MetricsCache = Depends(get_metrics_cache)
 ):
     """Get cost breakdown by day."""
-    since = datetime.utcnow() - timedelta(days=days)
-    
-    result = await db.execute(
-        select(Metric)
-        .where(
-            Metric.user_id == user.id,
-            Metric.timestamp >= since
-        )
-        .order_by(Metric.timestamp)
+    return await cache.get_or_load(
+        user.id,
+        "costs",
+        {"days": days},
+        lambda session: MetricsService(session).costs(user.id, _since(days)),
+        db
     )
-    metrics = result.scalars().all()
-    
-    # Group by day
-    daily_data = {}
-    for m in metrics:
-        day_key = m.timestamp.strftime("%Y-%m-%d")
-        if day_key not in daily_data:
-            daily_data[day_key] = {"cost": 0, "tokens": 0}
-        daily_data[day_key]["cost"] += m.estimated_cost_cents
-        daily_data[day_key]["tokens"] += m.total_tokens
-    
-    response = [
-        CostData(date=day, cost_cents=round(data["cost"], 4), token_count=data["tokens"])
-        for day, data in daily_data.items()
-    ]
-    
-    return response
 
 
 @router.get("/recent", response_model=List[MetricResponse])
@@ -170,47 +101,102 @@ async def get_recent_metrics(
 async def get_metrics_by_model(
     days: int = Query(default=30, ge=1, le=90),
     db: AsyncSession = Depends(get_db),
-    user: SupabaseUser = Depends(get_current_user)
+    user: SupabaseUser = Depends(get_current_user),
+    cache: MetricsCache = Depends(get_metrics_cache)
 ):
     """Get metrics breakdown by model."""
-    since = datetime.utcnow() - timedelta(days=days)
-    
-    result = await db.execute(
-        select(Metric)
-        .where(
-            Metric.user_id == user.id,
-            Metric.timestamp >= since
-        )
+    return await cache.get_or_load(
+        user.id,
+        "by-model",
+        {"days": days},
+        lambda session: MetricsService(session).by_model(user.id, _since(days)),
+        db
+    )
+
+
+@router.get("/by-deployment", response_model=List[MetricsBreakdown])
+async def get_metrics_by_deployment(
+    days: int = Query(default=7, ge=1, le=90),
+    prompt_id: Optional[int] = None,
+    environment_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db),
+    user: SupabaseUser = Depends(get_current_user),
+    cache: MetricsCache = Depends(get_metrics_cache)
+):
+    """Get metrics breakdown by deployment."""
+    return await cache.get_or_load(
+        user.id,
+        "by-deployment",
+        {"days": days, "prompt_id": prompt_id, "environment_id": environment_id},
+        lambda session: MetricsService(session).breakdown(
+            user.id, _since(days), "deployment", prompt_id=prompt_id, environment_id=environment_id
+        ),
+        db
+    )
+
+
+@router.get("/by-version", response_model=List[MetricsBreakdown])
+async def get_metrics_by_version(
+    days: int = Query(default=7, ge=1, le=90),
+    prompt_id: Optional[int] = None,
+    version_ids: Optional[List[int]] = Query(default=None),
+    db: AsyncSession = Depends(get_db),
+    user: SupabaseUser = Depends(get_current_user),
+    cache: MetricsCache = Depends(get_metrics_cache)
+):
+    """
+    Get metrics breakdown by prompt version.
+    Pass several version_ids to compare versions side by side.
+    """
+    return await cache.get_or_load(
+        user.id,
+        "by-version",
+        {"days": days, "prompt_id": prompt_id, "version_ids": version_ids},
+        lambda session: MetricsService(session).breakdown(
+            user.id, _since(days), "version", prompt_id=prompt_id, group_ids=version_ids
+        ),
+        db
+    )
+
+
+@router.get("/by-prompt", response_model=List[MetricsBreakdown])
+async def get_metrics_by_prompt(
+    days: int = Query(default=7, ge=1, le=90),
+    db: AsyncSession = Depends(get_db),
+    user: SupabaseUser = Depends(get_current_user),
+    cache: MetricsCache = Depends(get_metrics_cache)
+):
+    """Get metrics breakdown by prompt."""
+    return await cache.get_or_load(
+        user.id,
+        "by-prompt",
+        {"days": days},
+        lambda session: MetricsService(session).breakdown(user.id, _since(days), "prompt"),
+        db
+    )
+
+
+@router.get("/series", response_model=List[MetricsSeriesPoint])
+async def get_metrics_series(
+    group_by: MetricGroup = "version",
+    bucket: TimeBucket = "hour",
+    days: int = Query(default=7, ge=1, le=90),
+    prompt_id: Optional[int] = None,
+    ids: Optional[List[int]] = Query(default=None, description="Restrict to these deployment/version/prompt IDs"),
+    db: AsyncSession = Depends(get_db),
+    user: SupabaseUser = Depends(get_current_user),
+    cache: MetricsCache = Depends(get_metrics_cache)
+):
+    """Get time-bucketed latency, error-rate and cost series per group."""
+    return await cache.get_or_load(
+        user.id,
+        "series",
+        {
+            "group_by": group_by, "bucket": bucket, "days": days,
+            "prompt_id": prompt_id, "ids": ids
+        },
+        lambda session: MetricsService(session).series(
+            user.id, _since(days), group_by, bucket=bucket, prompt_id=prompt_id, group_ids=ids
+        ),
+        db
     )
-    metrics = result.scalars().all()
-    
-    # Group by model
-    model_data = {}
-    for m in metrics:
-        if m.model not in model_data:
-            model_data[m.model] = {
-                "request_count": 0,
-                "success_count": 0,
-                "total_latency": 0,
-                "total_tokens": 0,
-                "total_cost": 0
-            }
-        model_data[m.model]["request_count"] += 1
-        if m.success:
-            model_data[m.model]["success_count"] += 1
-        model_data[m.model]["total_latency"] += m.latency_ms
-        model_data[m.model]["total_tokens"] += m.total_tokens
-        model_data[m.model]["total_cost"] += m.estimated_cost_cents
-    
-    response = []
-    for model, data in model_data.items():
-        response.append({
-            "model": model,
-            "request_count": data["request_count"],
-            "success_rate": round(data["success_count"] / data["request_count"] * 100, 2) if data["request_count"] > 0 else 0,
-            "avg_latency_ms": round(data["total_latency"] / data["request_count"], 2) if data["request_count"] > 0 else 0,
-            "total_tokens": data["total_tokens"],
-            "total_cost_cents": round(data["total_cost"], 4)
-        })
-    
-    return response
@@ -2,56 +2,89 @@
 Prompts API router - CRUD operations for prompts and versions.
 """
 
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, update
 from sqlalchemy.orm import selectinload
 
 from app.database import get_db
 from app.deps import get_current_user
+from app.http_cache import make_etag, etag_matches, set_cache_headers, not_modified
 from app.services.supabase_auth import SupabaseUser
 from app.services.activity import ActivityService
+from app.services.prompt_blobs import set_version_text
+from app.services.prompt_diff import DiffCache, get_diff_cache
+from app.services.invalidation import get_invalidation_bus
 from app.models.prompt import Prompt, PromptVersion
+from app.models.deployment import Deployment
+from app.models.environment import Environment
 from app.schemas.prompt import (
     PromptCreate, PromptUpdate, PromptResponse, PromptListResponse,
-    PromptVersionCreate, PromptVersionResponse
+    PromptVersionCreate, PromptVersionResponse, PromptVersionDiff
 )
 
 
 router = APIRouter(prefix="/prompts", tags=["Prompts"])
 
 
+PromptSort = Literal["updated_at", "created_at", "name"]
+SortOrder = Literal["asc", "desc"]
+
+
 @router.get("", response_model=List[PromptListResponse])
 async def list_prompts(
+    limit: Optional[int] = Query(default=None, ge=1, le=200, description="Page size; all prompts when omitted"),
+    offset: int = Query(default=0, ge=0),
+    sort: PromptSort = "updated_at",
+    order: SortOrder = "desc",
     db: AsyncSession = Depends(get_db),
     user: SupabaseUser = Depends(get_current_user)
 ):
-    """List all prompts for the current user."""
-    result = await db.execute(
-        select(Prompt)
+    """
+    List prompts for the current user, paginated when `limit` is given.
+    Version info is aggregated in SQL, so no version bodies are loaded.
+    """
+    latest_version = (
+        select(PromptVersion.version_tag)
+        .where(PromptVersion.prompt_id == Prompt.id)
+        .order_by(PromptVersion.created_at.desc(), PromptVersion.id.desc())
+        .limit(1)
+        .correlate(Prompt)
+        .scalar_subquery()
+    )
+    version_count = (
+        select(func.count(PromptVersion.id))
+        .where(PromptVersion.prompt_id == Prompt.id)
+        .correlate(Prompt)
+        .scalar_subquery()
+    )
+    
+    sort_column = getattr(Prompt, sort)
+    direction = sort_column.asc() if order == "asc" else sort_column.desc()
+    tiebreak = Prompt.id.asc() if order == "asc" else Prompt.id.desc()
+    
+    query = (
+        select(
+            Prompt.id,
+            Prompt.user_id,
+            Prompt.name,
+            Prompt.description,
+            Prompt.created_at,
+            Prompt.updated_at,
+            latest_version.label("latest_version"),
+            version_count.label("version_count")
+        )
         .where(Prompt.user_id == user.id)
-        .options(selectinload(Prompt.versions))
-        .order_by(Prompt.updated_at.desc())
+        .order_by(direction, tiebreak)
+        .offset(offset)
     )
-    prompts = result.scalars().all()
+    if limit is not None:
+        query = query.limit(limit)
     
-    # Transform to list response with version info
-    response = []
-    for prompt in prompts:
-        latest_version = prompt.versions[0].version_tag if prompt.versions else None
-        response.append(PromptListResponse(
-            id=prompt.id,
-            user_id=prompt.user_id,
-            name=prompt.name,
-            description=prompt.description,
-            created_at=prompt.created_at,
-            updated_at=prompt.updated_at,
-            latest_version=latest_version,
-            version_count=len(prompt.versions)
-        ))
+    result = await db.execute(query)
     
-    return response
+    return [PromptListResponse.model_validate(dict(row._mapping)) for row in result]
 
 
 @router.post("", response_model=PromptResponse, status_code=status.HTTP_201_CREATED)
@@ -75,22 +108,20 @@ async def create_prompt(
         version = PromptVersion(
             prompt_id=prompt.id,
             version_tag=data.initial_version.version_tag,
-            system_prompt=data.initial_version.system_prompt,
-            user_prompt=data.initial_version.user_prompt,
             model=data.initial_version.model,
             temperature=data.initial_version.temperature,
             max_tokens=data.initial_version.max_tokens,
             commit_message=data.initial_version.commit_message,
             variables=data.initial_version.variables
         )
+        await set_version_text(db, version, data.initial_version.system_prompt, data.initial_version.user_prompt)
         db.add(version)
     
     await db.commit()
     await db.refresh(prompt)
     
     # Log activity
-    activity_service = ActivityService(db)
-    await activity_service.log_prompt_created(user.id, prompt.name, prompt.id)
+    ActivityService().log_prompt_created(user.id, prompt.name, prompt.id)
     
     # Reload with versions
     result = await db.execute(
@@ -103,13 +134,44 @@ async def create_prompt(
     return prompt
 
 
+async def _prompt_etag(db: AsyncSession, prompt_id: int, user_id: str) -> Optional[str]:
+    """
+    ETag for a prompt and its versions, or None if not found.
+    Versions are immutable, so their count and newest ID identify the set.
+    """
+    result = await db.execute(
+        select(Prompt.updated_at, func.count(PromptVersion.id), func.max(PromptVersion.id))
+        .outerjoin(PromptVersion, PromptVersion.prompt_id == Prompt.id)
+        .where(Prompt.id == prompt_id, Prompt.user_id == user_id)
+        .group_by(Prompt.id, Prompt.updated_at)
+    )
+    row = result.first()
+    if row is None:
+        return None
+    return make_etag("prompt", prompt_id, *row)
+
+
 @router.get("/{prompt_id}", response_model=PromptResponse)
 async def get_prompt(
     prompt_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(default=None),
     db: AsyncSession = Depends(get_db),
     user: SupabaseUser = Depends(get_current_user)
 ):
-    """Get a prompt with all its versions."""
+    """
+    Get a prompt with all its versions.
+    Supports conditional GET: a matching If-None-Match returns 304.
+    """
+    etag = await _prompt_etag(db, prompt_id, user.id)
+    if etag is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Prompt not found"
+        )
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    
     result = await db.execute(
         select(Prompt)
         .where(Prompt.id == prompt_id, Prompt.user_id == user.id)
@@ -123,6 +185,7 @@ async def get_prompt(
             detail="Prompt not found"
         )
     
+    set_cache_headers(response, etag)
     return prompt
 
 
@@ -155,6 +218,7 @@ async def update_prompt(
     
     await db.commit()
     await db.refresh(prompt)
+    await get_invalidation_bus().prompt_changed(user.id, prompt_id)
     
     return prompt
 
@@ -178,8 +242,24 @@ async def delete_prompt(
             detail="Prompt not found"
         )
     
+    # Its deployments go with it. Watchers can't be sent rows that no longer
+    # exist, so the environments they were in move to a revision that makes
+    # watchers behind it take a fresh snapshot
+    env_result = await db.execute(
+        update(Environment)
+        .where(Environment.id.in_(
+            select(Deployment.environment_id)
+            .join(PromptVersion, Deployment.version_id == PromptVersion.id)
+            .where(PromptVersion.prompt_id == prompt_id)
+        ))
+        .values(revision=Environment.revision + 1, snapshot_revision=Environment.revision + 1)
+        .returning(Environment.id)
+    )
+    environment_ids = env_result.scalars().all()
+    
     await db.delete(prompt)
     await db.commit()
+    await get_invalidation_bus().prompt_changed(user.id, prompt_id, environment_ids)
 
 
 # ====== Versions Endpoints ======
@@ -187,20 +267,24 @@ async def delete_prompt(
 @router.get("/{prompt_id}/versions", response_model=List[PromptVersionResponse])
 async def list_versions(
     prompt_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(default=None),
     db: AsyncSession = Depends(get_db),
     user: SupabaseUser = Depends(get_current_user)
 ):
-    """List all versions for a prompt."""
-    # Verify prompt ownership
-    result = await db.execute(
-        select(Prompt)
-        .where(Prompt.id == prompt_id, Prompt.user_id == user.id)
-    )
-    if not result.scalar_one_or_none():
+    """
+    List all versions for a prompt.
+    Supports conditional GET: a matching If-None-Match returns 304.
+    """
+    # Verify prompt ownership and compute the validator in one query
+    etag = await _prompt_etag(db, prompt_id, user.id)
+    if etag is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Prompt not found"
         )
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
     
     result = await db.execute(
         select(PromptVersion)
@@ -209,6 +293,7 @@ async def list_versions(
     )
     versions = result.scalars().all()
     
+    set_cache_headers(response, etag)
     return versions
 
 
@@ -251,21 +336,19 @@ async def create_version(
     version = PromptVersion(
         prompt_id=prompt_id,
         version_tag=data.version_tag,
-        system_prompt=data.system_prompt,
-        user_prompt=data.user_prompt,
         model=data.model,
         temperature=data.temperature,
         max_tokens=data.max_tokens,
         commit_message=data.commit_message,
         variables=data.variables
     )
+    await set_version_text(db, version, data.system_prompt, data.user_prompt)
     db.add(version)
     await db.commit()
     await db.refresh(version)
     
     # Log activity
-    activity_service = ActivityService(db)
-    await activity_service.log_version_created(user.id, prompt.name, version.version_tag, version.id)
+    ActivityService().log_version_created(user.id, prompt.name, version.version_tag, version.id)
     
     return version
 
@@ -302,3 +385,36 @@ async def get_version(
         )
     
     return version
+
+
+@router.get("/{prompt_id}/diff", response_model=PromptVersionDiff)
+async def diff_versions(
+    prompt_id: int,
+    from_version_id: int = Query(..., description="Base version"),
+    to_version_id: int = Query(..., description="Version to compare against the base"),
+    db: AsyncSession = Depends(get_db),
+    user: SupabaseUser = Depends(get_current_user),
+    diffs: DiffCache = Depends(get_diff_cache)
+):
+    """
+    Diff two versions of a prompt: line and word diffs of both prompt bodies
+    plus changed configuration. Results are cached by content hash.
+    """
+    result = await db.execute(
+        select(PromptVersion)
+        .join(Prompt)
+        .where(
+            PromptVersion.id.in_([from_version_id, to_version_id]),
+            PromptVersion.prompt_id == prompt_id,
+            Prompt.user_id == user.id
+        )
+    )
+    versions = {version.id: version for version in result.scalars().unique()}
+    
+    if from_version_id not in versions or to_version_id not in versions:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Version not found"
+        )
+    
+    return await diffs.diff_versions(versions[from_version_id], versions[to_version_id])
@@ -3,7 +3,7 @@ ActivityLog schemas for API responses.
 """
 
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Dict, List
 from pydantic import BaseModel
 
 from app.models.activity_log import ActivityLevel
@@ -31,3 +31,17 @@ class ActivityLogListParams(BaseModel):
     level: Optional[ActivityLevel] = None
     action: Optional[str] = None
     search: Optional[str] = None
+
+
+class ActivityActionFacet(BaseModel):
+    """Filter facet for one action type."""
+    action: str
+    count: int
+    last_seen: datetime
+    levels: Dict[str, int] = {}
+
+
+class ActivityActionsResponse(BaseModel):
+    """Action types available for filtering, with counts."""
+    actions: List[str] = []
+    facets: List[ActivityActionFacet] = []
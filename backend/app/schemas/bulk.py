@@ -0,0 +1,55 @@
+"""
+Bulk import/export schemas (NDJSON records).
+"""
+
+from datetime import datetime
+from typing import Annotated, List, Literal, Optional, Union
+from pydantic import BaseModel, Field, TypeAdapter
+
+from app.schemas.environment import EnvironmentBase
+from app.schemas.prompt import PromptBase, PromptVersionCreate
+
+
+class BulkEnvironment(EnvironmentBase):
+    """Environment record."""
+    type: Literal["environment"] = "environment"
+
+
+class BulkPrompt(PromptBase):
+    """Prompt record. Versions refer to it by ref."""
+    type: Literal["prompt"] = "prompt"
+    ref: int = Field(..., description="Prompt ID in the exporting instance")
+
+
+class BulkVersion(PromptVersionCreate):
+    """Version record, which must follow its prompt in the stream."""
+    type: Literal["version"] = "version"
+    prompt_ref: int = Field(..., description="ref of the prompt this version belongs to")
+    created_at: Optional[datetime] = None
+
+
+BulkRecord = Annotated[Union[BulkEnvironment, BulkPrompt, BulkVersion], Field(discriminator="type")]
+bulk_record_adapter = TypeAdapter(BulkRecord)
+
+
+class BulkConflict(BaseModel):
+    """A record skipped because it already exists."""
+    type: str
+    name: str
+    version_tag: Optional[str] = None
+
+
+class BulkError(BaseModel):
+    """A line that could not be imported."""
+    line: int
+    detail: str
+
+
+class BulkImportSummary(BaseModel):
+    """Result of a bulk import."""
+    environments_created: int = 0
+    prompts_created: int = 0
+    prompts_matched: int = 0  # Existing prompts with the same name that received versions
+    versions_created: int = 0
+    conflicts: List[BulkConflict] = []
+    errors: List[BulkError] = []
@@ -0,0 +1,28 @@
+"""
+Dashboard schemas for the composite dashboard API.
+"""
+
+from typing import List
+from pydantic import BaseModel
+
+from app.schemas.metric import MetricsOverview, LatencyData, CostData
+from app.schemas.activity_log import ActivityLogResponse
+
+
+class ModelBreakdown(BaseModel):
+    """Per-model metrics summary."""
+    model: str
+    request_count: int
+    success_rate: float
+    avg_latency_ms: float
+    total_tokens: int
+    total_cost_cents: float
+
+
+class DashboardResponse(BaseModel):
+    """Everything the dashboard renders, in one payload."""
+    overview: MetricsOverview
+    latency: List[LatencyData] = []
+    costs: List[CostData] = []
+    by_model: List[ModelBreakdown] = []
+    recent_activity: List[ActivityLogResponse] = []
@@ -3,10 +3,11 @@ Deployment schemas for API validation.
 """
 
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel, Field
 
 from app.models.deployment import DeploymentStatus
+from app.schemas.metric import MetricsBreakdown
 
 
 class DeploymentCreate(BaseModel):
@@ -23,6 +24,8 @@ class DeploymentResponse(BaseModel):
     environment_id: int
     user_id: str
     status: DeploymentStatus
+    traffic_percent: int = 100
+    revision: int = 0
     notes: Optional[str]
     rolled_back_from_id: Optional[int]
     created_at: datetime
@@ -40,3 +43,49 @@ class DeploymentResponse(BaseModel):
 class DeploymentRollbackRequest(BaseModel):
     """Schema for rollback request."""
     reason: Optional[str] = Field(None, max_length=500, description="Rollback reason")
+
+
+class PromotionRequest(BaseModel):
+    """Schema for promoting active deployments from one environment to another."""
+    source_environment_id: int = Field(..., description="Environment to promote from, e.g. staging")
+    target_environment_id: int = Field(..., description="Environment to promote to, e.g. production")
+    prompt_ids: Optional[List[int]] = Field(None, description="Prompts to promote; all active ones if omitted")
+    notes: Optional[str] = Field(None, max_length=500, description="Deployment notes")
+
+
+class PromotionResponse(BaseModel):
+    """Result of a promotion."""
+    promoted: List[DeploymentResponse] = []
+    unchanged: List[int] = []  # Prompt IDs already serving the same version in the target
+    missing: List[int] = []  # Requested prompt IDs with no active source deployment
+
+
+class CanaryCreate(BaseModel):
+    """Schema for starting a canary rollout."""
+    version_id: int = Field(..., description="Prompt version to canary")
+    environment_id: int = Field(..., description="Environment with an active deployment of the prompt")
+    traffic_percent: int = Field(..., ge=1, le=99, description="Share of requests routed to the canary")
+    notes: Optional[str] = Field(None, max_length=500, description="Deployment notes")
+
+
+class CanaryUpdate(BaseModel):
+    """Schema for adjusting a canary's traffic share."""
+    traffic_percent: int = Field(..., ge=1, le=99)
+
+
+class CanaryComparison(BaseModel):
+    """Live metrics of a canary and the active deployment it runs against."""
+    canary_id: int
+    baseline_id: int
+    traffic_percent: int
+    since: datetime
+    canary: Optional[MetricsBreakdown] = None
+    baseline: Optional[MetricsBreakdown] = None
+
+
+class DeploymentWatchResponse(BaseModel):
+    """Deployments written to an environment since a client's revision."""
+    environment_id: int
+    revision: int  # Pass back as `revision` on the next watch
+    snapshot: bool = False  # True when `changed` is the full live set rather than a delta
+    changed: List[DeploymentResponse] = []
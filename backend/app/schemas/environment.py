@@ -25,6 +25,7 @@ class EnvironmentResponse(EnvironmentBase):
     """Schema for environment response."""
     id: int
     user_id: str
+    revision: int = 0
     created_at: datetime
     
     class Config:
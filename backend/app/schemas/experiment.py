@@ -3,10 +3,11 @@ Experiment schemas for A/B testing API validation.
 """
 
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Dict, Tuple
 from pydantic import BaseModel, Field
 
-from app.models.experiment import ExperimentStatus
+from app.models.experiment import ExperimentStatus, AllocationMode
+from app.schemas.inference import InferenceResponse
 
 
 # ====== Experiment Variant Schemas ======
@@ -34,6 +35,8 @@ class ExperimentVariantResponse(ExperimentVariantBase):
     success_count: int = 0
     avg_latency_ms: float = 0.0
     avg_tokens: float = 0.0
+    latency_stddev_ms: float = 0.0
+    tokens_stddev: float = 0.0
     created_at: datetime
     
     class Config:
@@ -51,6 +54,8 @@ class ExperimentBase(BaseModel):
 class ExperimentCreate(ExperimentBase):
     """Schema for creating an experiment."""
     prompt_id: int
+    target_sample_size: Optional[int] = Field(None, ge=2, description="Planned requests per variant; enables sequential testing")
+    allocation_mode: AllocationMode = Field(default=AllocationMode.FIXED, description="fixed weights, or a bandit (thompson, ucb)")
     variants: List[ExperimentVariantCreate] = Field(..., min_length=2, description="At least 2 variants required")
 
 
@@ -59,6 +64,8 @@ class ExperimentUpdate(BaseModel):
     name: Optional[str] = Field(None, min_length=1, max_length=255)
     description: Optional[str] = None
     status: Optional[ExperimentStatus] = None
+    target_sample_size: Optional[int] = Field(None, ge=2)
+    allocation_mode: Optional[AllocationMode] = None
 
 
 class ExperimentResponse(ExperimentBase):
@@ -67,6 +74,9 @@ class ExperimentResponse(ExperimentBase):
     prompt_id: int
     status: ExperimentStatus
     traffic_allocation: dict
+    target_sample_size: Optional[int] = None
+    allocation_mode: AllocationMode = AllocationMode.FIXED
+    bandit_state: Optional[dict] = None
     results: Optional[dict]
     winner_variant_id: Optional[int]
     created_at: datetime
@@ -76,3 +86,92 @@ class ExperimentResponse(ExperimentBase):
     
     class Config:
         from_attributes = True
+
+
+# ====== Serving Schemas ======
+
+class ExperimentServeRequest(BaseModel):
+    """Schema for running an experiment's variant for one caller."""
+    assignment_key: str = Field(..., min_length=1, max_length=255, description="Stable caller ID, e.g. a user ID")
+    variables: Dict[str, str] = Field(default_factory=dict)
+    max_tokens: int = Field(default=1024, ge=1, le=8192)
+
+
+class ExperimentServeResponse(InferenceResponse):
+    """Inference response with the variant that served it."""
+    experiment_id: int
+    variant_id: int
+    variant_name: str
+
+
+# ====== Analysis Schemas ======
+
+class VariantSummary(BaseModel):
+    """Observed metrics of one variant, with confidence intervals at 1 - alpha."""
+    variant_id: int
+    name: str
+    request_count: int
+    success_count: int
+    success_rate: float
+    success_rate_ci: Tuple[float, float]  # Wilson interval
+    avg_latency_ms: float
+    avg_latency_ci: Tuple[float, float]
+    avg_tokens: float
+    avg_cost_cents: float
+
+
+class ProportionTest(BaseModel):
+    """Two-proportion z-test of success rates against the control."""
+    difference: float  # Variant minus control
+    difference_ci: Tuple[float, float]
+    z: float
+    p_value: float
+    significant: bool
+    look: Optional[int] = None  # Sequential look the result was taken at
+
+
+class MeanTest(BaseModel):
+    """Welch's t-test of mean latency against the control."""
+    difference_ms: float  # Variant minus control
+    difference_ci: Tuple[float, float]
+    t: float
+    degrees_of_freedom: float
+    p_value: float
+    significant: bool
+    look: Optional[int] = None  # Sequential look the result was taken at
+
+
+class RankTest(BaseModel):
+    """Mann-Whitney U test of latency against the control."""
+    u: float
+    z: float
+    p_value: float
+    probability_slower: float  # P(variant latency > control latency)
+    significant: bool
+    look: Optional[int] = None  # Sequential look the result was taken at
+
+
+class VariantComparison(BaseModel):
+    """A variant compared with the control; tests are None without enough data."""
+    variant_id: int
+    success_rate: Optional[ProportionTest] = None
+    latency_welch: Optional[MeanTest] = None
+    latency_mann_whitney: Optional[RankTest] = None
+
+
+class ExperimentAnalysis(BaseModel):
+    """Significance analysis of an experiment's variants."""
+    experiment_id: int
+    computed_at: datetime
+    watermark: int  # Last metric ID included
+    alpha: float
+    control_variant_id: int
+    sequential: bool  # O'Brien-Fleming boundaries apply (target_sample_size is set)
+    information_fraction: Optional[float] = None
+    looks: Optional[int] = None  # Scheduled looks when sequential
+    look: Optional[int] = None  # Looks reached so far
+    boundary_z: float  # |z| a result must reach at the latest look
+    adjusted_alpha: float  # Two-sided p-value threshold at the latest look
+    variants: List[VariantSummary] = []
+    comparisons: List[VariantComparison] = []
+    winner_variant_id: Optional[int] = None
@@ -3,7 +3,7 @@ Inference schemas for AI execution API.
 """
 
 from typing import Optional, Dict
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 
 class InferenceRequest(BaseModel):
@@ -40,3 +40,29 @@ class InferenceTestRequest(BaseModel):
     prompt_id: int
     version_id: int
     variables: Dict[str, str] = Field(default_factory=dict)
+
+
+class DeployedInferenceRequest(BaseModel):
+    """Schema for running whatever version is deployed to an environment."""
+    environment: str = Field(..., description="Environment name, e.g. production")
+    prompt_id: Optional[int] = Field(None, description="Prompt ID (or give prompt_name)")
+    prompt_name: Optional[str] = Field(None, description="Prompt name (or give prompt_id)")
+    variables: Dict[str, str] = Field(default_factory=dict)
+    assignment_key: Optional[str] = Field(
+        None, max_length=255,
+        description="Stable caller ID, e.g. a user ID; keeps the caller on one side of a canary"
+    )
+    
+    @model_validator(mode="after")
+    def check_prompt(self):
+        if (self.prompt_id is None) == (self.prompt_name is None):
+            raise ValueError("Provide exactly one of prompt_id or prompt_name")
+        return self
+
+
+class DeployedInferenceResponse(InferenceResponse):
+    """Inference response with the deployment that served it."""
+    deployment_id: int
+    prompt_id: int
+    version_id: int
+    version_tag: str
@@ -58,3 +58,28 @@ class MetricsTimeSeriesResponse(BaseModel):
     latency: List[LatencyData] = []
     costs: List[CostData] = []
     overview: MetricsOverview
+
+
+class MetricsBreakdown(BaseModel):
+    """Aggregated metrics for one deployment, version or prompt."""
+    group_id: int
+    label: Optional[str] = None
+    request_count: int = 0
+    success_rate: float = 0.0
+    error_rate: float = 0.0
+    avg_latency_ms: float = 0.0
+    p95_latency_ms: float = 0.0
+    total_tokens: int = 0
+    total_cost_cents: float = 0.0
+
+
+class MetricsSeriesPoint(BaseModel):
+    """Time-bucketed metrics for one group."""
+    timestamp: datetime
+    group_id: int
+    request_count: int
+    error_rate: float
+    avg_latency_ms: float
+    p95_latency_ms: float
+    total_tokens: int
+    cost_cents: float
@@ -3,7 +3,7 @@ Prompt schemas for API validation.
 """
 
 from datetime import datetime
-from typing import Optional, List
+from typing import Any, List, Literal, Optional
 from pydantic import BaseModel, Field
 
 
@@ -32,6 +32,8 @@ class PromptVersionResponse(PromptVersionBase):
     version_tag: str
     commit_message: Optional[str]
     variables: Optional[dict]
+    system_prompt_hash: Optional[str] = None  # Content hash; equal hashes mean identical text
+    user_prompt_hash: Optional[str] = None
     created_at: datetime
     
     class Config:
@@ -81,3 +83,39 @@ class PromptListResponse(PromptBase):
     
     class Config:
         from_attributes = True
+
+
+# ====== Version Diff Schemas ======
+
+class WordDiffSegment(BaseModel):
+    """A run of words that is unchanged, inserted or deleted."""
+    op: Literal["equal", "insert", "delete"]
+    text: str
+
+
+class TextDiff(BaseModel):
+    """Line and word level diff of one prompt field."""
+    changed: bool
+    added_lines: int = 0
+    removed_lines: int = 0
+    unified: List[str] = []  # Unified diff hunks, without file headers
+    words: List[WordDiffSegment] = []
+
+
+class ConfigChange(BaseModel):
+    """A configuration field that differs between versions."""
+    field: str
+    old: Any
+    new: Any
+
+
+class PromptVersionDiff(BaseModel):
+    """Diff between two versions of a prompt."""
+    prompt_id: int
+    from_version_id: int
+    from_version_tag: str
+    to_version_id: int
+    to_version_tag: str
+    system_prompt: TextDiff
+    user_prompt: TextDiff
+    config: List[ConfigChange] = []
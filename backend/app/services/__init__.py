@@ -5,6 +5,7 @@ Services for business logic.
 from app.services.supabase_auth import SupabaseAuthService, get_auth_service
 from app.services.gemini import GeminiService, get_gemini_service
 from app.services.activity import ActivityService
+from app.services.metrics import MetricsService
 
 __all__ = [
     "SupabaseAuthService",
@@ -12,4 +13,5 @@ __all__ = [
     "GeminiService", 
     "get_gemini_service",
     "ActivityService",
+    "MetricsService",
 ]
@@ -1,20 +1,195 @@
 """
 Activity logging service for audit trail.
+
+Entries are buffered in memory by AuditPipeline and written in bulk inserts
+from a background task, so request handlers never wait on the audit trail.
 """
 
-from typing import Optional
-from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+import json
+import os
+from collections import deque
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Deque, List, Optional
+from sqlalchemy import insert
 
+from app.config import get_settings
+from app.database import async_session_maker
+from app.services.metrics_cache import get_metrics_cache
+from app.services.events import get_event_bus
+from app.services.periodic import PeriodicTask
+from app.services.activity_facets import aggregate_entries, record_stats, get_action_catalogue
 from app.models.activity_log import ActivityLog, ActivityLevel
+from app.schemas.activity_log import ActivityLogResponse
+
+
+class AuditPipeline:
+    """
+    Buffered, batched writer for activity log entries.
+    
+    In durable mode every entry is also appended to a local spool file before
+    it is acknowledged, and the spool is replayed on startup so entries that
+    were buffered when the process died are not lost.
+    """
+    
+    def __init__(
+        self,
+        batch_size: int = 200,
+        flush_interval_seconds: float = 1.0,
+        spool_path: Optional[str] = None
+    ):
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.spool_path = spool_path
+        self._buffer: Deque[dict] = deque()
+        self._flusher = PeriodicTask(self._drain, flush_interval_seconds, "Activity flush")
+        self._flush_lock = asyncio.Lock()
+        self._spool = None
+    
+    @property
+    def pending(self) -> int:
+        """Number of entries waiting to be written."""
+        return len(self._buffer)
+    
+    def enqueue(self, entry: dict) -> None:
+        """Queue an entry for the next bulk insert. Never blocks."""
+        self._buffer.append(entry)
+        
+        if self._spool is not None:
+            self._spool.write(json.dumps(entry, default=str) + "\n")
+            self._spool.flush()
+        
+        if len(self._buffer) >= self.batch_size:
+            self._flusher.wake()
+    
+    async def start(self) -> None:
+        """Replay the spool (durable mode) and start the background flusher."""
+        if self.spool_path:
+            self._replay_spool()
+            self._spool = open(self.spool_path, "a", encoding="utf-8")
+        
+        self._flusher.start()
+    
+    async def stop(self) -> None:
+        """Stop the flusher and drain everything still buffered."""
+        # Waits for a flush in progress rather than cancelling it, which
+        # would lose the batch it had taken from the buffer
+        await self._flusher.stop()
+        await self._drain()
+        
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+    
+    async def _drain(self) -> None:
+        """Flush batch after batch until the buffer is empty or a write fails."""
+        while self._buffer:
+            if not await self.flush():
+                break
+    
+    async def flush(self) -> bool:
+        """Write up to one batch in a single bulk insert. Returns False on failure."""
+        async with self._flush_lock:
+            batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+            if not batch:
+                return True
+            
+            rows = [self._to_row(entry) for entry in batch]
+            totals = aggregate_entries(rows)
+            
+            try:
+                async with async_session_maker() as session:
+                    result = await session.scalars(insert(ActivityLog).returning(ActivityLog), rows)
+                    logs = result.all()
+                    await record_stats(session, totals)
+                    await session.commit()
+            except Exception as e:
+                print(f"❌ Activity flush failed: {e}")
+                self._buffer.extendleft(reversed(batch))
+                return False
+            
+            self._compact_spool()
+            get_action_catalogue().apply(totals)
+            await self._after_flush(logs)
+            return True
+    
+    async def _after_flush(self, logs: List[ActivityLog]) -> None:
+        """Notify consumers of freshly written entries."""
+        # The cached dashboard payload embeds recent activity
+        cache = get_metrics_cache()
+        for user_id in {log.user_id for log in logs}:
+            cache.bump(user_id)
+        
+        await get_event_bus().publish([
+            (log.user_id, ActivityLogResponse.model_validate(log).model_dump(mode="json"))
+            for log in logs
+        ])
+    
+    @staticmethod
+    def _to_row(entry: dict) -> dict:
+        """Convert a buffered (possibly spooled) entry to insert parameters."""
+        row = dict(entry)
+        row["level"] = ActivityLevel(row["level"])
+        if isinstance(row["timestamp"], str):
+            row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+        return row
+    
+    def _replay_spool(self) -> None:
+        """Load entries left in the spool by a previous process."""
+        if not os.path.exists(self.spool_path):
+            return
+        
+        with open(self.spool_path, encoding="utf-8") as spool:
+            for line in spool:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    self._buffer.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # Torn final line from a crash mid-write
+                    continue
+        
+        if self._buffer:
+            print(f"📼 Replaying {len(self._buffer)} spooled activity entries")
+    
+    def _compact_spool(self) -> None:
+        """Rewrite the spool so it only holds entries that are still buffered."""
+        if self._spool is None:
+            return
+        
+        tmp_path = f"{self.spool_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as tmp:
+            for entry in self._buffer:
+                tmp.write(json.dumps(entry, default=str) + "\n")
+        
+        self._spool.close()
+        os.replace(tmp_path, self.spool_path)
+        self._spool = open(self.spool_path, "a", encoding="utf-8")
+
+
+@lru_cache()
+def get_audit_pipeline() -> AuditPipeline:
+    """Get cached audit pipeline instance."""
+    settings = get_settings()
+    return AuditPipeline(
+        batch_size=settings.activity_batch_size,
+        flush_interval_seconds=settings.activity_flush_interval_seconds,
+        spool_path=settings.activity_spool_path
+    )
 
 
 class ActivityService:
-    """Service for logging user and system activities."""
+    """
+    Service for logging user and system activities.
+    All methods are fire-and-forget: entries are queued, not written inline.
+    """
     
-    def __init__(self, db: AsyncSession):
-        self.db = db
+    def __init__(self, pipeline: Optional[AuditPipeline] = None):
+        self.pipeline = pipeline or get_audit_pipeline()
     
-    async def log(
+    def log(
         self,
         user_id: str,
         action: str,
@@ -22,26 +197,21 @@ class ActivityService:
         level: ActivityLevel = ActivityLevel.INFO,
         source: str = "system",
         extra_data: Optional[dict] = None
-    ) -> ActivityLog:
-        """Create a new activity log entry."""
-        log_entry = ActivityLog(
-            user_id=user_id,
-            action=action,
-            message=message,
-            level=level,
-            source=source,
-            extra_data=extra_data or {}
-        )
-        
-        self.db.add(log_entry)
-        await self.db.commit()
-        await self.db.refresh(log_entry)
-        
-        return log_entry
+    ) -> None:
+        """Queue a new activity log entry."""
+        self.pipeline.enqueue({
+            "user_id": user_id,
+            "action": action,
+            "message": message,
+            "level": ActivityLevel(level).value,
+            "source": source,
+            "extra_data": extra_data or {},
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        })
     
-    async def log_prompt_created(self, user_id: str, prompt_name: str, prompt_id: int):
+    def log_prompt_created(self, user_id: str, prompt_name: str, prompt_id: int):
         """Log prompt creation."""
-        return await self.log(
+        return self.log(
             user_id=user_id,
             action="prompt.created",
             message=f"Created prompt '{prompt_name}'",
@@ -50,9 +220,9 @@ class ActivityService:
             extra_data={"prompt_id": prompt_id, "prompt_name": prompt_name}
         )
     
-    async def log_version_created(self, user_id: str, prompt_name: str, version_tag: str, version_id: int):
+    def log_version_created(self, user_id: str, prompt_name: str, version_tag: str, version_id: int):
         """Log version creation."""
-        return await self.log(
+        return self.log(
             user_id=user_id,
             action="version.created",
             message=f"Created version {version_tag} for '{prompt_name}'",
@@ -61,9 +231,9 @@ class ActivityService:
             extra_data={"version_id": version_id, "version_tag": version_tag}
         )
     
-    async def log_deployment(self, user_id: str, prompt_name: str, version_tag: str, environment: str, deployment_id: int):
+    def log_deployment(self, user_id: str, prompt_name: str, version_tag: str, environment: str, deployment_id: int):
         """Log deployment."""
-        return await self.log(
+        return self.log(
             user_id=user_id,
             action="deployment.created",
             message=f"Deployed {prompt_name} {version_tag} to {environment}",
@@ -72,9 +242,9 @@ class ActivityService:
             extra_data={"deployment_id": deployment_id, "environment": environment}
         )
     
-    async def log_rollback(self, user_id: str, prompt_name: str, from_version: str, to_version: str, environment: str):
+    def log_rollback(self, user_id: str, prompt_name: str, from_version: str, to_version: str, environment: str):
         """Log rollback."""
-        return await self.log(
+        return self.log(
             user_id=user_id,
             action="deployment.rollback",
             message=f"Rolled back {prompt_name} from {from_version} to {to_version} in {environment}",
@@ -83,12 +253,28 @@ class ActivityService:
             extra_data={"from_version": from_version, "to_version": to_version, "environment": environment}
         )
     
-    async def log_inference(self, user_id: str, model: str, latency_ms: int, success: bool):
+    def log_promotion(self, user_id: str, source: str, target: str, prompt_names: list, deployment_ids: list):
+        """Log a bulk promotion as a single entry."""
+        return self.log(
+            user_id=user_id,
+            action="deployment.promoted",
+            message=f"Promoted {len(prompt_names)} prompts from {source} to {target}",
+            level=ActivityLevel.SUCCESS,
+            source="api",
+            extra_data={
+                "source_environment": source,
+                "target_environment": target,
+                "prompts": prompt_names,
+                "deployment_ids": deployment_ids
+            }
+        )
+    
+    def log_inference(self, user_id: str, model: str, latency_ms: int, success: bool):
         """Log inference execution."""
         level = ActivityLevel.SUCCESS if success else ActivityLevel.ERROR
         message = f"Inference on {model} completed in {latency_ms}ms" if success else f"Inference on {model} failed"
         
-        return await self.log(
+        return self.log(
             user_id=user_id,
             action="inference.run",
             message=message,
@@ -96,4 +282,20 @@ class ActivityService:
             source="api",
             extra_data={"model": model, "latency_ms": latency_ms, "success": success}
         )
-
+    
+    
+    def log_bulk_import(self, user_id: str, environments: int, prompts: int, versions: int, conflicts: int):
+        """Log a bulk import as a single summary entry."""
+        return self.log(
+            user_id=user_id,
+            action="bulk.imported",
+            message=f"Imported {prompts} prompts, {versions} versions and {environments} environments",
+            level=ActivityLevel.WARNING if conflicts else ActivityLevel.SUCCESS,
+            source="api",
+            extra_data={
+                "environments": environments,
+                "prompts": prompts,
+                "versions": versions,
+                "conflicts": conflicts
+            }
+        )
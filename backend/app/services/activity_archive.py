@@ -0,0 +1,338 @@
+"""
+Archival of old activity logs into compressed segment files.
+
+Rows older than the hot window are moved out of activity_logs into
+gzip-compressed JSONL segments. Each segment has a small JSON index of the
+users and time range it covers, so reads that reach past the hot window only
+open segments that can contain the requesting user's entries.
+
+A segment is first written with a .pending suffix, then its rows are deleted
+in one transaction, then it is renamed. Pending segments left by a crash are
+resolved on the next run by checking whether their rows still exist.
+
+Every worker schedules the job, but on PostgreSQL a run only proceeds in the
+worker holding an advisory lock, so two runs never archive the same rows.
+Readers reload the segment indexes whenever the directory changes, so
+segments written by other workers show up in their results.
+"""
+
+import asyncio
+import glob
+import gzip
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import AsyncIterator, List, Optional
+from sqlalchemy import select, delete, func, text
+
+from app.config import get_settings
+from app.database import async_session_maker, engine
+from app.models.activity_log import ActivityLog, ActivityLevel
+from app.schemas.activity_log import ActivityLogResponse
+
+
+SEGMENT_SUFFIX = ".jsonl.gz"
+INDEX_SUFFIX = ".idx.json"
+PENDING_SUFFIX = ".pending"
+
+ARCHIVE_LOCK_KEY = 0x61637469  # pg_advisory_lock key held by the worker running the job
+
+
+def _serialize(log: ActivityLog) -> dict:
+    return {
+        "id": log.id,
+        "user_id": log.user_id,
+        "level": ActivityLevel(log.level).value,
+        "action": log.action,
+        "message": log.message,
+        "source": log.source,
+        "extra_data": log.extra_data,
+        "timestamp": log.timestamp.isoformat(),
+    }
+
+
+def _matches(row: dict, user_id: str, level: Optional[ActivityLevel], action: Optional[str], search: Optional[str]) -> bool:
+    if row["user_id"] != user_id:
+        return False
+    if level and row["level"] != ActivityLevel(level).value:
+        return False
+    if action and row["action"] != action:
+        return False
+    if search:
+        term = search.lower()
+        return term in row["message"].lower() or term in row["action"].lower()
+    return True
+
+
+class ActivityArchive:
+    """Moves cold activity logs to segment files and reads them back."""
+    
+    def __init__(self, root_dir: str, hot_days: int = 90, batch_size: int = 10000, interval_seconds: float = 3600):
+        self.root_dir = root_dir
+        self.hot_days = hot_days
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self._indexes: List[dict] = []
+        self._indexes_mtime: Optional[int] = None  # Directory mtime the indexes were loaded at
+        self._task: Optional[asyncio.Task] = None
+        os.makedirs(root_dir, exist_ok=True)
+        self._load_indexes()
+    
+    # ====== Segment files ======
+    
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root_dir, name)
+    
+    def _load_indexes(self) -> None:
+        """Read every committed segment index into memory."""
+        mtime = os.stat(self.root_dir).st_mtime_ns
+        indexes = []
+        for path in glob.glob(self._path(f"*{INDEX_SUFFIX}")):
+            with open(path, encoding="utf-8") as f:
+                indexes.append(json.load(f))
+        self._indexes = sorted(indexes, key=lambda idx: idx["max_ts"], reverse=True)
+        # A change in the same clock tick would leave the mtime unchanged, so a
+        # very recent mtime is not trusted and the next read loads again
+        self._indexes_mtime = mtime if time.time_ns() - mtime > 1_000_000_000 else None
+    
+    def _refresh_indexes(self) -> None:
+        """Reload the indexes if segments were committed since, e.g. by another worker."""
+        if os.stat(self.root_dir).st_mtime_ns != self._indexes_mtime:
+            self._load_indexes()
+    
+    def _write_segment(self, rows: List[dict]) -> dict:
+        """Write a pending segment and its index. Runs in a worker thread."""
+        name = f"activity-{rows[0]['id']:012d}-{rows[-1]['id']:012d}"
+        
+        users = {}
+        for row in rows:
+            span = users.setdefault(row["user_id"], {"min_ts": row["timestamp"], "max_ts": row["timestamp"], "count": 0})
+            span["min_ts"] = min(span["min_ts"], row["timestamp"])
+            span["max_ts"] = max(span["max_ts"], row["timestamp"])
+            span["count"] += 1
+        
+        index = {
+            "name": name,
+            "count": len(rows),
+            "min_id": rows[0]["id"],
+            "max_id": rows[-1]["id"],
+            "min_ts": min(row["timestamp"] for row in rows),
+            "max_ts": max(row["timestamp"] for row in rows),
+            "users": users,
+        }
+        
+        segment_path = self._path(name + SEGMENT_SUFFIX + PENDING_SUFFIX)
+        with open(segment_path, "wb") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                for row in rows:
+                    f.write((json.dumps(row) + "\n").encode("utf-8"))
+            raw.flush()
+            os.fsync(raw.fileno())
+        index_path = self._path(name + INDEX_SUFFIX + PENDING_SUFFIX)
+        with open(index_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+            f.flush()
+            os.fsync(f.fileno())
+        
+        return index
+    
+    def _commit_segment(self, name: str) -> None:
+        """Promote a pending segment once its rows are gone from the hot table."""
+        for suffix in (SEGMENT_SUFFIX, INDEX_SUFFIX):
+            os.replace(self._path(name + suffix + PENDING_SUFFIX), self._path(name + suffix))
+    
+    def _read_ids(self, filename: str) -> List[int]:
+        try:
+            with gzip.open(self._path(filename), "rt", encoding="utf-8") as f:
+                return [json.loads(line)["id"] for line in f]
+        except (OSError, EOFError, json.JSONDecodeError):
+            # Torn segment: the delete cannot have run yet
+            return []
+    
+    def _discard_segment(self, name: str) -> None:
+        for suffix in (SEGMENT_SUFFIX, INDEX_SUFFIX):
+            path = self._path(name + suffix + PENDING_SUFFIX)
+            if os.path.exists(path):
+                os.remove(path)
+    
+    async def _recover_pending(self) -> None:
+        """Resolve segments left pending by an interrupted run."""
+        for path in glob.glob(self._path(f"*{INDEX_SUFFIX}{PENDING_SUFFIX}")):
+            with open(path, encoding="utf-8") as f:
+                index = json.load(f)
+            
+            ids = await asyncio.to_thread(self._read_ids, index["name"] + SEGMENT_SUFFIX + PENDING_SUFFIX)
+            async with async_session_maker() as session:
+                remaining = await session.scalar(
+                    select(func.count(ActivityLog.id)).where(ActivityLog.id.in_(ids))
+                ) if ids else 0
+            
+            if remaining:
+                # The delete never committed; the rows are still hot
+                self._discard_segment(index["name"])
+            else:
+                self._commit_segment(index["name"])
+                self._indexes.append(index)
+        
+        self._indexes.sort(key=lambda idx: idx["max_ts"], reverse=True)
+    
+    # ====== Archival job ======
+    
+    @asynccontextmanager
+    async def _job_lock(self) -> AsyncIterator[bool]:
+        """Hold the archival lock for one run. Yields False if another worker has it."""
+        if engine.dialect.name != "postgresql":
+            yield True
+            return
+        
+        async with engine.connect() as conn:
+            locked = await conn.scalar(text("SELECT pg_try_advisory_lock(:key)"), {"key": ARCHIVE_LOCK_KEY})
+            # The lock is session-level; don't sit idle in a transaction while holding it
+            await conn.commit()
+            try:
+                yield locked
+            finally:
+                if locked:
+                    await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ARCHIVE_LOCK_KEY})
+                    await conn.commit()
+    
+    async def archive_once(self) -> int:
+        """
+        Move every row older than the hot window into segments. Returns rows
+        moved, or 0 if another worker is running the job.
+        """
+        async with self._job_lock() as locked:
+            if not locked:
+                return 0
+            return await self._archive()
+    
+    async def _archive(self) -> int:
+        await self._recover_pending()
+        
+        cutoff = datetime.now(timezone.utc) - timedelta(days=self.hot_days)
+        moved = 0
+        
+        while True:
+            async with async_session_maker() as session:
+                result = await session.execute(
+                    select(ActivityLog)
+                    .where(ActivityLog.timestamp < cutoff)
+                    .order_by(ActivityLog.id)
+                    .limit(self.batch_size)
+                )
+                rows = [_serialize(log) for log in result.scalars().all()]
+                if not rows:
+                    break
+                
+                index = await asyncio.to_thread(self._write_segment, rows)
+                try:
+                    await session.execute(
+                        delete(ActivityLog).where(ActivityLog.id.in_([row["id"] for row in rows]))
+                    )
+                    await session.commit()
+                except Exception:
+                    self._discard_segment(index["name"])
+                    raise
+            
+            self._commit_segment(index["name"])
+            self._indexes.insert(0, index)
+            self._indexes.sort(key=lambda idx: idx["max_ts"], reverse=True)
+            moved += len(rows)
+        
+        return moved
+    
+    async def _run(self) -> None:
+        while True:
+            try:
+                moved = await self.archive_once()
+                if moved:
+                    print(f"🗄️ Archived {moved} activity log entries")
+            except Exception as e:
+                print(f"❌ Activity archival failed: {e}")
+            await asyncio.sleep(self.interval_seconds)
+    
+    async def start(self) -> None:
+        """Run the archival job periodically in the background."""
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    # ====== Reads ======
+    
+    def _query_sync(
+        self,
+        user_id: str,
+        level: Optional[ActivityLevel],
+        action: Optional[str],
+        search: Optional[str],
+        offset: int,
+        limit: int
+    ) -> List[dict]:
+        """Scan candidate segments newest first. Runs in a worker thread."""
+        self._refresh_indexes()
+        matches: List[dict] = []
+        skipped = 0
+        
+        for index in list(self._indexes):
+            span = index["users"].get(user_id)
+            if span is None:
+                continue
+            
+            with gzip.open(self._path(index["name"] + SEGMENT_SUFFIX), "rt", encoding="utf-8") as f:
+                rows = [
+                    row for row in map(json.loads, f)
+                    if _matches(row, user_id, level, action, search)
+                ]
+            rows.sort(key=lambda row: row["timestamp"], reverse=True)
+            
+            if skipped + len(rows) <= offset:
+                skipped += len(rows)
+                continue
+            
+            start = max(0, offset - skipped)
+            skipped = offset
+            matches.extend(rows[start:start + limit - len(matches)])
+            if len(matches) >= limit:
+                break
+        
+        return matches
+    
+    async def query(
+        self,
+        user_id: str,
+        level: Optional[ActivityLevel] = None,
+        action: Optional[str] = None,
+        search: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 50
+    ) -> List[ActivityLogResponse]:
+        """Archived entries for a user, newest first."""
+        if limit <= 0:
+            return []
+        
+        rows = await asyncio.to_thread(self._query_sync, user_id, level, action, search, offset, limit)
+        return [ActivityLogResponse.model_validate(row) for row in rows]
+
+
+@lru_cache()
+def get_activity_archive() -> Optional[ActivityArchive]:
+    """Get cached archive instance, or None when archival is disabled."""
+    settings = get_settings()
+    if not settings.activity_archive_dir:
+        return None
+    return ActivityArchive(
+        root_dir=settings.activity_archive_dir,
+        hot_days=settings.activity_hot_days,
+        batch_size=settings.activity_archive_batch_size,
+        interval_seconds=settings.activity_archive_interval_seconds
+    )
@@ -0,0 +1,169 @@
+"""
+Per-user action catalogue for activity filter facets.
+
+Counts live in activity_action_stats and are upserted in the same transaction
+as each bulk log insert, so facet queries read O(actions) rows instead of
+scanning the log table. A per-user in-memory copy serves repeat requests.
+
+Each user's catalogue is rebuilt from their logs once, on their first facet
+request, so entries written before the catalogue existed are counted. A row
+in activity_action_backfills records that it happened.
+"""
+
+import time
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, List, Set, Tuple
+from sqlalchemy import select, delete, insert, func, literal, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models.activity_log import ActivityLog, ActivityActionStat, ActivityActionBackfill, ActivityLevel
+from app.schemas.activity_log import ActivityActionFacet
+
+
+StatKey = Tuple[str, str, ActivityLevel]
+
+
+def _upsert(dialect: str):
+    """Dialect-specific INSERT supporting ON CONFLICT."""
+    return sqlite_insert if dialect == "sqlite" else pg_insert
+
+
+def aggregate_entries(rows: Iterable[dict]) -> Dict[StatKey, Tuple[int, datetime]]:
+    """Collapse a batch of log rows into (count, last_seen) per (user, action, level)."""
+    totals: Dict[StatKey, Tuple[int, datetime]] = {}
+    for row in rows:
+        key = (row["user_id"], row["action"], ActivityLevel(row["level"]))
+        count, last_seen = totals.get(key, (0, row["timestamp"]))
+        totals[key] = (count + 1, max(last_seen, row["timestamp"]))
+    return totals
+
+
+async def record_stats(session: AsyncSession, totals: Dict[StatKey, Tuple[int, datetime]]) -> None:
+    """Add a batch's counts to the catalogue in one statement."""
+    if not totals:
+        return
+    
+    dialect = session.get_bind().dialect.name
+    stmt = _upsert(dialect)(ActivityActionStat).values([
+        {"user_id": user_id, "action": action, "level": level, "count": count, "last_seen": last_seen}
+        for (user_id, action, level), (count, last_seen) in totals.items()
+    ])
+    latest = func.max if dialect == "sqlite" else func.greatest
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "action", "level"],
+        set_={
+            "count": ActivityActionStat.count + stmt.excluded.count,
+            "last_seen": latest(ActivityActionStat.last_seen, stmt.excluded.last_seen),
+        }
+    )
+    await session.execute(stmt)
+
+
+class ActionCatalogue:
+    """In-memory cache of per-user action facets."""
+    
+    def __init__(self, ttl_seconds: float = 300):
+        self.ttl_seconds = ttl_seconds
+        self._users: Dict[str, Tuple[float, Dict[str, ActivityActionFacet]]] = {}
+        self._backfilled: Set[str] = set()  # Users known to have a backfill marker
+    
+    def invalidate(self, user_id: str) -> None:
+        """Forget a user's cached facets."""
+        self._users.pop(user_id, None)
+    
+    def apply(self, totals: Dict[StatKey, Tuple[int, datetime]]) -> None:
+        """Fold freshly written counts into already-cached users."""
+        for (user_id, action, level), (count, last_seen) in totals.items():
+            cached = self._users.get(user_id)
+            if cached is None:
+                continue
+            facets = cached[1]
+            facet = facets.get(action)
+            if facet is None:
+                facet = facets[action] = ActivityActionFacet(action=action, count=0, last_seen=last_seen)
+            facet.count += count
+            facet.last_seen = max(facet.last_seen, last_seen)
+            facet.levels[level.value] = facet.levels.get(level.value, 0) + count
+    
+    async def get(self, db: AsyncSession, user_id: str) -> List[ActivityActionFacet]:
+        """Facets for a user, sorted by action name."""
+        cached = self._users.get(user_id)
+        if cached is not None and time.monotonic() - cached[0] < self.ttl_seconds:
+            return sorted(cached[1].values(), key=lambda f: f.action)
+        
+        if user_id not in self._backfilled:
+            await self._backfill(db, user_id)
+            self._backfilled.add(user_id)
+        facets = await self._load(db, user_id)
+        
+        self._users[user_id] = (time.monotonic(), facets)
+        return sorted(facets.values(), key=lambda f: f.action)
+    
+    async def _load(self, db: AsyncSession, user_id: str) -> Dict[str, ActivityActionFacet]:
+        result = await db.execute(
+            select(ActivityActionStat).where(ActivityActionStat.user_id == user_id)
+        )
+        
+        facets: Dict[str, ActivityActionFacet] = {}
+        for stat in result.scalars().all():
+            facet = facets.get(stat.action)
+            if facet is None:
+                facet = facets[stat.action] = ActivityActionFacet(
+                    action=stat.action, count=0, last_seen=stat.last_seen
+                )
+            facet.count += stat.count
+            facet.last_seen = max(facet.last_seen, stat.last_seen)
+            facet.levels[stat.level.value] = stat.count
+        return facets
+    
+    async def _backfill(self, db: AsyncSession, user_id: str) -> None:
+        """
+        Rebuild a user's catalogue from their logs unless that was done before.
+        
+        Stats already written since the upgrade are replaced, not added to,
+        since their logs are counted again. On PostgreSQL the stats table is
+        locked meanwhile, so no flush commits between the count and the replace;
+        flushes that are still open wait and add their counts afterwards.
+        """
+        marker = select(ActivityActionBackfill.user_id).where(ActivityActionBackfill.user_id == user_id)
+        if await db.scalar(marker) is not None:
+            return
+        
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            await db.execute(text("LOCK TABLE activity_action_stats IN SHARE ROW EXCLUSIVE MODE"))
+            # Another worker may have finished the backfill while we waited
+            if await db.scalar(marker) is not None:
+                await db.commit()
+                return
+        
+        await db.execute(delete(ActivityActionStat).where(ActivityActionStat.user_id == user_id))
+        await db.execute(
+            insert(ActivityActionStat).from_select(
+                ["user_id", "action", "level", "count", "last_seen"],
+                select(
+                    literal(user_id),
+                    ActivityLog.action,
+                    ActivityLog.level,
+                    func.count(ActivityLog.id),
+                    func.max(ActivityLog.timestamp)
+                )
+                .where(ActivityLog.user_id == user_id)
+                .group_by(ActivityLog.action, ActivityLog.level)
+            )
+        )
+        await db.execute(
+            _upsert(dialect)(ActivityActionBackfill).values(user_id=user_id).on_conflict_do_nothing()
+        )
+        await db.commit()
+
+
+@lru_cache()
+def get_action_catalogue() -> ActionCatalogue:
+    """Get cached action catalogue instance."""
+    settings = get_settings()
+    return ActionCatalogue(ttl_seconds=settings.activity_facets_ttl_seconds)
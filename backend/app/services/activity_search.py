@@ -0,0 +1,116 @@
+"""
+Indexed, ranked search over activity logs.
+
+PostgreSQL uses a generated tsvector column with a GIN index for word search
+and pg_trgm GIN indexes so substring matches stay index-backed. SQLite uses an
+FTS5 table with the trigram tokenizer, kept in sync by triggers.
+"""
+
+from sqlalchemy import Select, func, or_, literal_column, table, column, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.models.activity_log import ActivityLog
+
+
+SEARCH_CONFIG = "english"
+
+POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"""
+    ALTER TABLE activity_logs ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        to_tsvector('{SEARCH_CONFIG}', coalesce(action, '') || ' ' || coalesce(message, ''))
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_activity_logs_search_vector ON activity_logs USING gin (search_vector)",
+    "CREATE INDEX IF NOT EXISTS ix_activity_logs_message_trgm ON activity_logs USING gin (message gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_activity_logs_action_trgm ON activity_logs USING gin (action gin_trgm_ops)",
+]
+
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS activity_logs_fts USING fts5(
+        action, message, content='activity_logs', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS activity_logs_fts_ai AFTER INSERT ON activity_logs BEGIN
+        INSERT INTO activity_logs_fts(rowid, action, message) VALUES (new.id, new.action, new.message);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS activity_logs_fts_ad AFTER DELETE ON activity_logs BEGIN
+        INSERT INTO activity_logs_fts(activity_logs_fts, rowid, action, message)
+        VALUES ('delete', old.id, old.action, old.message);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS activity_logs_fts_au AFTER UPDATE ON activity_logs BEGIN
+        INSERT INTO activity_logs_fts(activity_logs_fts, rowid, action, message)
+        VALUES ('delete', old.id, old.action, old.message);
+        INSERT INTO activity_logs_fts(rowid, action, message) VALUES (new.id, new.action, new.message);
+    END
+    """,
+]
+
+# Trigram tokenizer needs at least three characters to match
+SQLITE_MIN_MATCH_LENGTH = 3
+
+_fts = table("activity_logs_fts", column("rowid"), column("rank"), column("activity_logs_fts"))
+
+
+async def ensure_search_indexes(conn: AsyncConnection) -> None:
+    """Create search columns, indexes and FTS tables if they are missing."""
+    dialect = conn.dialect.name
+    
+    if dialect == "postgresql":
+        for statement in POSTGRES_DDL:
+            await conn.execute(text(statement))
+    elif dialect == "sqlite":
+        existing = await conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'activity_logs_fts'")
+        )
+        created = existing.first() is None
+        for statement in SQLITE_DDL:
+            await conn.execute(text(statement))
+        if created:
+            # Index rows written before the FTS table existed
+            await conn.execute(text("INSERT INTO activity_logs_fts(activity_logs_fts) VALUES ('rebuild')"))
+
+
+def _like_pattern(term: str) -> str:
+    """Substring pattern with LIKE wildcards escaped."""
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def apply_search(query: Select, term: str, dialect: str) -> Select:
+    """Filter a select(ActivityLog) query by term and order it by relevance."""
+    pattern = _like_pattern(term)
+    substring_match = or_(
+        ActivityLog.message.ilike(pattern, escape="\\"),
+        ActivityLog.action.ilike(pattern, escape="\\")
+    )
+    
+    if dialect == "postgresql":
+        vector = literal_column("activity_logs.search_vector")
+        tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, term)
+        rank = func.ts_rank_cd(vector, tsquery) + func.similarity(ActivityLog.message, term)
+        return (
+            query
+            .where(or_(vector.op("@@")(tsquery), substring_match))
+            .order_by(None)
+            .order_by(rank.desc(), ActivityLog.timestamp.desc())
+        )
+    
+    if dialect == "sqlite" and len(term) >= SQLITE_MIN_MATCH_LENGTH:
+        phrase = '"' + term.replace('"', '""') + '"'
+        return (
+            query
+            .join(_fts, _fts.c.rowid == ActivityLog.id)
+            .where(_fts.c.activity_logs_fts.op("MATCH")(phrase))
+            .order_by(None)
+            .order_by(_fts.c.rank, ActivityLog.timestamp.desc())
+        )
+    
+    return query.where(substring_match)
@@ -0,0 +1,211 @@
+"""
+Multi-armed bandit allocation for experiments.
+
+Each served request earns its variant a reward in [0, 1]: 0 for a failure,
+and for a success 1 minus configurable latency and cost penalties. Thompson
+sampling draws from a Beta posterior per variant; UCB1 picks the best upper
+confidence bound. Both read per-variant (pulls, reward) totals held in
+memory, so a choice is a handful of float operations.
+
+Totals are updated online and checkpointed to Experiment.bandit_state
+periodically. A checkpoint adds this worker's pending increments to the
+stored totals under a row lock, so workers pool what they learn.
+"""
+
+import asyncio
+import math
+import random
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, List, Optional
+from sqlalchemy import select
+
+from app.config import get_settings
+from app.database import async_session_maker
+from app.models.experiment import Experiment, AllocationMode
+from app.services.experiment_router import RoutingTable, RoutedVariant
+from app.services.periodic import PeriodicTask
+
+
+class ArmTotals:
+    """Pulls and summed reward of one variant."""
+    
+    __slots__ = ("pulls", "reward")
+    
+    def __init__(self, pulls: float = 0.0, reward: float = 0.0):
+        self.pulls = pulls
+        self.reward = reward
+
+
+class _BanditExperiment:
+    """Checkpointed totals plus increments not yet checkpointed."""
+    
+    def __init__(self, variant_ids: List[int], state: Optional[dict]):
+        stored = (state or {}).get("arms", {})
+        self.base: Dict[int, ArmTotals] = {}
+        for variant_id in variant_ids:
+            arm = stored.get(str(variant_id), {})
+            self.base[variant_id] = ArmTotals(arm.get("pulls", 0.0), arm.get("reward", 0.0))
+        self.pending: Dict[int, ArmTotals] = {}
+    
+    def totals(self, variant_id: int) -> ArmTotals:
+        base = self.base.get(variant_id) or ArmTotals()
+        pending = self.pending.get(variant_id)
+        if pending is None:
+            return base
+        return ArmTotals(base.pulls + pending.pulls, base.reward + pending.reward)
+
+
+class BanditAllocator:
+    """In-memory bandit state per experiment, checkpointed periodically."""
+    
+    def __init__(
+        self,
+        checkpoint_interval_seconds: float = 10,
+        latency_target_ms: float = 5000,
+        latency_weight: float = 0.2,
+        cost_target_cents: float = 1.0,
+        cost_weight: float = 0.0
+    ):
+        self.checkpoint_interval_seconds = checkpoint_interval_seconds
+        self.latency_target_ms = latency_target_ms
+        self.latency_weight = latency_weight
+        self.cost_target_cents = cost_target_cents
+        self.cost_weight = cost_weight
+        self._experiments: Dict[int, _BanditExperiment] = {}
+        self._checkpointer = PeriodicTask(self.checkpoint, checkpoint_interval_seconds, "Bandit checkpoint")
+        self._checkpoint_lock = asyncio.Lock()
+    
+    def _state(self, table: RoutingTable) -> _BanditExperiment:
+        state = self._experiments.get(table.experiment_id)
+        if state is None:
+            state = self._experiments[table.experiment_id] = _BanditExperiment(
+                [variant.id for variant in table.variants], table.bandit_state
+            )
+        return state
+    
+    # ====== Serving ======
+    
+    def choose(self, table: RoutingTable) -> RoutedVariant:
+        """Pick the variant for one request."""
+        state = self._state(table)
+        arms = [(variant, state.totals(variant.id)) for variant in table.variants]
+        
+        if table.allocation_mode == AllocationMode.UCB:
+            # Every arm is tried once before confidence bounds mean anything
+            for variant, totals in arms:
+                if totals.pulls < 1:
+                    return variant
+            log_total = math.log(sum(totals.pulls for _, totals in arms))
+            return max(
+                arms,
+                key=lambda arm: arm[1].reward / arm[1].pulls + math.sqrt(2 * log_total / arm[1].pulls)
+            )[0]
+        
+        # Thompson sampling from Beta(1 + reward, 1 + pulls - reward)
+        return max(
+            arms,
+            key=lambda arm: random.betavariate(1 + arm[1].reward, 1 + max(arm[1].pulls - arm[1].reward, 0.0))
+        )[0]
+    
+    def reward(self, success: bool, latency_ms: float, cost_cents: float) -> float:
+        """Reward of one request in [0, 1]."""
+        if not success:
+            return 0.0
+        penalty = self.latency_weight * min(latency_ms / self.latency_target_ms, 1.0)
+        if self.cost_target_cents > 0:
+            penalty += self.cost_weight * min(cost_cents / self.cost_target_cents, 1.0)
+        return max(0.0, 1.0 - penalty)
+    
+    def update(self, table: RoutingTable, variant_id: int, success: bool, latency_ms: float, cost_cents: float) -> None:
+        """Credit a served request to its variant."""
+        state = self._state(table)
+        pending = state.pending.get(variant_id)
+        if pending is None:
+            pending = state.pending[variant_id] = ArmTotals()
+        pending.pulls += 1
+        pending.reward += self.reward(success, latency_ms, cost_cents)
+    
+    def forget(self, experiment_id: int) -> None:
+        self._experiments.pop(experiment_id, None)
+    
+    # ====== Checkpointing ======
+    
+    async def start(self) -> None:
+        self._checkpointer.start()
+    
+    async def stop(self) -> None:
+        """Stop the checkpoint loop and write whatever is pending."""
+        # A checkpoint in progress has cleared the pending increments, so it
+        # is waited for, not cancelled
+        await self._checkpointer.stop()
+        await self.checkpoint()
+    
+    async def checkpoint(self) -> bool:
+        """Add pending increments to the stored totals. Returns False on failure."""
+        async with self._checkpoint_lock:
+            batch = {}
+            for experiment_id, state in self._experiments.items():
+                if state.pending:
+                    batch[experiment_id] = state.pending
+                    state.pending = {}
+            if not batch:
+                return True
+            
+            try:
+                merged = await self._write(batch)
+            except Exception as e:
+                print(f"❌ Bandit checkpoint failed: {e}")
+                for experiment_id, pending in batch.items():
+                    state = self._experiments.get(experiment_id)
+                    if state is None:
+                        continue
+                    for variant_id, totals in pending.items():
+                        newer = state.pending.setdefault(variant_id, ArmTotals())
+                        newer.pulls += totals.pulls
+                        newer.reward += totals.reward
+                return False
+            
+            # Adopt the pooled totals, which include other workers' rewards
+            for experiment_id, bandit_state in merged.items():
+                state = self._experiments.get(experiment_id)
+                if state is not None:
+                    state.base = _BanditExperiment(list(state.base), bandit_state).base
+            return True
+    
+    async def _write(self, batch: Dict[int, Dict[int, ArmTotals]]) -> Dict[int, dict]:
+        merged: Dict[int, dict] = {}
+        async with async_session_maker() as session:
+            result = await session.execute(
+                select(Experiment)
+                .where(Experiment.id.in_(list(batch)))
+                .with_for_update()
+            )
+            for experiment in result.scalars():
+                arms = dict((experiment.bandit_state or {}).get("arms", {}))
+                for variant_id, totals in batch[experiment.id].items():
+                    arm = arms.get(str(variant_id), {})
+                    arms[str(variant_id)] = {
+                        "pulls": arm.get("pulls", 0.0) + totals.pulls,
+                        "reward": arm.get("reward", 0.0) + totals.reward
+                    }
+                # Reassign so the JSON column is marked dirty
+                experiment.bandit_state = merged[experiment.id] = {
+                    "arms": arms,
+                    "updated_at": datetime.now(timezone.utc).isoformat()
+                }
+            await session.commit()
+        return merged
+
+
+@lru_cache()
+def get_bandit_allocator() -> BanditAllocator:
+    """Get cached bandit allocator instance."""
+    settings = get_settings()
+    return BanditAllocator(
+        checkpoint_interval_seconds=settings.bandit_checkpoint_interval_seconds,
+        latency_target_ms=settings.bandit_latency_target_ms,
+        latency_weight=settings.bandit_latency_weight,
+        cost_target_cents=settings.bandit_cost_target_cents,
+        cost_weight=settings.bandit_cost_weight
+    )
@@ -0,0 +1,248 @@
+"""
+Bulk export and import of environments, prompts and versions.
+
+Exports stream rows straight from the database. Imports are applied in
+chunks, one transaction each, with existence and conflict checks done per
+chunk in a single query rather than per record.
+"""
+
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Tuple, Union
+from sqlalchemy import select, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import async_session_maker
+from app.models.environment import Environment
+from app.models.prompt import Prompt, PromptVersion
+from app.schemas.bulk import (
+    BulkEnvironment, BulkPrompt, BulkVersion,
+    BulkConflict, BulkError, BulkImportSummary
+)
+from app.services.prompt_blobs import intern_texts
+
+
+EXPORT_BATCH_SIZE = 500
+
+Record = Union[BulkEnvironment, BulkPrompt, BulkVersion]
+
+
+async def export_records(user_id: str) -> AsyncIterator[Record]:
+    """
+    Yield a user's environments, then prompts, then versions.
+    Uses its own session so it can outlive the request handler.
+    """
+    async with async_session_maker() as session:
+        environments = await session.scalars(
+            select(Environment).where(Environment.user_id == user_id).order_by(Environment.id)
+        )
+        for environment in environments:
+            yield BulkEnvironment.model_validate(environment, from_attributes=True)
+        
+        prompts = await session.stream(
+            select(Prompt.id, Prompt.name, Prompt.description)
+            .where(Prompt.user_id == user_id)
+            .order_by(Prompt.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        async for prompt in prompts:
+            yield BulkPrompt(ref=prompt.id, name=prompt.name, description=prompt.description)
+        
+        versions = await session.stream_scalars(
+            select(PromptVersion)
+            .join(Prompt)
+            .where(Prompt.user_id == user_id)
+            .order_by(PromptVersion.prompt_id, PromptVersion.created_at, PromptVersion.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        async for partition in versions.partitions():
+            for version in partition:
+                yield BulkVersion(
+                    prompt_ref=version.prompt_id,
+                    version_tag=version.version_tag,
+                    system_prompt=version.system_prompt,
+                    user_prompt=version.user_prompt,
+                    model=version.model,
+                    temperature=version.temperature,
+                    max_tokens=version.max_tokens,
+                    commit_message=version.commit_message,
+                    variables=version.variables,
+                    created_at=version.created_at
+                )
+            # Keep memory flat on large catalogues
+            session.expunge_all()
+
+
+class BulkImporter:
+    """
+    Applies imported records in chunks.
+    
+    Environments and prompts are matched by name: an existing environment is
+    reported as a conflict, while an existing prompt receives the imported
+    versions. Versions whose tag already exists on the target prompt are
+    reported as conflicts and skipped.
+    """
+    
+    def __init__(self, db: AsyncSession, user_id: str, chunk_size: int = 500):
+        self.db = db
+        self.user_id = user_id
+        self.chunk_size = chunk_size
+        self.summary = BulkImportSummary()
+        self._chunk: List[Tuple[int, Record]] = []
+        self._prompt_ids: Dict[int, int] = {}  # Import ref -> prompt ID
+        self._prompt_names: Dict[int, str] = {}  # Prompt ID -> name, for conflict reports
+    
+    def error(self, line: int, detail: str) -> None:
+        """Record a line that was skipped."""
+        self.summary.errors.append(BulkError(line=line, detail=detail))
+    
+    async def add(self, line: int, record: Record) -> None:
+        """Queue a record, writing the chunk once it is full."""
+        self._chunk.append((line, record))
+        if len(self._chunk) >= self.chunk_size:
+            await self.flush()
+    
+    async def flush(self) -> None:
+        """Write the queued chunk in one transaction."""
+        chunk, self._chunk = self._chunk, []
+        if not chunk:
+            return
+        
+        environments = [(line, r) for line, r in chunk if isinstance(r, BulkEnvironment)]
+        prompts = [(line, r) for line, r in chunk if isinstance(r, BulkPrompt)]
+        versions = [(line, r) for line, r in chunk if isinstance(r, BulkVersion)]
+        
+        try:
+            await self._import_environments(environments)
+            await self._import_prompts(prompts)
+            await self._import_versions(versions)
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            raise
+    
+    async def _import_environments(self, records: List[Tuple[int, BulkEnvironment]]) -> None:
+        if not records:
+            return
+        
+        existing = set((await self.db.scalars(
+            select(Environment.name).where(
+                Environment.user_id == self.user_id,
+                Environment.name.in_({r.name for _, r in records})
+            )
+        )).all())
+        
+        rows = []
+        for _, record in records:
+            if record.name in existing:
+                self.summary.conflicts.append(BulkConflict(type="environment", name=record.name))
+                continue
+            existing.add(record.name)
+            rows.append({**record.model_dump(exclude={"type"}), "user_id": self.user_id})
+        
+        if rows:
+            await self.db.execute(insert(Environment), rows)
+        self.summary.environments_created += len(rows)
+    
+    async def _import_prompts(self, records: List[Tuple[int, BulkPrompt]]) -> None:
+        if not records:
+            return
+        
+        existing: Dict[str, int] = {}
+        result = await self.db.execute(
+            select(Prompt.id, Prompt.name)
+            .where(Prompt.user_id == self.user_id, Prompt.name.in_({r.name for _, r in records}))
+            .order_by(Prompt.id)
+        )
+        for prompt_id, name in result:
+            existing.setdefault(name, prompt_id)
+        
+        # Prompts to create, with every ref that maps onto each
+        new_refs: Dict[str, List[int]] = {}
+        new_rows: List[dict] = []
+        seen_refs = set(self._prompt_ids)
+        for line, record in records:
+            if record.ref in seen_refs:
+                self.error(line, f"Duplicate prompt ref {record.ref}")
+                continue
+            seen_refs.add(record.ref)
+            if record.name in existing:
+                self._prompt_ids[record.ref] = existing[record.name]
+                self._prompt_names[existing[record.name]] = record.name
+                self.summary.prompts_matched += 1
+                continue
+            if record.name not in new_refs:
+                new_refs[record.name] = []
+                new_rows.append({"user_id": self.user_id, "name": record.name, "description": record.description})
+            new_refs[record.name].append(record.ref)
+        
+        if not new_rows:
+            return
+        
+        ids = (await self.db.scalars(
+            insert(Prompt).returning(Prompt.id, sort_by_parameter_order=True),
+            new_rows
+        )).all()
+        for row, prompt_id in zip(new_rows, ids):
+            self._prompt_names[prompt_id] = row["name"]
+            for ref in new_refs[row["name"]]:
+                self._prompt_ids[ref] = prompt_id
+        self.summary.prompts_created += len(new_rows)
+    
+    async def _import_versions(self, records: List[Tuple[int, BulkVersion]]) -> None:
+        resolved: List[Tuple[int, BulkVersion]] = []
+        for line, record in records:
+            prompt_id = self._prompt_ids.get(record.prompt_ref)
+            if prompt_id is None:
+                self.error(line, f"Unknown prompt_ref {record.prompt_ref}")
+                continue
+            resolved.append((prompt_id, record))
+        
+        if not resolved:
+            return
+        
+        # One query for every tag this chunk could collide with
+        result = await self.db.execute(
+            select(PromptVersion.prompt_id, PromptVersion.version_tag).where(
+                PromptVersion.prompt_id.in_({prompt_id for prompt_id, _ in resolved}),
+                PromptVersion.version_tag.in_({r.version_tag for _, r in resolved})
+            )
+        )
+        taken = set(result.tuples())
+        
+        accepted: List[Tuple[int, BulkVersion]] = []
+        for prompt_id, record in resolved:
+            key = (prompt_id, record.version_tag)
+            if key in taken:
+                self.summary.conflicts.append(BulkConflict(
+                    type="version",
+                    name=self._prompt_names[prompt_id],
+                    version_tag=record.version_tag
+                ))
+                continue
+            taken.add(key)
+            accepted.append((prompt_id, record))
+        
+        if not accepted:
+            return
+        
+        hashes = await intern_texts(
+            self.db,
+            [text for _, r in accepted for text in (r.system_prompt, r.user_prompt)]
+        )
+        now = datetime.now(timezone.utc)
+        await self.db.execute(insert(PromptVersion), [
+            {
+                "prompt_id": prompt_id,
+                "version_tag": record.version_tag,
+                "system_prompt_hash": hashes[record.system_prompt],
+                "user_prompt_hash": hashes[record.user_prompt],
+                "model": record.model,
+                "temperature": record.temperature,
+                "max_tokens": record.max_tokens,
+                "commit_message": record.commit_message,
+                "variables": record.variables,
+                "created_at": record.created_at or now,
+            }
+            for prompt_id, record in accepted
+        ])
+        self.summary.versions_created += len(accepted)
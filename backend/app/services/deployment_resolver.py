@@ -0,0 +1,283 @@
+"""
+In-memory resolver for active deployments.
+
+Maps (user, environment, prompt) to the live version, fully materialized:
+prompt text, compiled template and generation config. Lookups are a dict
+access; the database is only read on a miss or after an invalidation.
+
+A canary deployment is attached to the active deployment it runs against.
+Callers pick an arm per request with pick(), which hashes a caller-supplied
+assignment key so the same caller keeps getting the same version.
+"""
+
+import hashlib
+import random
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import select
+
+from app.database import async_session_maker
+from app.models.deployment import Deployment, DeploymentStatus
+from app.models.environment import Environment
+from app.models.prompt import Prompt, PromptVersion
+from app.schemas.deployment import DeploymentResponse
+from app.services.templates import CompiledTemplate, get_template_cache
+
+
+DeploymentKey = Tuple[str, int, int]  # (user_id, environment_id, prompt_id)
+NameKey = Tuple[str, str, str]  # (user_id, environment name, prompt name)
+EnvironmentNameKey = Tuple[str, str, int]  # (user_id, environment name, prompt_id)
+
+
+class ResolvedDeployment:
+    """An active deployment with everything needed to serve it."""
+    
+    def __init__(
+        self,
+        deployment: Deployment,
+        version: PromptVersion,
+        prompt_name: str,
+        prompt_updated_at: datetime,
+        environment_name: str
+    ):
+        self.deployment_id = deployment.id
+        self.user_id = deployment.user_id
+        self.environment_id = deployment.environment_id
+        self.environment_name = environment_name
+        self.prompt_id = version.prompt_id
+        self.prompt_name = prompt_name
+        self.prompt_updated_at = prompt_updated_at
+        self.version_id = version.id
+        self.version_tag = version.version_tag
+        self.status = deployment.status
+        self.traffic_percent = deployment.traffic_percent
+        self.canary: Optional["ResolvedDeployment"] = None
+        
+        # Generation config
+        self.system_prompt = version.system_prompt
+        self.user_prompt = version.user_prompt
+        self.model = version.model
+        self.temperature = version.temperature
+        self.max_tokens = version.max_tokens
+        self.variables = version.variables
+        self.template: CompiledTemplate = get_template_cache().get(version.user_prompt_hash, version.user_prompt)
+        
+        self.response = DeploymentResponse(
+            id=deployment.id,
+            version_id=deployment.version_id,
+            environment_id=deployment.environment_id,
+            user_id=deployment.user_id,
+            status=deployment.status,
+            traffic_percent=deployment.traffic_percent,
+            revision=deployment.revision,
+            notes=deployment.notes,
+            rolled_back_from_id=deployment.rolled_back_from_id,
+            created_at=deployment.created_at,
+            deployed_at=deployment.deployed_at,
+            version_tag=version.version_tag,
+            prompt_name=prompt_name,
+            environment_name=environment_name
+        )
+    
+    @property
+    def key(self) -> DeploymentKey:
+        return (self.user_id, self.environment_id, self.prompt_id)
+    
+    @property
+    def name_key(self) -> NameKey:
+        return (self.user_id, self.environment_name, self.prompt_name)
+    
+    @property
+    def environment_name_key(self) -> EnvironmentNameKey:
+        return (self.user_id, self.environment_name, self.prompt_id)
+
+
+def _active_query():
+    return (
+        select(Deployment, PromptVersion, Prompt.name, Prompt.updated_at, Environment.name)
+        .join(PromptVersion, Deployment.version_id == PromptVersion.id)
+        .join(Prompt, PromptVersion.prompt_id == Prompt.id)
+        .join(Environment, Deployment.environment_id == Environment.id)
+        .where(Deployment.status.in_([DeploymentStatus.ACTIVE, DeploymentStatus.CANARY]))
+    )
+
+
+def assignment_bucket(deployment_id: int, assignment_key: str) -> int:
+    """Stable bucket in [0, 100) for a caller within one canary."""
+    digest = hashlib.sha256(f"{deployment_id}:{assignment_key}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % 100
+
+
+class DeploymentResolver:
+    """
+    Cache of active deployments, indexed by IDs and by names.
+    
+    Writers call invalidate after committing. Loads that overlap an
+    invalidation are discarded, so a slow read cannot reinstate stale data.
+    """
+    
+    def __init__(self):
+        self._entries: Dict[DeploymentKey, ResolvedDeployment] = {}
+        self._names: Dict[NameKey, DeploymentKey] = {}
+        self._environment_names: Dict[EnvironmentNameKey, DeploymentKey] = {}
+        self._generation = 0
+    
+    def _store(self, loaded: Iterable[ResolvedDeployment]) -> None:
+        """Cache active deployments and attach canaries to them."""
+        canaries = []
+        for resolved in loaded:
+            if resolved.status == DeploymentStatus.CANARY:
+                canaries.append(resolved)
+                continue
+            self._entries[resolved.key] = resolved
+            self._names[resolved.name_key] = resolved.key
+            self._environment_names[resolved.environment_name_key] = resolved.key
+        
+        for canary in canaries:
+            stable = self._entries.get(canary.key)
+            if stable is not None:
+                stable.canary = canary
+    
+    def _drop(self, key: DeploymentKey) -> None:
+        resolved = self._entries.pop(key, None)
+        if resolved is None:
+            return
+        if self._names.get(resolved.name_key) == key:
+            del self._names[resolved.name_key]
+        if self._environment_names.get(resolved.environment_name_key) == key:
+            del self._environment_names[resolved.environment_name_key]
+    
+    async def warm(self) -> int:
+        """Load every active and canary deployment. Returns the number cached."""
+        generation = self._generation
+        async with async_session_maker() as session:
+            result = await session.execute(_active_query())
+            loaded = [ResolvedDeployment(*row) for row in result]
+        
+        if generation == self._generation:
+            self._store(loaded)
+        return len(loaded)
+    
+    async def _load(self, *criteria) -> Optional[ResolvedDeployment]:
+        generation = self._generation
+        async with async_session_maker() as session:
+            result = await session.execute(
+                _active_query().where(*criteria).order_by(Deployment.deployed_at.desc())
+            )
+            loaded = [ResolvedDeployment(*row) for row in result]
+        
+        stables = [resolved for resolved in loaded if resolved.status == DeploymentStatus.ACTIVE]
+        if not stables:
+            return None
+        
+        # Name lookups can match several prompts; the latest deployed wins
+        stable = stables[0]
+        for resolved in loaded:
+            if resolved.status == DeploymentStatus.CANARY and resolved.key == stable.key:
+                stable.canary = resolved
+        
+        if generation == self._generation:
+            self._store([stable])
+        return stable
+    
+    async def resolve(self, user_id: str, environment_id: int, prompt_id: int) -> Optional[ResolvedDeployment]:
+        """Active deployment of a prompt in an environment, or None."""
+        resolved = self._entries.get((user_id, environment_id, prompt_id))
+        if resolved is not None:
+            return resolved
+        return await self._load(
+            Deployment.user_id == user_id,
+            Deployment.environment_id == environment_id,
+            Prompt.id == prompt_id
+        )
+    
+    async def resolve_by_name(self, user_id: str, environment_name: str, prompt_name: str) -> Optional[ResolvedDeployment]:
+        """Active deployment looked up by environment and prompt names."""
+        key = self._names.get((user_id, environment_name, prompt_name))
+        if key is not None and key in self._entries:
+            return self._entries[key]
+        return await self._load(
+            Deployment.user_id == user_id,
+            Environment.name == environment_name,
+            Prompt.name == prompt_name
+        )
+    
+    async def resolve_in_environment(self, user_id: str, environment_name: str, prompt_id: int) -> Optional[ResolvedDeployment]:
+        """Active deployment looked up by environment name and prompt ID."""
+        key = self._environment_names.get((user_id, environment_name, prompt_id))
+        if key is not None and key in self._entries:
+            return self._entries[key]
+        return await self._load(
+            Deployment.user_id == user_id,
+            Environment.name == environment_name,
+            Prompt.id == prompt_id
+        )
+    
+    async def load_environment(self, user_id: str, environment_id: int) -> List[ResolvedDeployment]:
+        """
+        Every active deployment in an environment, canaries attached, read
+        fresh from the database. Results refill the cache as a side effect.
+        """
+        generation = self._generation
+        async with async_session_maker() as session:
+            result = await session.execute(
+                _active_query().where(
+                    Deployment.user_id == user_id,
+                    Deployment.environment_id == environment_id
+                )
+            )
+            loaded = [ResolvedDeployment(*row) for row in result]
+        
+        stables = {resolved.key: resolved for resolved in loaded if resolved.status == DeploymentStatus.ACTIVE}
+        for resolved in loaded:
+            if resolved.status == DeploymentStatus.CANARY and resolved.key in stables:
+                stables[resolved.key].canary = resolved
+        
+        if generation == self._generation:
+            self._store(stables.values())
+        return sorted(stables.values(), key=lambda resolved: resolved.prompt_id)
+    
+    def pick(self, stable: ResolvedDeployment, assignment_key: Optional[str] = None) -> ResolvedDeployment:
+        """
+        Choose the arm that serves a request. With an assignment key the choice
+        is sticky; without one, requests are split at random.
+        """
+        canary = stable.canary
+        if canary is None:
+            return stable
+        
+        if assignment_key is None:
+            bucket = random.randrange(100)
+        else:
+            bucket = assignment_bucket(canary.deployment_id, assignment_key)
+        return canary if bucket < canary.traffic_percent else stable
+    
+    def invalidate(self, user_id: str, environment_id: int, prompt_id: int) -> None:
+        """Forget the active deployment of one prompt in one environment."""
+        self._generation += 1
+        self._drop((user_id, environment_id, prompt_id))
+    
+    def invalidate_prompt(self, user_id: str, prompt_id: int) -> None:
+        """Forget a prompt in every environment, e.g. after a rename or delete."""
+        self._generation += 1
+        for key in [key for key in self._entries if key[0] == user_id and key[2] == prompt_id]:
+            self._drop(key)
+    
+    def invalidate_environment(self, user_id: str, environment_id: int) -> None:
+        """Forget every prompt deployed to an environment."""
+        self._generation += 1
+        for key in [key for key in self._entries if key[0] == user_id and key[1] == environment_id]:
+            self._drop(key)
+    
+    def clear(self) -> None:
+        self._generation += 1
+        self._entries.clear()
+        self._names.clear()
+        self._environment_names.clear()
+
+
+@lru_cache()
+def get_deployment_resolver() -> DeploymentResolver:
+    """Get cached deployment resolver instance."""
+    return DeploymentResolver()
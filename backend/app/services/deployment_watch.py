@@ -0,0 +1,57 @@
+"""
+Wake-ups for clients long-polling an environment's deployments.
+
+Each environment with waiting clients has one asyncio.Event. The invalidation
+bus sets it when a deployment in that environment changes, on this worker or
+(via the PostgreSQL bridge) on another one. Waiting clients hold no database
+connection, so an idle watcher costs one suspended coroutine.
+"""
+
+import asyncio
+from functools import lru_cache
+from typing import Dict
+
+
+class DeploymentWatch:
+    """Per-environment events that fire when deployments change."""
+    
+    def __init__(self):
+        self._events: Dict[int, asyncio.Event] = {}
+    
+    def event(self, environment_id: int) -> asyncio.Event:
+        """
+        The event the next change to an environment will set. Take it before
+        reading the revision, so a change in between is not missed.
+        """
+        event = self._events.get(environment_id)
+        if event is None:
+            event = self._events[environment_id] = asyncio.Event()
+        return event
+    
+    def notify(self, environment_id: int) -> None:
+        """Wake everyone waiting on an environment."""
+        # Later waiters get a fresh event; current ones already hold this one
+        event = self._events.pop(environment_id, None)
+        if event is not None:
+            event.set()
+    
+    def notify_all(self) -> None:
+        """Wake every waiter, e.g. after events may have been missed."""
+        events, self._events = self._events, {}
+        for event in events.values():
+            event.set()
+    
+    @staticmethod
+    async def wait(event: asyncio.Event, timeout: float) -> bool:
+        """Wait for an event. Returns False on timeout."""
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+@lru_cache()
+def get_deployment_watch() -> DeploymentWatch:
+    """Get cached deployment watch instance."""
+    return DeploymentWatch()
@@ -0,0 +1,188 @@
+"""
+Environment bundles: every active prompt in an environment in one download.
+
+A bundle is gzipped JSON holding, per prompt, the deployed version's text,
+its template pre-split into literal and {{variable}} parts, and its model
+config. The bundle hash covers content only, so redeploying or rolling back
+to the same versions yields the same hash. Entries carry their deployment
+IDs, but those are left out of the hash: a client already holding the same
+content keeps the IDs it was first given. Clients that hold an earlier
+bundle can ask for a delta against its hash.
+
+Built bundles are cached per environment and reused until the environment's
+revision moves, i.e. until the next deploy, rollback or canary change.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from app.config import get_settings
+from app.services.deployment_resolver import ResolvedDeployment, get_deployment_resolver
+
+
+def _canonical(value) -> bytes:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def _compress(value) -> bytes:
+    # mtime=0 keeps the bytes identical for identical content
+    return gzip.compress(_canonical(value), mtime=0)
+
+
+def content_hash(entry: dict) -> str:
+    """Hash of an entry without its deployment IDs, which change on every redeploy."""
+    content = {key: value for key, value in entry.items() if key != "deployment_id"}
+    if "canary" in entry:
+        content["canary"] = {key: value for key, value in entry["canary"].items() if key != "deployment_id"}
+    return hashlib.sha256(_canonical(content)).hexdigest()
+
+
+def _arm(resolved: ResolvedDeployment) -> dict:
+    """The version-specific part of a bundle entry."""
+    return {
+        "deployment_id": resolved.deployment_id,
+        "version_id": resolved.version_id,
+        "version_tag": resolved.version_tag,
+        "model": resolved.model,
+        "temperature": resolved.temperature,
+        "max_tokens": resolved.max_tokens,
+        "system_prompt": resolved.system_prompt,
+        # Even indexes are literals, odd indexes are variable names
+        "user_prompt_parts": resolved.template.parts,
+        "placeholders": list(resolved.template.variables),
+        "variables": resolved.variables,
+    }
+
+
+def bundle_entry(resolved: ResolvedDeployment) -> dict:
+    """One prompt's entry: the active version plus its canary, if any."""
+    entry = {"prompt_id": resolved.prompt_id, "prompt_name": resolved.prompt_name, **_arm(resolved)}
+    if resolved.canary is not None:
+        entry["canary"] = {**_arm(resolved.canary), "traffic_percent": resolved.canary.traffic_percent}
+    return entry
+
+
+class EnvironmentBundle:
+    """A built bundle, with per-prompt hashes for computing deltas."""
+    
+    def __init__(self, user_id: str, environment_id: int, environment_name: str, revision: int, entries: List[dict]):
+        self.user_id = user_id
+        self.environment_id = environment_id
+        self.environment_name = environment_name
+        self.revision = revision
+        self.entries: Dict[int, dict] = {entry["prompt_id"]: entry for entry in entries}
+        self.entry_hashes: Dict[int, str] = {
+            prompt_id: content_hash(entry) for prompt_id, entry in self.entries.items()
+        }
+        self.hash = hashlib.sha256(
+            _canonical(sorted(self.entry_hashes.items()))
+        ).hexdigest()
+        self.data = _compress(self._document(delta=False, prompts=entries))
+        self._deltas: Dict[str, bytes] = {}
+    
+    def _document(self, delta: bool, **body) -> dict:
+        return {
+            "environment_id": self.environment_id,
+            "environment": self.environment_name,
+            "revision": self.revision,
+            "hash": self.hash,
+            "delta": delta,
+            **body
+        }
+    
+    def delta_from(self, base_hash: str, base_entry_hashes: Dict[int, str]) -> bytes:
+        """Gzipped delta turning the bundle with base_hash into this one."""
+        cached = self._deltas.get(base_hash)
+        if cached is not None:
+            return cached
+        
+        changed = [
+            entry for prompt_id, entry in self.entries.items()
+            if base_entry_hashes.get(prompt_id) != self.entry_hashes[prompt_id]
+        ]
+        removed = sorted(prompt_id for prompt_id in base_entry_hashes if prompt_id not in self.entries)
+        data = self._deltas[base_hash] = _compress(
+            self._document(delta=True, base=base_hash, changed=changed, removed=removed)
+        )
+        return data
+
+
+class BundleCache:
+    """
+    Latest bundle per environment, plus the per-prompt hashes of a few
+    earlier bundles so deltas can be served against them.
+    """
+    
+    def __init__(self, history: int = 8):
+        self.history = history
+        self._bundles: Dict[int, EnvironmentBundle] = {}
+        self._history: Dict[int, "OrderedDict[str, Dict[int, str]]"] = {}
+        self._locks: Dict[int, asyncio.Lock] = {}
+        self._generation = 0
+    
+    async def get(self, user_id: str, environment_id: int, environment_name: str, revision: int) -> EnvironmentBundle:
+        """The bundle for an environment at a revision, building it if needed."""
+        bundle = self._bundles.get(environment_id)
+        if bundle is not None and bundle.revision == revision:
+            return bundle
+        
+        # One build per environment; clients arriving meanwhile wait for it
+        lock = self._locks.setdefault(environment_id, asyncio.Lock())
+        async with lock:
+            bundle = self._bundles.get(environment_id)
+            if bundle is not None and bundle.revision == revision:
+                return bundle
+            
+            generation = self._generation
+            resolved = await get_deployment_resolver().load_environment(user_id, environment_id)
+            entries = [bundle_entry(item) for item in resolved]
+            bundle = await asyncio.to_thread(
+                EnvironmentBundle, user_id, environment_id, environment_name, revision, entries
+            )
+            # A build that overlapped an invalidation is served once but not kept
+            if generation == self._generation:
+                self._store(bundle)
+        return bundle
+    
+    def _store(self, bundle: EnvironmentBundle) -> None:
+        self._bundles[bundle.environment_id] = bundle
+        history = self._history.setdefault(bundle.environment_id, OrderedDict())
+        history[bundle.hash] = bundle.entry_hashes
+        history.move_to_end(bundle.hash)
+        while len(history) > self.history:
+            history.popitem(last=False)
+    
+    def delta(self, bundle: EnvironmentBundle, base_hash: str) -> Optional[bytes]:
+        """Gzipped delta from an earlier bundle, or None if that bundle is unknown."""
+        base = self._history.get(bundle.environment_id, {}).get(base_hash)
+        if base is None:
+            return None
+        return bundle.delta_from(base_hash, base)
+    
+    def invalidate(self, environment_id: int) -> None:
+        """Drop an environment's bundle. History is kept for deltas."""
+        self._generation += 1
+        self._bundles.pop(environment_id, None)
+    
+    def invalidate_user(self, user_id: str) -> None:
+        """Drop a user's bundles, e.g. after a prompt rename. History is kept for deltas."""
+        self._generation += 1
+        for environment_id in [key for key, bundle in self._bundles.items() if bundle.user_id == user_id]:
+            del self._bundles[environment_id]
+    
+    def clear(self) -> None:
+        self._generation += 1
+        self._bundles.clear()
+        self._history.clear()
+
+
+@lru_cache()
+def get_bundle_cache() -> BundleCache:
+    """Get cached bundle cache instance."""
+    settings = get_settings()
+    return BundleCache(history=settings.environment_bundle_history)
@@ -0,0 +1,110 @@
+"""
+In-process pub/sub bus for pushing activity events to connected clients.
+"""
+
+import asyncio
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.config import get_settings
+from app.services.pg_notify import PgNotifyListener, notify, MAX_PAYLOAD_BYTES
+
+
+ACTIVITY_CHANNEL = "promptops_activity"
+
+
+class Subscription:
+    """A single client's bounded event queue."""
+    
+    def __init__(self, user_id: str, maxsize: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = False
+
+
+class EventBus:
+    """
+    Broadcasts per-user events to subscribers.
+    
+    Each subscriber has a bounded queue. A subscriber whose queue is full is
+    dropped rather than slowing down publishers; clients are expected to
+    reconnect and backfill.
+    
+    With the PostgreSQL bridge enabled, events are also sent over NOTIFY so
+    subscribers on other workers receive them.
+    """
+    
+    def __init__(self, queue_size: int = 100, pg_bridge: bool = False):
+        self.queue_size = queue_size
+        self.pg_bridge = pg_bridge
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._listener: Optional[PgNotifyListener] = None
+    
+    def subscribe(self, user_id: str) -> Subscription:
+        """Register a new subscriber for a user's events."""
+        subscription = Subscription(user_id, self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+    
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Remove a subscriber."""
+        subscribers = self._subscribers.get(subscription.user_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.user_id]
+    
+    def publish_local(self, user_id: str, event: dict) -> None:
+        """Deliver an event to this worker's subscribers."""
+        for subscription in list(self._subscribers.get(user_id, ())):
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                subscription.dropped = True
+                self.unsubscribe(subscription)
+    
+    async def publish(self, events: List[Tuple[str, dict]]) -> None:
+        """Deliver (user_id, event) pairs locally and, if bridged, to other workers."""
+        for user_id, event in events:
+            self.publish_local(user_id, event)
+        
+        if self.pg_bridge and events:
+            await self._notify(events)
+    
+    async def _notify(self, events: List[Tuple[str, dict]]) -> None:
+        """Send events over NOTIFY, one per notification when a batch is too large."""
+        try:
+            if await notify(ACTIVITY_CHANNEL, events):
+                return
+            for pair in events:
+                if not await notify(ACTIVITY_CHANNEL, [pair]):
+                    print(f"⚠️ Activity event too large to share (limit {MAX_PAYLOAD_BYTES} bytes)")
+        except Exception as e:
+            print(f"❌ Activity NOTIFY failed: {e}")
+    
+    def _on_notification(self, data) -> None:
+        for user_id, event in data or []:
+            self.publish_local(user_id, event)
+    
+    async def start(self) -> None:
+        """Start the PostgreSQL bridge if enabled."""
+        if self.pg_bridge:
+            self._listener = PgNotifyListener(ACTIVITY_CHANNEL, self._on_notification)
+            await self._listener.start()
+    
+    async def stop(self) -> None:
+        """Stop the bridge."""
+        if self._listener:
+            await self._listener.stop()
+            self._listener = None
+
+
+@lru_cache()
+def get_event_bus() -> EventBus:
+    """Get cached event bus instance."""
+    settings = get_settings()
+    return EventBus(
+        queue_size=settings.activity_stream_queue_size,
+        pg_bridge=settings.activity_events_pg_bridge
+    )
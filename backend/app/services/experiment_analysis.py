@@ -0,0 +1,524 @@
+"""
+Significance testing for experiments.
+
+Works on the per-request metric rows tagged with each variant. Rows are
+fetched incrementally past a watermark and kept as numpy arrays per
+experiment, so a running experiment is re-analysed by reading only the
+requests that arrived since the last look.
+
+Every variant is compared with the control (the first variant created):
+success rate with a two-proportion z-test, latency with Welch's t-test and
+a Mann-Whitney U test. With a target sample size, tests run only at a fixed
+schedule of equally spaced looks, each on the samples up to that look and
+against a Lan-DeMets O'Brien-Fleming boundary. Re-analysing a running
+experiment any number of times therefore keeps the false positive rate at
+alpha. Without a target the tests are fixed-horizon: their p-values hold for
+a single look, such as the one taken when the experiment is stopped.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from datetime import datetime, timezone
+from functools import lru_cache
+from statistics import NormalDist
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models.experiment import Experiment, ExperimentStatus
+from app.models.metric import Metric
+from app.schemas.experiment import (
+    ExperimentAnalysis, VariantSummary, VariantComparison,
+    ProportionTest, MeanTest, RankTest
+)
+
+
+NORMAL = NormalDist()
+
+# Columns of the per-variant sample arrays
+SUCCESS, LATENCY, TOKENS, COST, ID = range(5)
+
+T = TypeVar("T")
+
+
+# ====== Distributions ======
+
+def _betacf(a: float, b: float, x: float) -> float:
+    """Continued fraction for the incomplete beta function (modified Lentz)."""
+    tiny = 1e-300
+    qab, qap, qam = a + b, a + 1.0, a - 1.0
+    c = 1.0
+    d = 1.0 - qab * x / qap
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    h = d
+    for m in range(1, 300):
+        m2 = 2 * m
+        for aa in (
+            m * (b - m) * x / ((qam + m2) * (a + m2)),
+            -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))
+        ):
+            d = 1.0 + aa * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + aa / c
+            c = c if abs(c) > tiny else tiny
+            h *= d * c
+        if abs(d * c - 1.0) < 1e-14:
+            break
+    return h
+
+
+def _betainc(a: float, b: float, x: float) -> float:
+    """Regularized incomplete beta function I_x(a, b)."""
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    front = math.exp(
+        math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log1p(-x)
+    )
+    if x < (a + 1.0) / (a + b + 2.0):
+        return front * _betacf(a, b, x) / a
+    return 1.0 - front * _betacf(b, a, 1.0 - x) / b
+
+
+def t_two_sided_p(t: float, df: float) -> float:
+    """Two-sided p-value of Student's t."""
+    return _betainc(df / 2.0, 0.5, df / (df + t * t))
+
+
+def t_critical(alpha: float, df: float) -> float:
+    """|t| with two-sided p-value alpha, by bisection."""
+    low, high = 0.0, 1e4
+    for _ in range(100):
+        mid = (low + high) / 2.0
+        if t_two_sided_p(mid, df) > alpha:
+            low = mid
+        else:
+            high = mid
+    return high
+
+
+def normal_two_sided_p(z: float) -> float:
+    return math.erfc(abs(z) / math.sqrt(2.0))
+
+
+# ====== Tests ======
+
+def wilson_interval(successes: int, n: int, z: float) -> Tuple[float, float]:
+    if n == 0:
+        return (0.0, 0.0)
+    p = successes / n
+    denominator = 1.0 + z * z / n
+    centre = (p + z * z / (2 * n)) / denominator
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+    return (max(0.0, centre - half), min(1.0, centre + half))
+
+
+def two_proportion_test(variant: np.ndarray, control: np.ndarray, z_crit: float, alpha: float) -> Optional[ProportionTest]:
+    """Pooled two-proportion z-test on success flags."""
+    n1, n2 = len(variant), len(control)
+    if n1 == 0 or n2 == 0:
+        return None
+    p1, p2 = variant.mean(), control.mean()
+    pooled = (variant.sum() + control.sum()) / (n1 + n2)
+    se_pooled = math.sqrt(pooled * (1 - pooled) * (1 / n1 + 1 / n2))
+    # Unpooled standard error for the interval on the difference
+    se = math.sqrt(p1 * (1 - p1) / n1 + p2 * (1 - p2) / n2)
+    diff = float(p1 - p2)
+    z = diff / se_pooled if se_pooled > 0 else 0.0
+    p_value = normal_two_sided_p(z)
+    return ProportionTest(
+        difference=diff,
+        difference_ci=(diff - z_crit * se, diff + z_crit * se),
+        z=z,
+        p_value=p_value,
+        significant=p_value < alpha
+    )
+
+
+def welch_test(variant: np.ndarray, control: np.ndarray, z_crit: float, alpha: float) -> Optional[MeanTest]:
+    """Welch's unequal-variance t-test on means."""
+    n1, n2 = len(variant), len(control)
+    if n1 < 2 or n2 < 2:
+        return None
+    v1, v2 = variant.var(ddof=1) / n1, control.var(ddof=1) / n2
+    se = math.sqrt(v1 + v2)
+    diff = float(variant.mean() - control.mean())
+    if se == 0:
+        return MeanTest(
+            difference_ms=diff, difference_ci=(diff, diff), t=0.0,
+            degrees_of_freedom=float(n1 + n2 - 2), p_value=1.0 if diff == 0 else 0.0,
+            significant=diff != 0
+        )
+    df = (v1 + v2) ** 2 / (v1 * v1 / (n1 - 1) + v2 * v2 / (n2 - 1))
+    t = diff / se
+    p_value = t_two_sided_p(t, df)
+    # Boundary expressed as a z; convert to the t with the same tail area
+    margin = t_critical(2 * (1 - NORMAL.cdf(z_crit)), df) * se
+    return MeanTest(
+        difference_ms=diff,
+        difference_ci=(diff - margin, diff + margin),
+        t=t,
+        degrees_of_freedom=df,
+        p_value=p_value,
+        significant=p_value < alpha
+    )
+
+
+def _average_ranks(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """1-based ranks with ties averaged, and the tie group sizes."""
+    _, inverse, counts = np.unique(values, return_inverse=True, return_counts=True)
+    upper = np.cumsum(counts)
+    return (upper - (counts - 1) / 2.0)[inverse], counts
+
+
+def mann_whitney_test(variant: np.ndarray, control: np.ndarray, alpha: float) -> Optional[RankTest]:
+    """Mann-Whitney U with the tie-corrected normal approximation."""
+    n1, n2 = len(variant), len(control)
+    if n1 == 0 or n2 == 0:
+        return None
+    ranks, ties = _average_ranks(np.concatenate([variant, control]))
+    u = float(ranks[:n1].sum() - n1 * (n1 + 1) / 2.0)
+    n = n1 + n2
+    tie_term = float((ties ** 3 - ties).sum()) / (n * (n - 1)) if n > 1 else 0.0
+    sigma = math.sqrt(n1 * n2 / 12.0 * ((n + 1) - tie_term))
+    z = (u - n1 * n2 / 2.0) / sigma if sigma > 0 else 0.0
+    p_value = normal_two_sided_p(z)
+    return RankTest(
+        u=u,
+        z=z,
+        p_value=p_value,
+        probability_slower=u / (n1 * n2),
+        significant=p_value < alpha
+    )
+
+
+def obrien_fleming_spending(alpha: float, information_fraction: float) -> float:
+    """Lan-DeMets O'Brien-Fleming alpha spent by an information fraction."""
+    return 2 * (1 - NORMAL.cdf(NORMAL.inv_cdf(1 - alpha / 2) / math.sqrt(information_fraction)))
+
+
+_erfc = np.frompyfunc(math.erfc, 1, 1)
+
+
+def _normal_cdf(x: np.ndarray) -> np.ndarray:
+    return _erfc(-x / math.sqrt(2.0)).astype(float) / 2.0
+
+
+def _simpson_grid(bound: float, points: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Nodes on [-bound, bound] and their Simpson's rule weights; points must be odd."""
+    grid = np.linspace(-bound, bound, points)
+    weights = np.ones(points)
+    weights[1:-1:2] = 4.0
+    weights[2:-1:2] = 2.0
+    return grid, weights * (2 * bound) / (3 * (points - 1))
+
+
+@lru_cache()
+def obrien_fleming_boundaries(alpha: float, looks: int, points: int = 401) -> Tuple[float, ...]:
+    """
+    Two-sided |z| boundaries for equally spaced looks under Lan-DeMets
+    O'Brien-Fleming alpha spending, so the chance of crossing any of them
+    under the null is alpha.
+    
+    Each boundary is found by bisection so that the probability of first
+    crossing at that look equals the alpha spent since the previous look.
+    That probability comes from the density of the score statistic on the
+    continuation region, carried from look to look by numerical integration
+    (Armitage, McPherson and Rowe).
+    """
+    fractions = [look / looks for look in range(1, looks + 1)]
+    
+    # At the first look nothing has been spent yet, so the boundary is exact
+    boundary = NORMAL.inv_cdf(1 - alpha / 2) / math.sqrt(fractions[0])
+    boundaries = [boundary]
+    grid, weights = _simpson_grid(boundary * math.sqrt(fractions[0]), points)
+    density = np.exp(-grid ** 2 / (2 * fractions[0])) / math.sqrt(2 * math.pi * fractions[0])
+    
+    for previous, fraction in zip(fractions, fractions[1:]):
+        step = fraction - previous
+        spent = obrien_fleming_spending(alpha, fraction) - obrien_fleming_spending(alpha, previous)
+        mass = weights * density
+        
+        def crossing(z: float) -> float:
+            bound = z * math.sqrt(fraction)
+            return float(mass @ (
+                _normal_cdf((grid - bound) / math.sqrt(step)) + _normal_cdf((-bound - grid) / math.sqrt(step))
+            ))
+        
+        low, high = 0.0, 40.0
+        for _ in range(60):
+            mid = (low + high) / 2.0
+            if crossing(mid) > spent:
+                low = mid
+            else:
+                high = mid
+        boundaries.append(high)
+        
+        # Density of paths that have not crossed yet, on the new continuation region
+        new_grid, weights = _simpson_grid(high * math.sqrt(fraction), points)
+        kernel = np.exp(-(new_grid[:, None] - grid[None, :]) ** 2 / (2 * step)) / math.sqrt(2 * math.pi * step)
+        grid, density = new_grid, kernel @ mass
+    
+    return tuple(boundaries)
+
+
+def look_sizes(target_sample_size: int, looks: int) -> List[int]:
+    """Samples per variant at each equally spaced look."""
+    return [math.ceil(target_sample_size * look / looks) for look in range(1, looks + 1)]
+
+
+def sequential_test(
+    test: Callable[[np.ndarray, np.ndarray, float, float], Optional[T]],
+    variant: np.ndarray,
+    control: np.ndarray,
+    boundaries: Sequence[float],
+    sizes: Sequence[int]
+) -> Optional[T]:
+    """
+    Run a test at each look both arms have reached, on the samples up to
+    that look, so the outcome does not depend on how often it is asked for.
+    The first look to cross its boundary decides. Otherwise the latest look
+    is reported, or, before the first look, every sample with nothing
+    significant yet.
+    """
+    if len(variant) < sizes[0] or len(control) < sizes[0]:
+        return test(variant, control, boundaries[0], 0.0)
+    
+    result = None
+    for look, (boundary, size) in enumerate(zip(boundaries, sizes), start=1):
+        if len(variant) < size or len(control) < size:
+            break
+        result = test(variant[:size], control[:size], boundary, 2 * (1 - NORMAL.cdf(boundary)))
+        if result is not None:
+            result.look = look
+            if result.significant:
+                break
+    return result
+
+
+# ====== Analysis ======
+
+class _Samples:
+    """
+    Per-variant sample arrays of one experiment, ordered by metric ID.
+    
+    Metric IDs are assigned before commit, so a row can become visible
+    after rows with higher IDs. Each fetch therefore starts from `settled`,
+    the highest ID seen at least settle_seconds ago, rather than from the
+    highest ID seen, and rows already held are skipped.
+    """
+    
+    def __init__(self, variant_ids: Tuple[int, ...]):
+        self.variant_ids = variant_ids
+        self.watermark = 0  # Highest metric ID held
+        self.settled = 0  # Every visible row at or below this ID is held
+        self.arrays: Dict[int, np.ndarray] = {variant_id: np.empty((0, 5)) for variant_id in variant_ids}
+        self.lock = asyncio.Lock()
+        self._marks: Deque[Tuple[float, int]] = deque()  # (fetch time, watermark then)
+    
+    def settle(self, now: float, settle_seconds: float) -> None:
+        """Advance `settled` to the watermark of fetches old enough to be complete."""
+        while self._marks and self._marks[0][0] <= now - settle_seconds:
+            self.settled = max(self.settled, self._marks.popleft()[1])
+    
+    def extend(self, rows: np.ndarray, fetched_at: float) -> None:
+        """Add fetched rows of (success, latency, tokens, cost, metric id, variant id)."""
+        if len(rows):
+            held = np.concatenate([array[array[:, ID] > self.settled, ID] for array in self.arrays.values()])
+            rows = rows[~np.isin(rows[:, ID], held)]
+        if len(rows):
+            self.watermark = max(self.watermark, int(rows[:, ID].max()))
+            for variant_id in self.variant_ids:
+                new = rows[rows[:, 5] == variant_id, :5]
+                if not len(new):
+                    continue
+                array = self.arrays[variant_id]
+                late = len(array) > 0 and new[0, ID] < array[-1, ID]
+                array = np.concatenate([array, new])
+                if late:
+                    array = array[np.argsort(array[:, ID], kind="stable")]
+                self.arrays[variant_id] = array
+        self._marks.append((fetched_at, self.watermark))
+
+
+def pick_winner(control_id: int, comparisons: List[VariantComparison], rates: Dict[int, float]) -> Optional[int]:
+    """
+    The best variant that beats the control significantly on success rate;
+    the control if it significantly beats every other variant; else None.
+    """
+    tested = [c for c in comparisons if c.success_rate is not None]
+    better = [c.variant_id for c in tested if c.success_rate.significant and c.success_rate.difference > 0]
+    if better:
+        return max(better, key=lambda variant_id: rates[variant_id])
+    if tested and len(tested) == len(comparisons) and all(
+        c.success_rate.significant and c.success_rate.difference < 0 for c in tested
+    ):
+        return control_id
+    return None
+
+
+def compute_analysis(
+    experiment_id: int,
+    variants: List[Tuple[int, str]],
+    samples: Dict[int, np.ndarray],
+    watermark: int,
+    alpha: float,
+    target_sample_size: Optional[int],
+    looks: int = 10
+) -> ExperimentAnalysis:
+    """Run every test on the current samples. CPU only; safe to run in a thread."""
+    control_id = variants[0][0]
+    counts = [len(samples[variant_id]) for variant_id, _ in variants]
+    interval_z = NORMAL.inv_cdf(1 - alpha / 2)
+    
+    information_fraction = None
+    look = None
+    if target_sample_size:
+        information_fraction = min(min(counts) / target_sample_size, 1.0)
+        boundaries = obrien_fleming_boundaries(alpha, looks)
+        sizes = look_sizes(target_sample_size, looks)
+        look = sum(1 for size in sizes if min(counts) >= size)
+        boundary = boundaries[max(look, 1) - 1]
+        
+        def run(test, variant, control):
+            return sequential_test(test, variant, control, boundaries, sizes)
+    else:
+        boundary = interval_z
+        
+        def run(test, variant, control):
+            return test(variant, control, boundary, alpha)
+    adjusted_alpha = 2 * (1 - NORMAL.cdf(boundary))
+    
+    summaries = []
+    rates: Dict[int, float] = {}
+    for variant_id, name in variants:
+        data = samples[variant_id]
+        n = len(data)
+        successes = int(data[:, SUCCESS].sum())
+        latency = data[:, LATENCY]
+        mean_latency = float(latency.mean()) if n else 0.0
+        if n > 1:
+            margin = t_critical(alpha, n - 1) * float(latency.std(ddof=1)) / math.sqrt(n)
+        else:
+            margin = 0.0
+        rates[variant_id] = successes / n if n else 0.0
+        summaries.append(VariantSummary(
+            variant_id=variant_id,
+            name=name,
+            request_count=n,
+            success_count=successes,
+            success_rate=rates[variant_id],
+            success_rate_ci=wilson_interval(successes, n, interval_z),
+            avg_latency_ms=mean_latency,
+            avg_latency_ci=(mean_latency - margin, mean_latency + margin),
+            avg_tokens=float(data[:, TOKENS].mean()) if n else 0.0,
+            avg_cost_cents=float(data[:, COST].mean()) if n else 0.0
+        ))
+    
+    control = samples[control_id]
+    comparisons = [
+        VariantComparison(
+            variant_id=variant_id,
+            success_rate=run(two_proportion_test, samples[variant_id][:, SUCCESS], control[:, SUCCESS]),
+            latency_welch=run(welch_test, samples[variant_id][:, LATENCY], control[:, LATENCY]),
+            latency_mann_whitney=run(
+                lambda variant, control, z_crit, alpha: mann_whitney_test(variant, control, alpha),
+                samples[variant_id][:, LATENCY], control[:, LATENCY]
+            )
+        )
+        for variant_id, _ in variants[1:]
+    ]
+    
+    return ExperimentAnalysis(
+        experiment_id=experiment_id,
+        computed_at=datetime.now(timezone.utc),
+        watermark=watermark,
+        alpha=alpha,
+        control_variant_id=control_id,
+        sequential=target_sample_size is not None,
+        information_fraction=information_fraction,
+        looks=looks if target_sample_size else None,
+        look=look,
+        boundary_z=boundary,
+        adjusted_alpha=adjusted_alpha,
+        variants=summaries,
+        comparisons=comparisons,
+        winner_variant_id=pick_winner(control_id, comparisons, rates)
+    )
+
+
+class ExperimentAnalyzer:
+    """Keeps each experiment's samples in memory and extends them on every look."""
+    
+    def __init__(self, alpha: float = 0.05, looks: int = 10, settle_seconds: float = 60):
+        self.alpha = alpha
+        self.looks = looks
+        self.settle_seconds = settle_seconds
+        self._samples: Dict[int, _Samples] = {}
+    
+    async def analyze(self, db: AsyncSession, experiment: Experiment, user_id: str) -> ExperimentAnalysis:
+        """Fetch requests since the last look and recompute. Variants must be loaded."""
+        variants = [(variant.id, variant.name) for variant in sorted(experiment.variants, key=lambda v: v.id)]
+        variant_ids = tuple(variant_id for variant_id, _ in variants)
+        
+        samples = self._samples.get(experiment.id)
+        if samples is None or samples.variant_ids != variant_ids:
+            samples = self._samples[experiment.id] = _Samples(variant_ids)
+        
+        # Concurrent looks at one experiment must not append the same rows twice
+        async with samples.lock:
+            samples.settle(time.monotonic(), self.settle_seconds)
+            result = await db.execute(
+                select(
+                    Metric.success, Metric.latency_ms, Metric.total_tokens, Metric.estimated_cost_cents,
+                    Metric.id, Metric.experiment_variant_id
+                )
+                .where(
+                    Metric.user_id == user_id,
+                    Metric.experiment_variant_id.in_(variant_ids),
+                    Metric.id > samples.settled
+                )
+                .order_by(Metric.id)
+            )
+            rows = np.array(
+                [tuple(0 if value is None else value for value in row) for row in result],
+                dtype=float
+            ).reshape(-1, 6)
+            samples.extend(rows, time.monotonic())
+            
+            analysis = await asyncio.to_thread(
+                compute_analysis,
+                experiment.id,
+                variants,
+                dict(samples.arrays),
+                samples.watermark,
+                self.alpha,
+                experiment.target_sample_size,
+                self.looks
+            )
+        
+        # A completed experiment gets no more requests, so nothing is worth keeping
+        if experiment.status == ExperimentStatus.COMPLETED:
+            self.forget(experiment.id)
+        return analysis
+    
+    def forget(self, experiment_id: int) -> None:
+        """Release an experiment's samples, e.g. once it is stopped or deleted."""
+        self._samples.pop(experiment_id, None)
+
+
+@lru_cache()
+def get_experiment_analyzer() -> ExperimentAnalyzer:
+    """Get cached experiment analyzer instance."""
+    settings = get_settings()
+    return ExperimentAnalyzer(
+        alpha=settings.experiment_alpha,
+        looks=settings.experiment_sequential_looks,
+        settle_seconds=settings.experiment_analysis_settle_seconds
+    )
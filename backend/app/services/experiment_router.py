@@ -0,0 +1,150 @@
+"""
+Server-side traffic routing for running experiments.
+
+Each experiment's variant weights are expanded once into a table of 10,000
+slots. A request's assignment key is hashed to a slot, so picking a variant
+is one hash and one index, the same key always lands on the same variant,
+and no database read is involved once the table is cached.
+
+Experiments in a bandit allocation mode ignore the weights; their variant is
+chosen per request by the bandit allocator instead.
+"""
+
+import hashlib
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from app.database import async_session_maker
+from app.models.experiment import Experiment, ExperimentStatus, ExperimentVariant, AllocationMode
+from app.models.prompt import Prompt
+from app.services.templates import CompiledTemplate
+
+
+SLOTS = 10000
+
+
+def experiment_slot(experiment_id: int, assignment_key: str) -> int:
+    """Stable slot in [0, SLOTS) for a caller within one experiment."""
+    digest = hashlib.sha256(f"{experiment_id}:{assignment_key}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % SLOTS
+
+
+def allocate_slots(weights: Sequence[int]) -> List[int]:
+    """
+    Split SLOTS between variants in proportion to their weights, handing the
+    leftover slots to the largest remainders. Equal split if all weights are 0.
+    """
+    if not weights:
+        return []
+    if sum(weights) <= 0:
+        weights = [1] * len(weights)
+    
+    total = sum(weights)
+    exact = [SLOTS * weight / total for weight in weights]
+    counts = [int(share) for share in exact]
+    by_remainder = sorted(range(len(weights)), key=lambda i: exact[i] - counts[i], reverse=True)
+    for i in by_remainder[:SLOTS - sum(counts)]:
+        counts[i] += 1
+    return counts
+
+
+class RoutedVariant:
+    """A variant with its template compiled for serving."""
+    
+    def __init__(self, variant: ExperimentVariant):
+        self.id = variant.id
+        self.name = variant.name
+        self.system_prompt = variant.system_prompt
+        self.template = CompiledTemplate(variant.user_prompt)
+        self.model = variant.model
+        self.temperature = variant.temperature
+        self.traffic_weight = variant.traffic_weight
+
+
+class RoutingTable:
+    """An experiment's variants laid out over the slot table."""
+    
+    def __init__(self, experiment: Experiment, user_id: str):
+        self.experiment_id = experiment.id
+        self.user_id = user_id
+        self.prompt_id = experiment.prompt_id
+        self.status = experiment.status
+        self.allocation_mode = experiment.allocation_mode
+        self.bandit_state = experiment.bandit_state
+        
+        # Order by ID so the layout does not depend on load order
+        self.variants = [RoutedVariant(variant) for variant in sorted(experiment.variants, key=lambda v: v.id)]
+        self.slots: List[int] = []  # Slot -> index into variants
+        for index, count in enumerate(allocate_slots([v.traffic_weight for v in self.variants])):
+            self.slots.extend([index] * count)
+    
+    @property
+    def running(self) -> bool:
+        return self.status == ExperimentStatus.RUNNING
+    
+    @property
+    def bandit(self) -> bool:
+        return self.allocation_mode != AllocationMode.FIXED
+    
+    def assign(self, assignment_key: str) -> RoutedVariant:
+        """The variant that serves a caller."""
+        return self.variants[self.slots[experiment_slot(self.experiment_id, assignment_key)]]
+
+
+class ExperimentRouter:
+    """Cache of routing tables by experiment, filled on first use."""
+    
+    def __init__(self):
+        self._tables: Dict[int, RoutingTable] = {}
+        self._generation = 0
+    
+    async def get(self, user_id: str, experiment_id: int) -> Optional[RoutingTable]:
+        """Routing table of one of the user's experiments, or None."""
+        table = self._tables.get(experiment_id)
+        if table is None:
+            table = await self._load(experiment_id)
+        if table is None or table.user_id != user_id:
+            return None
+        return table
+    
+    async def _load(self, experiment_id: int) -> Optional[RoutingTable]:
+        generation = self._generation
+        async with async_session_maker() as session:
+            result = await session.execute(
+                select(Experiment, Prompt.user_id)
+                .join(Prompt, Experiment.prompt_id == Prompt.id)
+                .where(Experiment.id == experiment_id)
+                .options(selectinload(Experiment.variants))
+            )
+            row = result.first()
+        
+        if row is None or not row.Experiment.variants:
+            return None
+        
+        table = RoutingTable(row.Experiment, row.user_id)
+        if generation == self._generation:
+            self._tables[experiment_id] = table
+        return table
+    
+    def invalidate(self, experiment_id: int) -> None:
+        """Forget an experiment after its status or variants change."""
+        self._generation += 1
+        self._tables.pop(experiment_id, None)
+    
+    def invalidate_prompt(self, prompt_id: int) -> None:
+        """Forget a prompt's experiments, e.g. after deleting it removed them."""
+        self._generation += 1
+        for experiment_id in [e for e, table in self._tables.items() if table.prompt_id == prompt_id]:
+            del self._tables[experiment_id]
+    
+    def clear(self) -> None:
+        self._generation += 1
+        self._tables.clear()
+
+
+@lru_cache()
+def get_experiment_router() -> ExperimentRouter:
+    """Get cached experiment router instance."""
+    return ExperimentRouter()
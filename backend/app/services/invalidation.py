@@ -0,0 +1,143 @@
+"""
+Cross-worker cache invalidation.
+
+Write paths publish change events for deployments, prompts and environments.
+Each event is applied to this worker's caches immediately and, with the
+PostgreSQL bridge enabled, sent over NOTIFY so every other worker applies it
+too. A worker that loses its LISTEN connection may have missed events, so it
+drops and rebuilds its caches after reconnecting.
+
+At startup the bus waits for LISTEN before returning, so caches warmed
+afterwards see every later event. If the connection takes longer than that,
+the caches are rebuilt once it is made.
+"""
+
+from functools import lru_cache
+from typing import Optional, Sequence
+
+from app.config import get_settings
+from app.services.pg_notify import PgNotifyListener, notify
+from app.services.deployment_resolver import get_deployment_resolver
+from app.services.deployment_watch import get_deployment_watch
+from app.services.environment_bundle import get_bundle_cache
+from app.services.experiment_router import get_experiment_router
+
+
+INVALIDATION_CHANNEL = "promptops_invalidation"
+LISTEN_CONNECT_TIMEOUT_SECONDS = 5.0  # How long startup waits for LISTEN
+
+
+class InvalidationBus:
+    """Publishes change events and applies them to in-process caches."""
+    
+    def __init__(self, pg_bridge: bool = False):
+        self.pg_bridge = pg_bridge
+        self._listener: Optional[PgNotifyListener] = None
+    
+    # ====== Publishing ======
+    
+    async def deployment_changed(self, user_id: str, environment_id: int, prompt_id: int) -> None:
+        """A prompt's active deployment in an environment changed."""
+        await self.publish({
+            "kind": "deployment",
+            "user_id": user_id,
+            "environment_id": environment_id,
+            "prompt_id": prompt_id
+        })
+    
+    async def prompt_changed(self, user_id: str, prompt_id: int, environment_ids: Sequence[int] = ()) -> None:
+        """
+        A prompt was renamed, updated or deleted. environment_ids lists the
+        environments whose deployments a deletion removed.
+        """
+        await self.publish({
+            "kind": "prompt",
+            "user_id": user_id,
+            "prompt_id": prompt_id,
+            "environment_ids": list(environment_ids)
+        })
+    
+    async def environment_changed(self, user_id: str, environment_id: int) -> None:
+        """An environment was created or deleted."""
+        await self.publish({"kind": "environment", "user_id": user_id, "environment_id": environment_id})
+    
+    async def experiment_changed(self, user_id: str, experiment_id: int) -> None:
+        """An experiment's status or variants changed, or it was deleted."""
+        await self.publish({"kind": "experiment", "user_id": user_id, "experiment_id": experiment_id})
+    
+    async def publish(self, event: dict) -> None:
+        """Apply an event locally, then share it with other workers."""
+        self.apply(event)
+        
+        if self.pg_bridge:
+            try:
+                await notify(INVALIDATION_CHANNEL, event)
+            except Exception as e:
+                print(f"❌ Invalidation NOTIFY failed: {e}")
+    
+    # ====== Applying ======
+    
+    def apply(self, event: dict) -> None:
+        """Drop whatever an event makes stale."""
+        resolver = get_deployment_resolver()
+        watch = get_deployment_watch()
+        bundles = get_bundle_cache()
+        kind = event.get("kind")
+        
+        if kind == "deployment":
+            resolver.invalidate(event["user_id"], event["environment_id"], event["prompt_id"])
+            watch.notify(event["environment_id"])
+        elif kind == "prompt":
+            resolver.invalidate_prompt(event["user_id"], event["prompt_id"])
+            bundles.invalidate_user(event["user_id"])
+            # Deleting a prompt deletes its experiments with it
+            get_experiment_router().invalidate_prompt(event["prompt_id"])
+            for environment_id in event.get("environment_ids", ()):
+                watch.notify(environment_id)
+        elif kind == "environment":
+            resolver.invalidate_environment(event["user_id"], event["environment_id"])
+            bundles.invalidate(event["environment_id"])
+            watch.notify(event["environment_id"])
+        elif kind == "experiment":
+            get_experiment_router().invalidate(event["experiment_id"])
+    
+    async def resync(self) -> None:
+        """Rebuild all caches from the database after events may have been missed."""
+        resolver = get_deployment_resolver()
+        resolver.clear()
+        get_bundle_cache().clear()
+        get_experiment_router().clear()
+        warmed = await resolver.warm()
+        
+        # Watchers re-read their environment's revision
+        get_deployment_watch().notify_all()
+        print(f"🔄 Caches resynced after reconnect ({warmed} active deployments)")
+    
+    # ====== Lifecycle ======
+    
+    async def start(self) -> None:
+        """
+        Start listening for other workers' events if the bridge is enabled.
+        Call before warming caches: returns once LISTEN is established, or
+        after a timeout, in which case caches are resynced when it is.
+        """
+        if self.pg_bridge:
+            self._listener = PgNotifyListener(
+                INVALIDATION_CHANNEL,
+                self.apply,
+                on_reconnect=self.resync
+            )
+            if not await self._listener.start(connect_timeout=LISTEN_CONNECT_TIMEOUT_SECONDS):
+                print("⚠️ Invalidation LISTEN not connected yet, caches will resync when it is")
+    
+    async def stop(self) -> None:
+        if self._listener:
+            await self._listener.stop()
+            self._listener = None
+
+
+@lru_cache()
+def get_invalidation_bus() -> InvalidationBus:
+    """Get cached invalidation bus instance."""
+    settings = get_settings()
+    return InvalidationBus(pg_bridge=settings.cache_invalidation_pg_bridge)
@@ -0,0 +1,285 @@
+"""
+Metrics aggregation service.
+Grouping and time bucketing run in SQL so raw metric rows never leave the database.
+"""
+
+from datetime import datetime
+from typing import List, Literal, Optional, Sequence
+from sqlalchemy import select, func, case
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.metric import Metric
+from app.models.prompt import Prompt, PromptVersion
+from app.models.deployment import Deployment
+from app.models.environment import Environment
+from app.schemas.metric import (
+    MetricsOverview, LatencyData, CostData, MetricsBreakdown, MetricsSeriesPoint
+)
+
+
+MetricGroup = Literal["deployment", "version", "prompt"]
+TimeBucket = Literal["hour", "day"]
+
+GROUP_COLUMNS = {
+    "deployment": Metric.deployment_id,
+    "version": Metric.version_id,
+    "prompt": Metric.prompt_id,
+}
+
+
+def _aggregate_columns() -> list:
+    """Aggregate expressions shared by every breakdown and series query."""
+    return [
+        func.count(Metric.id).label("request_count"),
+        func.sum(case((Metric.success.is_(True), 1), else_=0)).label("success_count"),
+        func.avg(Metric.latency_ms).label("avg_latency_ms"),
+        func.percentile_cont(0.95).within_group(Metric.latency_ms).label("p95_latency_ms"),
+        func.coalesce(func.sum(Metric.total_tokens), 0).label("total_tokens"),
+        func.coalesce(func.sum(Metric.estimated_cost_cents), 0).label("total_cost_cents"),
+    ]
+
+
+def _rate(part: int, total: int) -> float:
+    """Percentage helper that tolerates empty groups."""
+    return round(part / total * 100, 2) if total else 0.0
+
+
+class MetricsService:
+    """Service for SQL-side metrics aggregation."""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def overview(self, user_id: str, since: datetime) -> MetricsOverview:
+        """Aggregated totals and latency percentiles for a time window."""
+        result = await self.db.execute(
+            select(
+                func.count(Metric.id).label("request_count"),
+                func.sum(case((Metric.success.is_(True), 1), else_=0)).label("success_count"),
+                func.avg(Metric.latency_ms).label("avg_latency_ms"),
+                func.percentile_disc(0.95).within_group(Metric.latency_ms).label("p95_latency_ms"),
+                func.percentile_disc(0.99).within_group(Metric.latency_ms).label("p99_latency_ms"),
+                func.coalesce(func.sum(Metric.total_tokens), 0).label("total_tokens"),
+                func.coalesce(func.sum(Metric.estimated_cost_cents), 0).label("total_cost_cents"),
+            )
+            .where(
+                Metric.user_id == user_id,
+                Metric.timestamp >= since
+            )
+        )
+        row = result.one()
+        
+        if not row.request_count:
+            return MetricsOverview()
+        
+        return MetricsOverview(
+            total_requests=row.request_count,
+            success_rate=_rate(row.success_count, row.request_count),
+            avg_latency_ms=round(float(row.avg_latency_ms), 2),
+            p95_latency_ms=round(float(row.p95_latency_ms), 2),
+            p99_latency_ms=round(float(row.p99_latency_ms), 2),
+            total_tokens=int(row.total_tokens),
+            total_cost_cents=round(float(row.total_cost_cents), 4)
+        )
+    
+    async def latency(self, user_id: str, since: datetime) -> List[LatencyData]:
+        """Hourly latency series."""
+        bucket_col = func.date_trunc("hour", Metric.timestamp).label("bucket")
+        
+        result = await self.db.execute(
+            select(
+                bucket_col,
+                func.count(Metric.id).label("request_count"),
+                func.avg(Metric.latency_ms).label("avg_latency_ms"),
+                func.percentile_disc(0.95).within_group(Metric.latency_ms).label("p95_latency_ms"),
+            )
+            .where(
+                Metric.user_id == user_id,
+                Metric.timestamp >= since
+            )
+            .group_by(bucket_col)
+            .order_by(bucket_col)
+        )
+        
+        return [
+            LatencyData(
+                timestamp=row.bucket,
+                avg_latency_ms=round(float(row.avg_latency_ms), 2),
+                p95_latency_ms=row.p95_latency_ms,
+                request_count=row.request_count
+            )
+            for row in result.all()
+        ]
+    
+    async def costs(self, user_id: str, since: datetime) -> List[CostData]:
+        """Daily cost and token totals."""
+        bucket_col = func.date_trunc("day", Metric.timestamp).label("bucket")
+        
+        result = await self.db.execute(
+            select(
+                bucket_col,
+                func.coalesce(func.sum(Metric.estimated_cost_cents), 0).label("cost"),
+                func.coalesce(func.sum(Metric.total_tokens), 0).label("tokens"),
+            )
+            .where(
+                Metric.user_id == user_id,
+                Metric.timestamp >= since
+            )
+            .group_by(bucket_col)
+            .order_by(bucket_col)
+        )
+        
+        return [
+            CostData(
+                date=row.bucket.strftime("%Y-%m-%d"),
+                cost_cents=round(float(row.cost), 4),
+                token_count=int(row.tokens)
+            )
+            for row in result.all()
+        ]
+    
+    async def breakdown(
+        self,
+        user_id: str,
+        since: datetime,
+        group_by: MetricGroup,
+        prompt_id: Optional[int] = None,
+        environment_id: Optional[int] = None,
+        group_ids: Optional[Sequence[int]] = None
+    ) -> List[MetricsBreakdown]:
+        """Aggregate metrics per deployment, version or prompt."""
+        group_col = GROUP_COLUMNS[group_by]
+        
+        if group_by == "deployment":
+            label_cols = [Environment.name, PromptVersion.version_tag]
+            query = (
+                select(group_col.label("group_id"), *label_cols, *_aggregate_columns())
+                .select_from(Metric)
+                .outerjoin(Deployment, Deployment.id == Metric.deployment_id)
+                .outerjoin(PromptVersion, PromptVersion.id == Deployment.version_id)
+                .outerjoin(Environment, Environment.id == Deployment.environment_id)
+            )
+            if environment_id:
+                query = query.where(Deployment.environment_id == environment_id)
+        elif group_by == "version":
+            label_cols = [PromptVersion.version_tag]
+            query = (
+                select(group_col.label("group_id"), *label_cols, *_aggregate_columns())
+                .select_from(Metric)
+                .outerjoin(PromptVersion, PromptVersion.id == Metric.version_id)
+            )
+        else:
+            label_cols = [Prompt.name]
+            query = (
+                select(group_col.label("group_id"), *label_cols, *_aggregate_columns())
+                .select_from(Metric)
+                .outerjoin(Prompt, Prompt.id == Metric.prompt_id)
+            )
+        
+        query = (
+            query
+            .where(
+                Metric.user_id == user_id,
+                Metric.timestamp >= since,
+                group_col.is_not(None)
+            )
+            .group_by(group_col, *label_cols)
+            .order_by(func.count(Metric.id).desc())
+        )
+        
+        if prompt_id:
+            query = query.where(Metric.prompt_id == prompt_id)
+        if group_ids:
+            query = query.where(group_col.in_(group_ids))
+        
+        result = await self.db.execute(query)
+        
+        response = []
+        for row in result.all():
+            if group_by == "deployment":
+                env_name, version_tag = row[1], row[2]
+                label = f"{version_tag} @ {env_name}" if env_name else version_tag
+            else:
+                label = row[1]
+            
+            response.append(MetricsBreakdown(
+                group_id=row.group_id,
+                label=label,
+                request_count=row.request_count,
+                success_rate=_rate(row.success_count, row.request_count),
+                error_rate=_rate(row.request_count - row.success_count, row.request_count),
+                avg_latency_ms=round(float(row.avg_latency_ms or 0), 2),
+                p95_latency_ms=round(float(row.p95_latency_ms or 0), 2),
+                total_tokens=int(row.total_tokens),
+                total_cost_cents=round(float(row.total_cost_cents), 4)
+            ))
+        
+        return response
+    
+    async def series(
+        self,
+        user_id: str,
+        since: datetime,
+        group_by: MetricGroup,
+        bucket: TimeBucket = "hour",
+        prompt_id: Optional[int] = None,
+        group_ids: Optional[Sequence[int]] = None
+    ) -> List[MetricsSeriesPoint]:
+        """Time-bucketed latency, error-rate and cost series per group."""
+        group_col = GROUP_COLUMNS[group_by]
+        bucket_col = func.date_trunc(bucket, Metric.timestamp).label("bucket")
+        
+        query = (
+            select(bucket_col, group_col.label("group_id"), *_aggregate_columns())
+            .where(
+                Metric.user_id == user_id,
+                Metric.timestamp >= since,
+                group_col.is_not(None)
+            )
+            .group_by(bucket_col, group_col)
+            .order_by(bucket_col, group_col)
+        )
+        
+        if prompt_id:
+            query = query.where(Metric.prompt_id == prompt_id)
+        if group_ids:
+            query = query.where(group_col.in_(group_ids))
+        
+        result = await self.db.execute(query)
+        
+        return [
+            MetricsSeriesPoint(
+                timestamp=row.bucket,
+                group_id=row.group_id,
+                request_count=row.request_count,
+                error_rate=_rate(row.request_count - row.success_count, row.request_count),
+                avg_latency_ms=round(float(row.avg_latency_ms or 0), 2),
+                p95_latency_ms=round(float(row.p95_latency_ms or 0), 2),
+                total_tokens=int(row.total_tokens),
+                cost_cents=round(float(row.total_cost_cents), 4)
+            )
+            for row in result.all()
+        ]
+    
+    async def by_model(self, user_id: str, since: datetime) -> List[dict]:
+        """Aggregate metrics per model."""
+        result = await self.db.execute(
+            select(Metric.model, *_aggregate_columns())
+            .where(
+                Metric.user_id == user_id,
+                Metric.timestamp >= since
+            )
+            .group_by(Metric.model)
+        )
+        
+        return [
+            {
+                "model": row.model,
+                "request_count": row.request_count,
+                "success_rate": _rate(row.success_count, row.request_count),
+                "avg_latency_ms": round(float(row.avg_latency_ms or 0), 2),
+                "total_tokens": int(row.total_tokens),
+                "total_cost_cents": round(float(row.total_cost_cents), 4)
+            }
+            for row in result.all()
+        ]
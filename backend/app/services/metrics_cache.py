@@ -0,0 +1,131 @@
+"""
+Read-through cache for aggregated metrics responses.
+
+Entries are keyed per user by endpoint, parameters and a per-user generation
+counter. Writing a metric bumps the generation, so every cached aggregate for
+that user is bypassed without having to find and delete it.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple, TypeVar
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.database import async_session_maker
+
+
+T = TypeVar("T")
+Loader = Callable[[AsyncSession], Awaitable[T]]
+
+
+class _Entry:
+    """A cached value and when it was computed."""
+    __slots__ = ("value", "created_at")
+    
+    def __init__(self, value: Any):
+        self.value = value
+        self.created_at = time.monotonic()
+
+
+class MetricsCache:
+    """
+    Size-bounded LRU cache with per-user generation counters.
+    Supports serving stale entries while a background refresh runs.
+    """
+    
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 30, stale_seconds: float = 0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self._entries: "OrderedDict[Tuple, _Entry]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._refreshing: Set[Tuple] = set()
+    
+    def generation(self, user_id: str) -> int:
+        """Current generation for a user."""
+        return self._generations.get(user_id, 0)
+    
+    def bump(self, user_id: str) -> int:
+        """Invalidate every cached aggregate for a user. Called on metric writes."""
+        generation = self._generations.get(user_id, 0) + 1
+        self._generations[user_id] = generation
+        return generation
+    
+    def clear(self) -> None:
+        """Drop all entries."""
+        self._entries.clear()
+    
+    def _key(self, user_id: str, endpoint: str, params: Dict[str, Hashable]) -> Tuple:
+        frozen = tuple(sorted(
+            (name, tuple(value) if isinstance(value, list) else value)
+            for name, value in params.items()
+        ))
+        return (user_id, self.generation(user_id), endpoint, frozen)
+    
+    def _store(self, key: Tuple, value: Any) -> None:
+        self._entries[key] = _Entry(value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    async def _refresh(self, key: Tuple, loader: Loader) -> None:
+        """Recompute an entry in the background on a dedicated session."""
+        try:
+            async with async_session_maker() as session:
+                value = await loader(session)
+            # Skip the write if the user's generation moved on meanwhile
+            if self.generation(key[0]) == key[1]:
+                self._store(key, value)
+        except Exception as e:
+            print(f"Metrics cache refresh error: {e}")
+        finally:
+            self._refreshing.discard(key)
+    
+    async def get_or_load(
+        self,
+        user_id: str,
+        endpoint: str,
+        params: Dict[str, Hashable],
+        loader: Loader,
+        db: Optional[AsyncSession] = None
+    ) -> T:
+        """
+        Return a cached value or compute it with loader.
+        loader receives db, or a fresh session when db is None.
+        """
+        key = self._key(user_id, endpoint, params)
+        entry = self._entries.get(key)
+        
+        if entry is not None:
+            age = time.monotonic() - entry.created_at
+            if age < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                return entry.value
+            if age < self.ttl_seconds + self.stale_seconds:
+                if key not in self._refreshing:
+                    self._refreshing.add(key)
+                    asyncio.create_task(self._refresh(key, loader))
+                return entry.value
+        
+        if db is None:
+            async with async_session_maker() as session:
+                value = await loader(session)
+        else:
+            value = await loader(db)
+        
+        self._store(key, value)
+        return value
+
+
+@lru_cache()
+def get_metrics_cache() -> MetricsCache:
+    """Get cached metrics cache instance."""
+    settings = get_settings()
+    return MetricsCache(
+        max_entries=settings.metrics_cache_max_entries,
+        ttl_seconds=settings.metrics_cache_ttl_seconds,
+        stale_seconds=settings.metrics_cache_stale_seconds
+    )
@@ -0,0 +1,56 @@
+"""
+Background loop shared by the services that buffer writes in memory.
+
+Those services take a batch out of their buffer before writing it, so
+cancelling the loop mid-write would lose the batch. stop() therefore never
+cancels: it signals the loop, which finishes the run in progress and exits.
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+
+class PeriodicTask:
+    """Runs an action every interval, or sooner when woken."""
+    
+    def __init__(self, action: Callable[[], Awaitable[object]], interval_seconds: float, name: str):
+        self.action = action
+        self.interval_seconds = interval_seconds
+        self.name = name
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+    
+    def wake(self) -> None:
+        """Run the action now rather than at the end of the interval."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+    
+    async def stop(self) -> None:
+        """Let the run in progress finish, then end the loop."""
+        if self._task is None:
+            return
+        self._stopping.set()
+        self._wakeup.set()
+        await self._task
+        self._task = None
+    
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._stopping.is_set():
+                return
+            
+            try:
+                await self.action()
+            except Exception as e:
+                print(f"❌ {self.name} failed: {e}")
@@ -0,0 +1,143 @@
+"""
+PostgreSQL LISTEN/NOTIFY helpers for sharing events between workers.
+"""
+
+import asyncio
+import json
+import uuid
+from typing import Any, Awaitable, Callable, Optional
+import asyncpg
+from sqlalchemy import text
+
+from app.config import get_settings
+from app.database import engine
+
+
+# Identifies this process so listeners can skip their own notifications
+WORKER_ID = uuid.uuid4().hex
+
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more
+MAX_PAYLOAD_BYTES = 7900
+
+
+def asyncpg_dsn(database_url: str) -> str:
+    """Convert a SQLAlchemy URL into a plain asyncpg DSN."""
+    return database_url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+
+async def notify(channel: str, data: Any) -> bool:
+    """
+    Send a NOTIFY tagged with this worker's ID.
+    Returns False if the payload is too large to send.
+    """
+    payload = json.dumps({"origin": WORKER_ID, "data": data}, default=str)
+    if len(payload.encode("utf-8")) > MAX_PAYLOAD_BYTES:
+        return False
+    
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": channel, "payload": payload})
+        await conn.commit()
+    return True
+
+
+class PgNotifyListener:
+    """
+    Listens on a channel over a dedicated asyncpg connection.
+    Reconnects with exponential backoff and calls on_reconnect after every
+    reconnection, since notifications sent while disconnected are lost.
+    A first connection made after start() stopped waiting for it counts as
+    a reconnection too.
+    """
+    
+    def __init__(
+        self,
+        channel: str,
+        on_message: Callable[[Any], None],
+        on_reconnect: Optional[Callable[[], Awaitable[None]]] = None,
+        dsn: Optional[str] = None,
+        max_backoff_seconds: float = 30.0
+    ):
+        self.channel = channel
+        self.on_message = on_message
+        self.on_reconnect = on_reconnect
+        self.dsn = dsn or asyncpg_dsn(get_settings().database_url)
+        self.max_backoff_seconds = max_backoff_seconds
+        self._task: Optional[asyncio.Task] = None
+        self._conn: Optional[asyncpg.Connection] = None
+        self._listening = asyncio.Event()
+        self._late_start = False
+    
+    async def start(self, connect_timeout: Optional[float] = None) -> bool:
+        """
+        Start listening in the background. With connect_timeout, wait up to
+        that long for LISTEN to be established; returns whether it was.
+        """
+        self._task = asyncio.create_task(self._run())
+        if connect_timeout is None:
+            return False
+        
+        try:
+            await asyncio.wait_for(self._listening.wait(), connect_timeout)
+            return True
+        except asyncio.TimeoutError:
+            # The caller goes on without us, so it may miss notifications
+            # sent before we connect
+            self._late_start = True
+            return False
+    
+    async def stop(self) -> None:
+        """Stop listening and close the connection."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        
+        if self._conn is not None and not self._conn.is_closed():
+            await self._conn.close()
+        self._conn = None
+    
+    def _handle(self, connection, pid, channel, payload: str) -> None:
+        """Decode a notification and pass on messages from other workers."""
+        try:
+            message = json.loads(payload)
+        except json.JSONDecodeError:
+            return
+        
+        if message.get("origin") == WORKER_ID:
+            return
+        
+        try:
+            self.on_message(message.get("data"))
+        except Exception as e:
+            print(f"❌ {self.channel} handler error: {e}")
+    
+    async def _run(self) -> None:
+        """Connect, listen until the connection drops, then reconnect."""
+        backoff = 1.0
+        connected_before = False
+        
+        while True:
+            try:
+                self._conn = await asyncpg.connect(self.dsn)
+                closed = asyncio.Event()
+                self._conn.add_termination_listener(lambda conn: closed.set())
+                await self._conn.add_listener(self.channel, self._handle)
+                
+                self._listening.set()
+                if (connected_before or self._late_start) and self.on_reconnect:
+                    await self.on_reconnect()
+                connected_before = True
+                backoff = 1.0
+                
+                await closed.wait()
+                print(f"⚠️ Lost LISTEN connection for {self.channel}, reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ LISTEN {self.channel} failed: {e}")
+            
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff_seconds)
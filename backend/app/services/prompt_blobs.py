@@ -0,0 +1,70 @@
+"""
+Content-addressed storage for prompt version text.
+
+Bodies are stored once per distinct text in prompt_blobs, keyed by SHA-256,
+so versions that only change model settings reuse existing rows.
+"""
+
+from typing import Dict, Iterable
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models.prompt import PromptVersion
+from app.models.prompt_blob import PromptBlob, content_hash, encode_text
+
+
+def _upsert(dialect: str):
+    """Dialect-specific INSERT supporting ON CONFLICT."""
+    return sqlite_insert if dialect == "sqlite" else pg_insert
+
+
+async def intern_text(db: AsyncSession, text: str) -> PromptBlob:
+    """Get the blob for a text, inserting it if no version has used it yet."""
+    key = content_hash(text)
+    blob = await db.get(PromptBlob, key)
+    if blob is None:
+        data, compression = encode_text(text, get_settings().prompt_blob_compress_threshold)
+        # Concurrent writers may insert the same blob; either row is identical
+        await db.execute(
+            _upsert(db.get_bind().dialect.name)(PromptBlob)
+            .values(hash=key, data=data, compression=compression, size=len(text.encode("utf-8")))
+            .on_conflict_do_nothing()
+        )
+        blob = await db.get(PromptBlob, key)
+    
+    blob.__dict__["text"] = text  # Prime the decoded text cache
+    return blob
+
+
+async def intern_texts(db: AsyncSession, texts: Iterable[str]) -> Dict[str, str]:
+    """Blob hash for each text, inserting all missing blobs in one statement."""
+    hashes = {text: content_hash(text) for text in set(texts)}
+    if not hashes:
+        return {}
+    
+    existing = set((await db.scalars(
+        select(PromptBlob.hash).where(PromptBlob.hash.in_(hashes.values()))
+    )).all())
+    
+    threshold = get_settings().prompt_blob_compress_threshold
+    rows = []
+    for text, key in hashes.items():
+        if key in existing:
+            continue
+        data, compression = encode_text(text, threshold)
+        rows.append({"hash": key, "data": data, "compression": compression, "size": len(text.encode("utf-8"))})
+    
+    if rows:
+        await db.execute(
+            _upsert(db.get_bind().dialect.name)(PromptBlob).values(rows).on_conflict_do_nothing()
+        )
+    return hashes
+
+
+async def set_version_text(db: AsyncSession, version: PromptVersion, system_prompt: str, user_prompt: str) -> None:
+    """Point a version at the blobs for its prompt bodies."""
+    version.system_blob = await intern_text(db, system_prompt)
+    version.user_blob = await intern_text(db, user_prompt)
@@ -0,0 +1,113 @@
+"""
+Line and word diffs between prompt versions, memoized by content hash.
+"""
+
+import asyncio
+import difflib
+import re
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from app.config import get_settings
+from app.models.prompt import PromptVersion
+from app.models.prompt_blob import content_hash
+from app.schemas.prompt import TextDiff, WordDiffSegment, ConfigChange, PromptVersionDiff
+
+
+# Words, whitespace runs and punctuation, so joined tokens reproduce the text
+TOKEN = re.compile(r"\w+|\s+|[^\w\s]")
+
+CONFIG_FIELDS = ("model", "temperature", "max_tokens", "variables")
+
+
+def diff_text(old: str, new: str) -> TextDiff:
+    """Compute the line and word diff of two texts."""
+    if old == new:
+        return TextDiff(changed=False)
+    
+    # Drop the ---/+++ file header; callers know which versions they asked for
+    unified = list(difflib.unified_diff(old.splitlines(), new.splitlines(), lineterm="", n=3))[2:]
+    added = sum(1 for line in unified if line.startswith("+"))
+    removed = sum(1 for line in unified if line.startswith("-"))
+    
+    old_tokens = TOKEN.findall(old)
+    new_tokens = TOKEN.findall(new)
+    words: List[WordDiffSegment] = []
+    matcher = difflib.SequenceMatcher(None, old_tokens, new_tokens, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            words.append(WordDiffSegment(op="equal", text="".join(old_tokens[i1:i2])))
+            continue
+        if i2 > i1:
+            words.append(WordDiffSegment(op="delete", text="".join(old_tokens[i1:i2])))
+        if j2 > j1:
+            words.append(WordDiffSegment(op="insert", text="".join(new_tokens[j1:j2])))
+    
+    return TextDiff(changed=True, added_lines=added, removed_lines=removed, unified=unified, words=words)
+
+
+def _text_key(blob_hash: Optional[str], text: str) -> str:
+    """Content hash of a field, computing it for versions stored inline."""
+    return blob_hash or content_hash(text)
+
+
+class DiffCache:
+    """LRU of text diffs keyed by the content hashes of both sides."""
+    
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], TextDiff]" = OrderedDict()
+    
+    async def diff(self, old_hash: str, old: str, new_hash: str, new: str) -> TextDiff:
+        """Diff two texts, reusing the result for any repeat of the same pair."""
+        key = (old_hash, new_hash)
+        cached = self._entries.get(key)
+        if cached is not None:
+            self._entries.move_to_end(key)
+            return cached
+        
+        # Large prompts can take a while; keep the event loop free
+        result = await asyncio.to_thread(diff_text, old, new)
+        self._entries[key] = result
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return result
+    
+    async def diff_versions(self, old: PromptVersion, new: PromptVersion) -> PromptVersionDiff:
+        """Full diff between two versions: both prompt bodies plus config."""
+        system_diff = await self.diff(
+            _text_key(old.system_prompt_hash, old.system_prompt), old.system_prompt,
+            _text_key(new.system_prompt_hash, new.system_prompt), new.system_prompt
+        )
+        user_diff = await self.diff(
+            _text_key(old.user_prompt_hash, old.user_prompt), old.user_prompt,
+            _text_key(new.user_prompt_hash, new.user_prompt), new.user_prompt
+        )
+        
+        config = [
+            ConfigChange(field=field, old=getattr(old, field), new=getattr(new, field))
+            for field in CONFIG_FIELDS
+            if getattr(old, field) != getattr(new, field)
+        ]
+        
+        return PromptVersionDiff(
+            prompt_id=new.prompt_id,
+            from_version_id=old.id,
+            from_version_tag=old.version_tag,
+            to_version_id=new.id,
+            to_version_tag=new.version_tag,
+            system_prompt=system_diff,
+            user_prompt=user_diff,
+            config=config
+        )
+    
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+@lru_cache()
+def get_diff_cache() -> DiffCache:
+    """Get cached diff cache instance."""
+    settings = get_settings()
+    return DiffCache(max_entries=settings.prompt_diff_cache_max_entries)
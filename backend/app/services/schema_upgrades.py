@@ -0,0 +1,91 @@
+"""
+Idempotent schema upgrades for databases created by earlier releases.
+
+create_all only creates missing tables, so columns, enum values and indexes
+added to existing tables are applied here at startup. Every statement is a
+no-op once applied, and on a new database, where create_all has already
+built everything.
+"""
+
+from typing import List, Tuple
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+
+# (table, column, PostgreSQL definition, SQLite definition)
+COLUMNS: List[Tuple[str, str, str, str]] = [
+    # Prompt text in content-addressed blobs
+    (
+        "prompt_versions", "system_prompt_hash",
+        "VARCHAR(64) CONSTRAINT fk_prompt_versions_system_prompt_hash_prompt_blobs REFERENCES prompt_blobs (hash)",
+        "VARCHAR(64) REFERENCES prompt_blobs (hash)",
+    ),
+    (
+        "prompt_versions", "user_prompt_hash",
+        "VARCHAR(64) CONSTRAINT fk_prompt_versions_user_prompt_hash_prompt_blobs REFERENCES prompt_blobs (hash)",
+        "VARCHAR(64) REFERENCES prompt_blobs (hash)",
+    ),
+    # Canary deployments
+    ("deployments", "traffic_percent", "INTEGER NOT NULL DEFAULT 100", "INTEGER NOT NULL DEFAULT 100"),
+    # Environment revisions for deployment watchers
+    ("environments", "revision", "INTEGER NOT NULL DEFAULT 0", "INTEGER NOT NULL DEFAULT 0"),
+    ("deployments", "revision", "INTEGER NOT NULL DEFAULT 0", "INTEGER NOT NULL DEFAULT 0"),
+    ("environments", "snapshot_revision", "INTEGER NOT NULL DEFAULT 0", "INTEGER NOT NULL DEFAULT 0"),
+    # Variant variances
+    ("experiment_variants", "latency_m2", "FLOAT NOT NULL DEFAULT 0", "FLOAT NOT NULL DEFAULT 0"),
+    ("experiment_variants", "tokens_m2", "FLOAT NOT NULL DEFAULT 0", "FLOAT NOT NULL DEFAULT 0"),
+    # Sequential experiment analysis
+    ("experiments", "target_sample_size", "INTEGER", "INTEGER"),
+    # Bandit allocation
+    ("experiments", "allocation_mode", "allocationmode NOT NULL DEFAULT 'FIXED'", "VARCHAR(8) NOT NULL DEFAULT 'FIXED'"),
+    ("experiments", "bandit_state", "JSON", "JSON"),
+]
+
+# Enum types and values the columns rely on, applied first
+POSTGRES_TYPES: List[str] = [
+    # Enum columns store member names
+    "ALTER TYPE deploymentstatus ADD VALUE IF NOT EXISTS 'CANARY'",
+    """
+    DO $$ BEGIN
+        CREATE TYPE allocationmode AS ENUM ('FIXED', 'THOMPSON', 'UCB');
+    EXCEPTION WHEN duplicate_object THEN NULL;
+    END $$
+    """,
+]
+
+# Applied after the columns; both dialects support IF NOT EXISTS
+INDEXES: List[str] = [
+    "CREATE INDEX IF NOT EXISTS ix_prompt_versions_prompt_created ON prompt_versions (prompt_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_deployments_environment_revision ON deployments (environment_id, revision)",
+    "CREATE INDEX IF NOT EXISTS ix_metrics_experiment_variant_id ON metrics (experiment_variant_id)",
+]
+
+
+async def _sqlite_columns(conn: AsyncConnection, table: str) -> set:
+    result = await conn.execute(text(f"PRAGMA table_info({table})"))
+    return {row[1] for row in result}
+
+
+async def ensure_schema_upgrades(conn: AsyncConnection) -> None:
+    """Add columns, enum values and indexes missing from an existing database."""
+    dialect = conn.dialect.name
+    
+    if dialect == "postgresql":
+        for statement in POSTGRES_TYPES:
+            await conn.execute(text(statement))
+        for table, column, definition, _ in COLUMNS:
+            await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {definition}"))
+    elif dialect == "sqlite":
+        # SQLite has no ADD COLUMN IF NOT EXISTS
+        existing = {}
+        for table, column, _, definition in COLUMNS:
+            if table not in existing:
+                existing[table] = await _sqlite_columns(conn, table)
+            if column not in existing[table]:
+                await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {definition}"))
+                existing[table].add(column)
+    else:
+        return
+    
+    for statement in INDEXES:
+        await conn.execute(text(statement))
@@ -0,0 +1,77 @@
+"""
+Compiled prompt templates, cached by blob hash.
+
+A template is split once into literal text and {{variable}} placeholders, so
+rendering is a single join instead of one string scan per variable.
+"""
+
+import re
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from app.config import get_settings
+
+
+PLACEHOLDER = re.compile(r"\{\{([^{}]*)\}\}")
+
+
+class CompiledTemplate:
+    """A template pre-split into literal and placeholder parts."""
+    
+    def __init__(self, text: str):
+        self.text = text
+        # Even indexes are literals, odd indexes are variable names
+        self.parts: List[str] = PLACEHOLDER.split(text)
+        self.variables: Tuple[str, ...] = tuple(self.parts[1::2])
+    
+    def render(self, variables: Optional[dict] = None) -> str:
+        """Substitute variables; unknown placeholders are left as written."""
+        if not variables or not self.variables:
+            return self.text
+        
+        out = []
+        for i, part in enumerate(self.parts):
+            if i % 2 == 0:
+                out.append(part)
+            elif part in variables:
+                out.append(str(variables[part]))
+            else:
+                out.append("{{" + part + "}}")
+        return "".join(out)
+
+
+class TemplateCache:
+    """LRU of compiled templates keyed by the content hash of their text."""
+    
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CompiledTemplate]" = OrderedDict()
+    
+    def get(self, blob_hash: Optional[str], text: str) -> CompiledTemplate:
+        """Compiled template for a blob. Text without a blob is compiled uncached."""
+        if blob_hash is None:
+            return CompiledTemplate(text)
+        
+        template = self._entries.get(blob_hash)
+        if template is not None:
+            self._entries.move_to_end(blob_hash)
+            return template
+        
+        template = self._entries[blob_hash] = CompiledTemplate(text)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return template
+    
+    def render(self, blob_hash: Optional[str], text: str, variables: Optional[dict] = None) -> str:
+        return self.get(blob_hash, text).render(variables)
+    
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+@lru_cache()
+def get_template_cache() -> TemplateCache:
+    """Get cached template cache instance."""
+    settings = get_settings()
+    return TemplateCache(max_entries=settings.template_cache_max_entries)
@@ -0,0 +1,174 @@
+"""
+Live experiment variant statistics.
+
+Inference results are folded into per-variant running aggregates in memory
+(count, successes, and mean and M2 of latency and tokens, via Welford's
+algorithm). A background task periodically merges them into the variant rows
+with one atomic UPDATE per variant, combining the stored and pending
+aggregates with Chan's parallel formula, so concurrent workers never
+read-modify-write the same row.
+"""
+
+import asyncio
+from functools import lru_cache
+from typing import Dict, Tuple
+from sqlalchemy import Float, Integer, select, update, bindparam
+
+from app.config import get_settings
+from app.database import async_session_maker
+from app.models.experiment import Experiment, ExperimentVariant
+from app.models.prompt import Prompt
+from app.services.periodic import PeriodicTask
+
+
+class RunningStats:
+    """Count, successes and running mean/M2 of latency and tokens."""
+    
+    __slots__ = ("count", "successes", "latency_mean", "latency_m2", "tokens_mean", "tokens_m2")
+    
+    def __init__(self):
+        self.count = 0
+        self.successes = 0
+        self.latency_mean = 0.0
+        self.latency_m2 = 0.0
+        self.tokens_mean = 0.0
+        self.tokens_m2 = 0.0
+    
+    def add(self, success: bool, latency_ms: float, tokens: float) -> None:
+        """Welford update with one observation."""
+        self.count += 1
+        self.successes += int(success)
+        
+        delta = latency_ms - self.latency_mean
+        self.latency_mean += delta / self.count
+        self.latency_m2 += delta * (latency_ms - self.latency_mean)
+        
+        delta = tokens - self.tokens_mean
+        self.tokens_mean += delta / self.count
+        self.tokens_m2 += delta * (tokens - self.tokens_mean)
+    
+    def merge(self, other: "RunningStats") -> None:
+        """Fold in another aggregate (Chan et al.)."""
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        
+        delta = other.latency_mean - self.latency_mean
+        self.latency_m2 += other.latency_m2 + delta * delta * self.count * other.count / total
+        self.latency_mean += delta * other.count / total
+        
+        delta = other.tokens_mean - self.tokens_mean
+        self.tokens_m2 += other.tokens_m2 + delta * delta * self.count * other.count / total
+        self.tokens_mean += delta * other.count / total
+        
+        self.count = total
+        self.successes += other.successes
+
+
+def _merge_update():
+    """
+    UPDATE merging a pending aggregate into a variant row. Right-hand sides
+    see the row's old values, so every column merges against the same state.
+    """
+    variant = ExperimentVariant.__table__.c
+    n = bindparam("n", type_=Integer)
+    total = variant.request_count + n
+    
+    latency_delta = bindparam("latency_mean", type_=Float) - variant.avg_latency_ms
+    tokens_delta = bindparam("tokens_mean", type_=Float) - variant.avg_tokens
+    
+    # Only variants of the recording user's own experiments
+    owned = (
+        select(Experiment.id)
+        .join(Prompt, Experiment.prompt_id == Prompt.id)
+        .where(Prompt.user_id == bindparam("user_id"))
+    )
+    
+    return (
+        update(ExperimentVariant.__table__)
+        .where(variant.id == bindparam("variant_id"), variant.experiment_id.in_(owned))
+        .values(
+            request_count=total,
+            success_count=variant.success_count + bindparam("successes", type_=Integer),
+            avg_latency_ms=variant.avg_latency_ms + latency_delta * n / total,
+            latency_m2=variant.latency_m2 + bindparam("latency_m2", type_=Float)
+            + latency_delta * latency_delta * variant.request_count * n / total,
+            avg_tokens=variant.avg_tokens + tokens_delta * n / total,
+            tokens_m2=variant.tokens_m2 + bindparam("tokens_m2", type_=Float)
+            + tokens_delta * tokens_delta * variant.request_count * n / total,
+        )
+    )
+
+
+StatsKey = Tuple[str, int]  # (user_id, variant_id)
+
+
+class VariantStatsAggregator:
+    """In-memory per-variant aggregates, flushed periodically."""
+    
+    def __init__(self, flush_interval_seconds: float = 2.0):
+        self.flush_interval_seconds = flush_interval_seconds
+        self._pending: Dict[StatsKey, RunningStats] = {}
+        self._flusher = PeriodicTask(self.flush, flush_interval_seconds, "Variant stats flush")
+        self._flush_lock = asyncio.Lock()
+    
+    def record(self, user_id: str, variant_id: int, success: bool, latency_ms: float, tokens: float) -> None:
+        """Add one inference result. Never blocks."""
+        stats = self._pending.get((user_id, variant_id))
+        if stats is None:
+            stats = self._pending[(user_id, variant_id)] = RunningStats()
+        stats.add(success, latency_ms, tokens)
+    
+    async def start(self) -> None:
+        self._flusher.start()
+    
+    async def stop(self) -> None:
+        """Stop the flusher and write whatever is pending."""
+        # A flush in progress has swapped out the pending aggregates, so it
+        # is waited for, not cancelled
+        await self._flusher.stop()
+        await self.flush()
+    
+    async def flush(self) -> bool:
+        """Merge pending aggregates into the variant rows. Returns False on failure."""
+        async with self._flush_lock:
+            batch, self._pending = self._pending, {}
+            if not batch:
+                return True
+            
+            params = [
+                {
+                    "user_id": user_id,
+                    "variant_id": variant_id,
+                    "n": stats.count,
+                    "successes": stats.successes,
+                    "latency_mean": stats.latency_mean,
+                    "latency_m2": stats.latency_m2,
+                    "tokens_mean": stats.tokens_mean,
+                    "tokens_m2": stats.tokens_m2,
+                }
+                for (user_id, variant_id), stats in batch.items()
+            ]
+            
+            try:
+                async with async_session_maker() as session:
+                    await session.execute(_merge_update(), params)
+                    await session.commit()
+            except Exception as e:
+                print(f"❌ Variant stats flush failed: {e}")
+                # Put the batch back, merged with anything recorded meanwhile
+                for key, stats in batch.items():
+                    newer = self._pending.get(key)
+                    if newer is not None:
+                        stats.merge(newer)
+                    self._pending[key] = stats
+                return False
+            
+            return True
+
+
+@lru_cache()
+def get_variant_stats() -> VariantStatsAggregator:
+    """Get cached variant stats aggregator instance."""
+    settings = get_settings()
+    return VariantStatsAggregator(flush_interval_seconds=settings.experiment_stats_flush_interval_seconds)
@@ -0,0 +1,13 @@
+"""
+Test configuration. Settings are read from the environment when app modules
+are imported, so defaults are set here first; the database is in-memory
+SQLite unless DATABASE_URL says otherwise.
+"""
+
+import os
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_ANON_KEY", "test")
+os.environ.setdefault("GEMINI_API_KEY", "test")
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+os.environ.setdefault("DEBUG", "false")
@@ -0,0 +1,172 @@
+"""
+Query-count tests for deployment reads and rollback.
+
+Each endpoint is called directly against the in-memory database while a
+cursor listener counts the statements it sends, so a read that starts
+loading related rows one at a time fails here however many deployments
+the user has.
+"""
+
+import asyncio
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import Response
+from sqlalchemy import event
+
+from app.database import async_session_maker, engine, init_db
+from app.models.deployment import Deployment, DeploymentStatus
+from app.models.environment import Environment
+from app.models.prompt import Prompt, PromptVersion
+from app.routers.deployments import (
+    get_active_deployment, get_deployment, list_deployments, rollback_deployment
+)
+from app.schemas.deployment import DeploymentRollbackRequest
+from app.services.deployment_resolver import DeploymentResolver
+from app.services.supabase_auth import SupabaseUser
+
+
+USER = SupabaseUser(id="query-count-user")
+PROMPTS = 3
+VERSIONS = 4
+
+
+@contextmanager
+def count_statements():
+    statements = []
+    
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+async def _seed() -> dict:
+    """Several prompts, each with a history of rolled back deployments and one active."""
+    await init_db()
+    now = datetime.now(timezone.utc)
+    
+    async with async_session_maker() as db:
+        environment = Environment(user_id=USER.id, name="production", display_name="Production")
+        db.add(environment)
+        await db.flush()
+        
+        seeded = {"environment_id": environment.id, "prompt_ids": [], "deployment_ids": []}
+        for p in range(PROMPTS):
+            prompt = Prompt(user_id=USER.id, name=f"prompt-{p}")
+            db.add(prompt)
+            await db.flush()
+            seeded["prompt_ids"].append(prompt.id)
+            
+            for v in range(VERSIONS):
+                version = PromptVersion(
+                    prompt_id=prompt.id, version_tag=f"v{v}",
+                    legacy_system_prompt="You are helpful.", legacy_user_prompt=f"Hello {{{{name}}}} {v}"
+                )
+                db.add(version)
+                await db.flush()
+                
+                deployment = Deployment(
+                    version_id=version.id, environment_id=environment.id, user_id=USER.id,
+                    status=DeploymentStatus.ACTIVE if v == VERSIONS - 1 else DeploymentStatus.ROLLED_BACK,
+                    deployed_at=now
+                )
+                db.add(deployment)
+                await db.flush()
+                seeded["deployment_ids"].append(deployment.id)
+        
+        await db.commit()
+    return seeded
+
+
+@pytest.fixture(scope="module")
+def seeded():
+    return asyncio.run(_seed())
+
+
+def test_list_is_one_statement(seeded):
+    async def run():
+        async with async_session_maker() as db:
+            with count_statements() as statements:
+                listed = await list_deployments(db=db, user=USER)
+        return listed, statements
+    
+    listed, statements = asyncio.run(run())
+    assert len(listed) == PROMPTS * VERSIONS
+    assert all(deployment.prompt_name and deployment.version_tag for deployment in listed)
+    assert len(statements) == 1, statements
+
+
+def test_list_filtered_by_prompt_is_one_statement(seeded):
+    async def run():
+        async with async_session_maker() as db:
+            with count_statements() as statements:
+                listed = await list_deployments(prompt_id=seeded["prompt_ids"][0], db=db, user=USER)
+        return listed, statements
+    
+    listed, statements = asyncio.run(run())
+    assert len(listed) == VERSIONS
+    assert len(statements) == 1, statements
+
+
+def test_get_is_one_statement(seeded):
+    async def run():
+        async with async_session_maker() as db:
+            with count_statements() as statements:
+                deployment = await get_deployment(seeded["deployment_ids"][0], db=db, user=USER)
+        return deployment, statements
+    
+    deployment, statements = asyncio.run(run())
+    assert deployment.environment_name == "production"
+    assert len(statements) == 1, statements
+
+
+def test_active_is_served_from_the_resolver(seeded):
+    environment_id = seeded["environment_id"]
+    prompt_id = seeded["prompt_ids"][1]
+    
+    async def run():
+        resolver = DeploymentResolver()
+        with count_statements() as miss:
+            first = await get_active_deployment(environment_id, prompt_id, Response(), None, user=USER, resolver=resolver)
+        with count_statements() as hit:
+            second = await get_active_deployment(environment_id, prompt_id, Response(), None, user=USER, resolver=resolver)
+        
+        warmed = DeploymentResolver()
+        await warmed.warm()
+        with count_statements() as after_warm:
+            await get_active_deployment(environment_id, prompt_id, Response(), None, user=USER, resolver=warmed)
+        return first, second, miss, hit, after_warm
+    
+    first, second, miss, hit, after_warm = asyncio.run(run())
+    assert first.version_tag == second.version_tag == f"v{VERSIONS - 1}"
+    assert len(miss) == 1, miss
+    assert hit == []
+    assert after_warm == []
+
+
+def test_rollback_statements_do_not_grow_with_history(seeded):
+    async def rollback(deployment_id: int):
+        async with async_session_maker() as db:
+            with count_statements() as statements:
+                rolled_back = await rollback_deployment(
+                    deployment_id, DeploymentRollbackRequest(reason="test"), db=db, user=USER
+                )
+        return rolled_back, statements
+    
+    # The first version of the last prompt, rolled back to twice: the second
+    # time there is one more deployment in its history
+    target = seeded["deployment_ids"][(PROMPTS - 1) * VERSIONS]
+    first, first_statements = asyncio.run(rollback(target))
+    second, second_statements = asyncio.run(rollback(target))
+    
+    assert first.version_tag == second.version_tag == "v0"
+    assert second.rolled_back_from_id == first.id
+    # Target, live deployments, revision bump, status update, insert, refresh
+    assert len(first_statements) == 6, first_statements
+    assert len(second_statements) == len(first_statements), second_statements
@@ -0,0 +1,60 @@
+"""
+Tests for environment bundle hashing.
+"""
+
+import gzip
+import json
+from datetime import datetime, timezone
+
+from app.models.deployment import Deployment, DeploymentStatus
+from app.models.prompt import PromptVersion
+from app.services.deployment_resolver import ResolvedDeployment
+from app.services.environment_bundle import EnvironmentBundle, bundle_entry
+
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _version(version_id: int, user_prompt: str) -> PromptVersion:
+    return PromptVersion(
+        id=version_id, prompt_id=1, version_tag=f"v{version_id}",
+        legacy_system_prompt="You are helpful.", legacy_user_prompt=user_prompt,
+        model="gemini-2.0-flash", temperature=0.7, max_tokens=1024, variables=None
+    )
+
+
+def _bundle(deployment_id: int, version: PromptVersion, revision: int) -> EnvironmentBundle:
+    deployment = Deployment(
+        id=deployment_id, version_id=version.id, environment_id=1, user_id="user",
+        status=DeploymentStatus.ACTIVE, traffic_percent=100, revision=revision,
+        created_at=NOW, deployed_at=NOW
+    )
+    resolved = ResolvedDeployment(deployment, version, "greeting", NOW, "production")
+    return EnvironmentBundle("user", 1, "production", revision, [bundle_entry(resolved)])
+
+
+def test_rollback_to_the_same_version_keeps_the_hash():
+    v1 = _version(1, "Hello {{name}}")
+    v2 = _version(2, "Hi there {{name}}")
+    
+    deployed = _bundle(deployment_id=10, version=v1, revision=1)
+    upgraded = _bundle(deployment_id=11, version=v2, revision=2)
+    # Rolling back creates a new deployment row for the old version
+    rolled_back = _bundle(deployment_id=12, version=v1, revision=3)
+    
+    assert upgraded.hash != deployed.hash
+    assert rolled_back.hash == deployed.hash
+    assert rolled_back.entry_hashes == deployed.entry_hashes
+    
+    # The IDs are still served, just not hashed
+    document = json.loads(gzip.decompress(rolled_back.data))
+    assert document["prompts"][0]["deployment_id"] == 12
+
+
+def test_delta_after_rollback_is_empty():
+    v1 = _version(1, "Hello {{name}}")
+    deployed = _bundle(deployment_id=10, version=v1, revision=1)
+    rolled_back = _bundle(deployment_id=12, version=v1, revision=3)
+    
+    delta = json.loads(gzip.decompress(rolled_back.delta_from(deployed.hash, deployed.entry_hashes)))
+    assert delta["changed"] == [] and delta["removed"] == []
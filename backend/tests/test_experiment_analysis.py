@@ -0,0 +1,86 @@
+"""
+Tests for sequential significance testing of experiments.
+"""
+
+import math
+
+import numpy as np
+
+from app.services.experiment_analysis import (
+    ID, _Samples, look_sizes, obrien_fleming_boundaries, sequential_test, two_proportion_test
+)
+
+
+ALPHA = 0.05
+
+
+def test_boundaries_spend_alpha_across_looks():
+    """Under the null, crossing any boundary happens with probability alpha."""
+    rng = np.random.default_rng(7)
+    for looks in (5, 10, 20):
+        boundaries = np.array(obrien_fleming_boundaries(ALPHA, looks))
+        fractions = np.arange(1, looks + 1) / looks
+        paths = (rng.standard_normal((200000, looks)) * math.sqrt(1 / looks)).cumsum(axis=1)
+        rejected = (np.abs(paths / np.sqrt(fractions)) >= boundaries).any(axis=1).mean()
+        assert abs(rejected - ALPHA) < 0.003, (looks, rejected)
+
+
+def test_boundaries_are_obrien_fleming_shaped():
+    boundaries = obrien_fleming_boundaries(ALPHA, 5)
+    assert math.isclose(boundaries[0], 1.959964 / math.sqrt(0.2), rel_tol=1e-4)
+    assert list(boundaries) == sorted(boundaries, reverse=True)
+    # The final look stays close to the fixed-horizon 1.96
+    assert 1.96 < boundaries[-1] < 2.1
+
+
+def test_repeated_analysis_keeps_false_positive_rate():
+    """A/A experiments analysed to completion reject at about alpha, however often they are looked at."""
+    rng = np.random.default_rng(11)
+    looks, target = 10, 400
+    boundaries = obrien_fleming_boundaries(ALPHA, looks)
+    sizes = look_sizes(target, looks)
+    
+    experiments = 3000
+    rejected = 0
+    for _ in range(experiments):
+        variant = (rng.random(target) < 0.3).astype(float)
+        control = (rng.random(target) < 0.3).astype(float)
+        # Asking part way through gives the decision of the looks reached so far
+        early = sequential_test(two_proportion_test, variant[:target // 3], control[:target // 3], boundaries, sizes)
+        final = sequential_test(two_proportion_test, variant, control, boundaries, sizes)
+        if early.significant:
+            assert final.significant and final.look == early.look
+        rejected += final.significant
+    
+    assert rejected / experiments < ALPHA + 2.5 * math.sqrt(ALPHA * (1 - ALPHA) / experiments)
+
+
+def test_nothing_is_significant_before_the_first_look():
+    boundaries = obrien_fleming_boundaries(ALPHA, 10)
+    sizes = look_sizes(1000, 10)
+    variant = np.ones(50)
+    control = np.zeros(50)
+    result = sequential_test(two_proportion_test, variant, control, boundaries, sizes)
+    assert not result.significant and result.look is None
+
+
+def _rows(*metric_ids, variant_id=1):
+    return np.array([[1.0, 100.0, 10.0, 0.1, metric_id, variant_id] for metric_id in metric_ids]).reshape(-1, 6)
+
+
+def test_samples_pick_up_late_commits_without_duplicates():
+    samples = _Samples((1,))
+    samples.extend(_rows(1, 2, 4), fetched_at=0.0)
+    
+    # Row 3 committed after row 4 was read; the next fetch re-reads from `settled`
+    samples.settle(now=10.0, settle_seconds=60)
+    assert samples.settled == 0
+    samples.extend(_rows(1, 2, 3, 4, 5), fetched_at=10.0)
+    assert samples.arrays[1][:, ID].tolist() == [1, 2, 3, 4, 5]
+    assert samples.watermark == 5
+    
+    # Fetches older than the settle window become the new starting point
+    samples.settle(now=65.0, settle_seconds=60)
+    assert samples.settled == 4
+    samples.settle(now=75.0, settle_seconds=60)
+    assert samples.settled == 5
@@ -0,0 +1,60 @@
+"""
+Tests for the background loop behind the buffered writers.
+"""
+
+import asyncio
+
+from app.services.periodic import PeriodicTask
+
+
+def test_stop_lets_a_run_in_progress_finish():
+    runs = []
+    
+    async def action():
+        runs.append("started")
+        await asyncio.sleep(0.05)
+        runs.append("finished")
+    
+    async def run():
+        task = PeriodicTask(action, interval_seconds=60, name="test")
+        task.start()
+        task.wake()
+        await asyncio.sleep(0.01)
+        await task.stop()
+    
+    asyncio.run(run())
+    assert runs == ["started", "finished"]
+
+
+def test_stop_does_not_start_another_run():
+    runs = []
+    
+    async def action():
+        runs.append("run")
+    
+    async def run():
+        task = PeriodicTask(action, interval_seconds=60, name="test")
+        task.start()
+        await asyncio.sleep(0.01)
+        await task.stop()
+    
+    asyncio.run(run())
+    assert runs == []
+
+
+def test_a_failing_run_does_not_end_the_loop():
+    runs = []
+    
+    async def action():
+        runs.append("run")
+        if len(runs) == 1:
+            raise RuntimeError("database unavailable")
+    
+    async def run():
+        task = PeriodicTask(action, interval_seconds=0.01, name="test")
+        task.start()
+        await asyncio.sleep(0.1)
+        await task.stop()
+    
+    asyncio.run(run())
+    assert len(runs) >= 2